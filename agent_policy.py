@@ -2,6 +2,12 @@ import json
 
 import sys
 
+ACTION_THRESHOLD = 0.4
+
+RAG_THRESHOLD = 0.05
+
+ESCALATION_CONFIDENCE = 0.4
+
 def decide_next_step(intent_data, sentiment_data, entities, retrieval_score=0.0, coverage_metrics=None):
 
                                                                 
@@ -16,9 +22,9 @@ def decide_next_step(intent_data, sentiment_data, entities, retrieval_score=0.0,
 
     
 
-    action_threshold = 0.4
+    action_threshold = ACTION_THRESHOLD
 
-    rag_threshold = 0.05                                  
+    rag_threshold = RAG_THRESHOLD                                  
 
                                                      
 
@@ -34,7 +40,7 @@ def decide_next_step(intent_data, sentiment_data, entities, retrieval_score=0.0,
 
         }
 
-    if (is_urgent or sentiment == "negative") and confidence < 0.4:
+    if (is_urgent or sentiment == "negative") and confidence < ESCALATION_CONFIDENCE:
 
         return {
 
@@ -161,6 +167,36 @@ def decide_next_step(intent_data, sentiment_data, entities, retrieval_score=0.0,
 
     }
 
+def required_inputs(intent_data, retrieval_score=None):
+
+    # What decide_next_step will read for this intent, so the pipeline can leave the rest uncomputed.
+
+    # retrieval_score=None means retrieval has not run yet: sentiment stays needed while a low score could still reach it.
+
+    intent = intent_data.get("intent", "other")
+
+    confidence = intent_data.get("confidence", 0.0)
+
+    needed = set()
+
+    if intent.startswith("ask_"):
+
+        needed.add("retrieval")
+
+        if retrieval_score is not None and retrieval_score >= RAG_THRESHOLD:
+
+            return needed
+
+    if confidence < ESCALATION_CONFIDENCE:
+
+        needed.add("sentiment")
+
+    elif intent.startswith("action_") and confidence >= ACTION_THRESHOLD:
+
+        needed.add("entities")
+
+    return needed
+
 if __name__ == "__main__":
 
     mock_intent = {"intent": "action_ticket", "confidence": 0.9}
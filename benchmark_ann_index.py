@@ -0,0 +1,79 @@
+import argparse
+import time
+
+import numpy as np
+
+import faiss
+
+from index_chunks import build_faiss_index, make_search_params
+
+def load_vectors(index_path, synthetic, dimension, seed):
+    if synthetic:
+        rng = np.random.default_rng(seed)
+        # Clustered data behaves more like sentence embeddings than uniform noise
+        centers = rng.standard_normal((max(16, synthetic // 500), dimension)).astype('float32')
+        labels = rng.integers(0, len(centers), size=synthetic)
+        return centers[labels] + 0.35 * rng.standard_normal((synthetic, dimension)).astype('float32')
+    flat = faiss.read_index(index_path)
+    return flat.reconstruct_n(0, flat.ntotal)
+
+def make_queries(vectors, count, seed):
+    rng = np.random.default_rng(seed + 1)
+    picks = rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)
+    noise = 0.1 * vectors.std() * rng.standard_normal((len(picks), vectors.shape[1])).astype('float32')
+    return vectors[picks] + noise
+
+def time_searches(index, queries, k, params):
+    latencies = []
+    results = []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k, params=params)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        results.append(ids[0])
+    return np.array(results), np.array(latencies)
+
+def recall(results, truth, k):
+    hits = sum(len(set(r[:k]) & set(t[:k])) for r, t in zip(results, truth))
+    return hits / (k * len(truth))
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k, latency and memory of ANN index types against the flat index.")
+    parser.add_argument("--index", default="faq_index.faiss")
+    parser.add_argument("--synthetic", type=int, default=0, help="Benchmark N synthetic vectors instead of the stored index")
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--search-k", type=int, default=1000, help="Neighbours requested per query, as in retrieve_chunks")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.index, args.synthetic, args.dimension, args.seed)
+    queries = make_queries(vectors, args.queries, args.seed)
+    search_k = min(args.search_k, len(vectors))
+    print(f"{len(vectors)} vectors, dim {vectors.shape[1]}, {len(queries)} queries, recall@{args.k}, search k={search_k}\n")
+
+    flat, _ = build_faiss_index(vectors, {"type": "flat"})
+    truth, _ = time_searches(flat, queries, search_k, None)
+
+    settings = [
+        ("flat", {}, [None]),
+        ("hnsw", {}, [{"ef_search": ef} for ef in (32, 64, 128, 256)]),
+        ("ivf_flat", {}, [{"nprobe": n} for n in (1, 4, 16, 64)]),
+        ("ivf_pq", {}, [{"nprobe": n} for n in (1, 4, 16, 64)]),
+    ]
+
+    print(f"{'type':<9} | {'search params':<16} | {f'recall@{args.k}':>9} | {'p50 ms':>7} | {'p99 ms':>7} | {'memory MB':>9} | {'build s':>7}")
+    print("-" * 82)
+    for index_type, config, sweeps in settings:
+        start = time.perf_counter()
+        index, manifest = build_faiss_index(vectors, dict(config, type=index_type))
+        build_seconds = time.perf_counter() - start
+        memory_mb = faiss.serialize_index(index).nbytes / (1024 * 1024)
+        for search_params in sweeps:
+            results, latencies = time_searches(index, queries, search_k, make_search_params(index, search_params))
+            label = ", ".join(f"{k}={v}" for k, v in (search_params or {}).items()) or "-"
+            print(f"{index_type:<9} | {label:<16} | {recall(results, truth, args.k):>9.3f} | {np.percentile(latencies, 50):>7.3f} | {np.percentile(latencies, 99):>7.3f} | {memory_mb:>9.1f} | {build_seconds:>7.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import os
+import tempfile
+import time
+
+from index_chunks import create_index, read_index_manifest
+from query_assistant import register_corpus, retrieve_chunks
+from benchmark_rerank import load_golden, recall_at_k, percentile
+
+def build_for_model(chunks_path, workdir, model_name, normalize):
+    slug = model_name.replace("/", "_")
+    index_path = os.path.join(workdir, f"{slug}.faiss")
+    mapping_path = os.path.join(workdir, f"{slug}.json")
+    start = time.perf_counter()
+    create_index(chunks_path, index_path, mapping_path, embedding_model=model_name, normalize=normalize)
+    return slug, index_path, time.perf_counter() - start
+
+def run_queries(golden, corpus_id, k):
+    latencies, results = [], []
+    for item in golden:
+        start = time.perf_counter()
+        results.append(retrieve_chunks(item["query"], k=k, intent=item.get("intent"), corpus_id=corpus_id) or [])
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return results, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Build one index per embedding model and compare retrieval latency and recall against the first model.")
+    parser.add_argument("--chunks", default="chunks.json")
+    parser.add_argument("--golden", default="golden_queries.json")
+    parser.add_argument("--models", nargs="+", default=["all-mpnet-base-v2", "all-MiniLM-L6-v2"])
+    parser.add_argument("--normalize", action="store_true")
+    parser.add_argument("--workdir", default=None, help="Keep the built indexes here instead of a temporary directory")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    golden = load_golden(args.golden)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="embedding_bench_")
+    os.makedirs(workdir, exist_ok=True)
+
+    rows, reference = [], None
+    for model_name in args.models:
+        corpus_id, index_path, build_seconds = build_for_model(args.chunks, workdir, model_name, args.normalize)
+        register_corpus(corpus_id, index_path, os.path.join(workdir, f"{corpus_id}.json"))
+        # Warm the encoder and the corpus so the first query does not pay for loading
+        retrieve_chunks(golden[0]["query"], k=args.k, corpus_id=corpus_id)
+        results, latencies = run_queries(golden, corpus_id, args.k)
+        reference = reference or results
+        recall, page_recall = recall_at_k(results, reference, golden, args.k)
+        dimension = read_index_manifest(index_path)["dimension"]
+        rows.append((model_name, dimension, build_seconds, recall, page_recall, percentile(latencies, 0.5), percentile(latencies, 0.95)))
+
+    print(f"\nIndexes in {workdir}; recall@{args.k} is measured against {args.models[0]}\n")
+    print(f"{'model':<28} | {'dim':>4} | {'build s':>7} | {f'recall@{args.k}':>9} | {'page rec':>8} | {'p50 ms':>8} | {'p95 ms':>8}")
+    print("-" * 90)
+    for model_name, dimension, build_seconds, recall, page_recall, p50, p95 in rows:
+        page_str = "-" if page_recall is None else f"{page_recall:.3f}"
+        print(f"{model_name:<28} | {dimension:>4} | {build_seconds:>7.1f} | {recall:>9.3f} | {page_str:>8} | {p50:>8.1f} | {p95:>8.1f}")
+
+if __name__ == "__main__":
+    main()
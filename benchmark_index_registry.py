@@ -0,0 +1,72 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import faiss
+
+from index_chunks import build_faiss_index, write_index_manifest
+from chunk_store import write_chunk_store
+from index_handle import IndexRegistry
+
+WORDS = ["revenue", "growth", "leave", "policy", "employee", "benefit", "laptop", "vpn", "audit", "dividend", "travel", "expense", "security", "password", "payroll", "bonus"]
+
+def build_corpus(directory, name, size, dimension, seed):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((size, dimension)).astype('float32')
+    index, manifest = build_faiss_index(vectors, {"type": "flat"})
+    index_path = os.path.join(directory, f"{name}.faiss")
+    mapping_path = os.path.join(directory, f"{name}.json")
+    faiss.write_index(index, index_path)
+    write_index_manifest(index_path, manifest)
+    chunks = [{
+        "doc_title": name,
+        "page_number": i // 4 + 1,
+        "section": f"Section {i % 12}",
+        "chunk_id": f"{name}-{i}",
+        "version": "1",
+        "content": " ".join(rng.choice(WORDS, size=120)),
+    } for i in range(size)]
+    write_chunk_store(chunks, os.path.splitext(mapping_path)[0])
+    return index_path, mapping_path
+
+def run_trace(registry, corpus_ids, requests, dimension, seed):
+    rng = np.random.default_rng(seed)
+    query = rng.standard_normal((1, dimension)).astype('float32')
+    latencies = []
+    for i in range(requests):
+        corpus_id = corpus_ids[i % len(corpus_ids)]
+        start = time.perf_counter()
+        with registry.lease(corpus_id) as corpus:
+            corpus.index.search(query, 10)
+            corpus.chunks[0]
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return np.array(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of alternating requests across corpora for different index registry capacities.")
+    parser.add_argument("--corpora", type=int, default=2)
+    parser.add_argument("--chunks", type=int, default=20000, help="Chunks per synthetic corpus")
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {f"corpus_{i}": build_corpus(directory, f"corpus_{i}", args.chunks, args.dimension, args.seed + i) for i in range(args.corpora)}
+        print(f"{args.corpora} corpora x {args.chunks} chunks, dim {args.dimension}, {args.requests} alternating requests\n")
+        print(f"{'max corpora':>11} | {'mean ms':>8} | {'p95 ms':>8} | {'hits':>5} | {'misses':>6} | {'evictions':>9} | {'resident MB':>11}")
+        print("-" * 76)
+        for capacity in sorted({1, args.corpora}):
+            registry = IndexRegistry(max_corpora=capacity)
+            for corpus_id, (index_path, mapping_path) in paths.items():
+                registry.register(corpus_id, index_path, mapping_path)
+            latencies = run_trace(registry, list(paths), args.requests, args.dimension, args.seed)
+            stats = registry.stats().values()
+            resident_mb = sum(s["bytes"] for s in stats) / (1024 * 1024)
+            print(f"{capacity:>11} | {latencies.mean():>8.2f} | {np.percentile(latencies, 95):>8.2f} | {sum(s['hits'] for s in stats):>5} | {sum(s['misses'] for s in stats):>6} | {sum(s['evictions'] for s in stats):>9} | {resident_mb:>11.1f}")
+
+if __name__ == "__main__":
+    main()
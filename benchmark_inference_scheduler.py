@@ -0,0 +1,72 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+
+import intent_detector
+from inference_scheduler import set_inference_batching, scheduler_stats
+from nlu_stage import analyze_message
+from query_assistant import retrieve_chunks
+from benchmark_rerank import load_golden
+
+def session(queries, index_path, mapping_path, latencies, barrier):
+    barrier.wait()
+    for query in queries:
+        start = time.perf_counter()
+        analyze_message(query)
+        retrieve_chunks(query, index_path, mapping_path, k=5)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+
+def run(golden, sessions, requests, index_path, mapping_path):
+    # Fresh caches so every configuration pays for the same model calls
+    intent_detector._embedding_intent.cache_clear()
+    queries = [golden[(s * requests + r) % len(golden)]["query"] for s in range(sessions) for r in range(requests)]
+    latencies = []
+    barrier = threading.Barrier(sessions)
+    threads = [threading.Thread(target=session, args=(queries[s * requests:(s + 1) * requests], index_path, mapping_path, latencies, barrier)) for s in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, time.perf_counter() - start
+
+def batch_sizes(before, after):
+    sizes = {}
+    for key, stats in after.items():
+        units = stats["units"] - before.get(key, {}).get("units", 0)
+        batches = stats["batches"] - before.get(key, {}).get("batches", 0)
+        if batches:
+            sizes[key.split(":")[0]] = units / batches
+    return " ".join(f"{key}={size:.1f}" for key, size in sorted(sizes.items()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and latency of concurrent sessions with and without cross-request micro-batching.")
+    parser.add_argument("--golden", default="golden_queries.json")
+    parser.add_argument("--index", default="faq_index.faiss")
+    parser.add_argument("--mapping", default="chunks_mapping.json")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=4, help="Requests per session")
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    args = parser.parse_args()
+
+    golden = load_golden(args.golden)
+    # Load every model outside the timed runs
+    analyze_message(golden[0]["query"])
+    retrieve_chunks(golden[0]["query"], args.index, args.mapping, k=5)
+
+    print(f"{'batching':<8} | {'sessions':>8} | {'req/s':>7} | {'p50 ms':>8} | {'p95 ms':>8} | mean batch per model")
+    print("-" * 90)
+    for sessions in args.sessions:
+        for batching in (False, True):
+            set_inference_batching(batching, window_ms=args.window_ms, max_batch=args.max_batch)
+            before = scheduler_stats()
+            latencies, seconds = run(golden, sessions, args.requests, args.index, args.mapping)
+            sizes = batch_sizes(before, scheduler_stats()) if batching else ""
+            print(f"{'on' if batching else 'off':<8} | {sessions:>8} | {len(latencies) / seconds:>7.1f} | {np.percentile(latencies, 50):>8.1f} | {np.percentile(latencies, 95):>8.1f} | {sizes}")
+    set_inference_batching(False)
+
+if __name__ == "__main__":
+    main()
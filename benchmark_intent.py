@@ -0,0 +1,56 @@
+import argparse
+import time
+
+import numpy as np
+
+import intent_detector
+from intent_detector import detect_intent, embedding_intent
+from benchmark_rerank import load_golden
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Agreement and latency of the embedding intent fast path against zero-shot NLI.")
+    parser.add_argument("--golden", default="golden_queries.json")
+    parser.add_argument("--margins", type=float, nargs="+", default=[0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 1.01])
+    args = parser.parse_args()
+
+    golden = load_golden(args.golden)
+    # Load both paths before timing
+    detect_intent(golden[0]["query"], method="nli")
+    detect_intent(golden[0]["query"], method="embedding")
+
+    rows = []
+    for item in golden:
+        nli, nli_ms = timed(detect_intent, item["query"], method="nli")
+        fast, fast_ms = timed(detect_intent, item["query"], method="embedding")
+        _, _, margin = embedding_intent(item["query"])
+        rows.append((item.get("intent"), nli["intent"], nli_ms, fast["intent"], fast_ms, margin))
+
+    nli_ms = np.array([r[2] for r in rows])
+    print(f"{len(rows)} queries | NLI p50 {np.percentile(nli_ms, 50):.1f} ms | embedding p50 {np.percentile([r[4] for r in rows], 50):.1f} ms\n")
+    print(f"{'margin':>6} | {'fallback':>8} | {'agree w/ NLI':>12} | {'accuracy':>8} | {'NLI acc':>7} | {'mean ms':>8} | {'saved ms':>8}")
+    print("-" * 75)
+    for threshold in args.margins:
+        chosen, latencies, fallbacks = [], [], 0
+        for expected, nli_intent, nli_latency, fast_intent, fast_latency, margin in rows:
+            # Auto mode always pays for the embedding pass and adds NLI only below the margin
+            if margin >= threshold:
+                chosen.append(fast_intent)
+                latencies.append(fast_latency)
+            else:
+                chosen.append(nli_intent)
+                latencies.append(fast_latency + nli_latency)
+                fallbacks += 1
+        agreement = np.mean([c == r[1] for c, r in zip(chosen, rows)])
+        accuracy = np.mean([c == r[0] for c, r in zip(chosen, rows)])
+        nli_accuracy = np.mean([r[1] == r[0] for r in rows])
+        marker = " *" if abs(threshold - intent_detector.INTENT_MARGIN_THRESHOLD) < 1e-9 else ""
+        print(f"{threshold:>6.2f} | {fallbacks / len(rows):>8.2f} | {agreement:>12.3f} | {accuracy:>8.3f} | {nli_accuracy:>7.3f} | {np.mean(latencies):>8.1f} | {np.mean(nli_ms) - np.mean(latencies):>8.1f}{marker}")
+    print(f"\n* current INTENT_MARGIN_THRESHOLD; margin 1.01 always falls back to NLI")
+
+if __name__ == "__main__":
+    main()
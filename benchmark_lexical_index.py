@@ -0,0 +1,101 @@
+import argparse
+import random
+import re
+import time
+
+import numpy as np
+
+from lexical_index import LexicalIndex, get_bigrams
+
+QUERIES = [
+    "What was HCLTech's revenue growth in FY25",
+    "How many employees joined the company",
+    "dividend payout to shareholders",
+    "Who is the chairperson of the board",
+    "ESG carbon emission targets",
+]
+
+def make_vocabulary(size, seed):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = {"revenue", "growth", "employees", "dividend", "chairperson", "board", "carbon", "emission", "targets", "shareholders"}
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 9))))
+    return sorted(words)
+
+def make_chunks(count, words_per_chunk, vocab, seed):
+    rng = np.random.default_rng(seed)
+    # Zipf-like sampling so frequent terms have long posting lists, as in real reports
+    ranks = rng.zipf(1.2, size=(count, words_per_chunk)) % len(vocab)
+    return [{"content": " ".join(vocab[r] for r in row), "page_number": i} for i, row in enumerate(ranks)]
+
+def tile_index(base, repeats):
+    # Equivalent to indexing the base corpus repeated `repeats` times, without materialising the text
+    def tile(postings, offsets):
+        lengths = np.diff(offsets)
+        term_of = np.repeat(np.arange(len(lengths)), lengths)
+        within = np.arange(len(postings)) - offsets[term_of]
+        tiled = np.empty(len(postings) * repeats, dtype=np.int32)
+        for r in range(repeats):
+            tiled[offsets[term_of] * repeats + r * lengths[term_of] + within] = postings + r * base.num_chunks
+        return tiled, offsets * repeats
+
+    token_postings, token_offsets = tile(base.token_postings, base.token_offsets)
+    bigram_postings, bigram_offsets = tile(base.bigram_postings, base.bigram_offsets)
+    return LexicalIndex(base.token_ids, token_postings, token_offsets, base.bigram_ids, bigram_postings, bigram_offsets, base.num_chunks * repeats)
+
+def legacy_lexical_scores(query, chunks, rows):
+    # The per-query path retrieve_chunks used before the inverted index
+    stops = {'what', 'which', 'who', 'the', 'and', 'for', 'with', 'from', 'that', 'this', 'date', 'name', 'how', 'when', 'where', 'why', 'does', 'did', 'has', 'have', 'been', 'were', 'was', 'is', 'are', 'it', 'in', 'on', 'at', 'about'}
+    query_tokens = {t for t in set(re.findall(r'\w{3,}', query.lower())) if t not in stops}
+    scores = {}
+    for rank, idx in enumerate(rows):
+        chunk = chunks[idx].copy()
+        chunk_tokens = set(re.findall(r'\w{3,}', chunk['content'].lower()))
+        overlap = len(query_tokens.intersection(chunk_tokens))
+        words = [w for w in re.findall(r'\w{3,}', query.lower()) if w not in {'the', 'and', 'for', 'with', 'from', 'that', 'this'}]
+        query_bigrams = set(zip(words, words[1:]))
+        bigram_overlap = len(query_bigrams.intersection(set(chunk.get('bigrams', []))))
+        chunk["rrf_score"] = 1.0 / (60 + rank) + overlap * 0.5 + bigram_overlap * 1.0
+        scores[idx] = chunk
+    return scores
+
+def time_per_query(fn, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(QUERIES[i % len(QUERIES)])
+    return (time.perf_counter() - start) / repeat * 1000.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-query lexical scoring cost before/after the inverted index.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[600, 60000, 600000])
+    parser.add_argument("--base-chunks", type=int, default=3000)
+    parser.add_argument("--words-per-chunk", type=int, default=450)
+    parser.add_argument("--candidates", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    vocab = make_vocabulary(20000, seed=7)
+    base_chunks = make_chunks(args.base_chunks, args.words_per_chunk, vocab, seed=11)
+    for chunk in base_chunks:
+        chunk["bigrams"] = get_bigrams(chunk["content"])
+
+    start = time.perf_counter()
+    base_index = LexicalIndex.from_chunks(base_chunks)
+    build_rate = args.base_chunks / (time.perf_counter() - start)
+
+    print(f"{'chunks':>8} | {'before ms/query':>15} | {'after ms/query':>14} | {'speedup':>7} | {'est. build s':>12}")
+    print("-" * 70)
+    rng = np.random.default_rng(3)
+    for size in args.sizes:
+        repeats = -(-size // args.base_chunks)
+        index = tile_index(base_index, repeats) if repeats > 1 else base_index
+        chunks = [base_chunks[i % args.base_chunks] for i in range(size)]
+        rows = rng.choice(size, size=min(args.candidates, size), replace=False).astype(np.int32)
+
+        before = time_per_query(lambda q: legacy_lexical_scores(q, chunks, rows), args.repeat)
+        after = time_per_query(lambda q: index.overlap_scores(q, rows), args.repeat)
+        print(f"{size:>8} | {before:>15.3f} | {after:>14.3f} | {before / after:>6.1f}x | {size / build_rate:>12.1f}")
+
+if __name__ == "__main__":
+    main()
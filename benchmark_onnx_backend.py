@@ -0,0 +1,91 @@
+import argparse
+import time
+
+import numpy as np
+
+from model_registry import get_model, set_model_backend
+from intent_detector import detect_intent
+from query_assistant import retrieve_chunks
+from benchmark_rerank import load_golden
+
+def collect_pairs(golden, index_path, mapping_path, pool):
+    # Candidate passages come from the current pipeline, so both backends rerank exactly the same pairs
+    pairs = []
+    for item in golden:
+        chunks = retrieve_chunks(item["query"], index_path, mapping_path, k=pool, rerank_policy="exhaustive") or []
+        query = item["query"].strip().replace("?", "").replace("!", "")
+        pairs.append([[query, c["content"]] for c in chunks])
+    return pairs
+
+def run_backend(backend, golden, pairs, batch_size):
+    set_model_backend(backend)
+    # Load and warm outside the timed region
+    detect_intent(golden[0]["query"])
+    get_model("reranker").predict([["warmup", "warmup passage"]])
+
+    start = time.perf_counter()
+    intents = [detect_intent(item["query"])["intent"] for item in golden]
+    intent_seconds = time.perf_counter() - start
+
+    reranker = get_model("reranker")
+    start = time.perf_counter()
+    scores = [np.asarray(reranker.predict(p, batch_size=batch_size)) if p else np.zeros(0) for p in pairs]
+    rerank_seconds = time.perf_counter() - start
+    return intents, intent_seconds, scores, rerank_seconds
+
+def rank_agreement(reference, candidate, top):
+    top1, overlap, spearman = [], [], []
+    for ref, cand in zip(reference, candidate):
+        if len(ref) < 2:
+            continue
+        ref_order, cand_order = np.argsort(-ref), np.argsort(-cand)
+        top1.append(ref_order[0] == cand_order[0])
+        overlap.append(len(set(ref_order[:top]) & set(cand_order[:top])) / min(top, len(ref)))
+        spearman.append(np.corrcoef(np.argsort(ref_order), np.argsort(cand_order))[0, 1])
+    return float(np.mean(top1)), float(np.mean(overlap)), float(np.mean(spearman))
+
+def main():
+    parser = argparse.ArgumentParser(description="Parity and throughput of the int8 ONNX backend against PyTorch for the NLI classifier and cross-encoder.")
+    parser.add_argument("--golden", default="golden_queries.json")
+    parser.add_argument("--index", default="faq_index.faiss")
+    parser.add_argument("--mapping", default="chunks_mapping.json")
+    parser.add_argument("--pool", type=int, default=50, help="Candidate passages reranked per query")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--min-intent-agreement", type=float, default=0.9)
+    parser.add_argument("--min-top-overlap", type=float, default=0.8)
+    args = parser.parse_args()
+
+    golden = load_golden(args.golden)
+    set_model_backend("torch")
+    pairs = collect_pairs(golden, args.index, args.mapping, args.pool)
+    pair_count = sum(len(p) for p in pairs)
+
+    results = {backend: run_backend(backend, golden, pairs, args.batch_size) for backend in ("torch", "onnx")}
+    set_model_backend("torch")
+
+    print(f"\n{len(golden)} queries, {pair_count} rerank pairs, batch size {args.batch_size}\n")
+    print(f"{'backend':<8} | {'intents/s':>9} | {'ms/intent':>9} | {'pairs/s':>8} | {'ms/query rerank':>15}")
+    print("-" * 62)
+    for backend, (_, intent_seconds, _, rerank_seconds) in results.items():
+        print(f"{backend:<8} | {len(golden) / intent_seconds:>9.1f} | {1000 * intent_seconds / len(golden):>9.1f} | {pair_count / rerank_seconds:>8.1f} | {1000 * rerank_seconds / len(golden):>15.1f}")
+
+    torch_intents, _, torch_scores, _ = results["torch"]
+    onnx_intents, _, onnx_scores, _ = results["onnx"]
+    intent_agreement = float(np.mean([a == b for a, b in zip(torch_intents, onnx_intents)]))
+    top1, overlap, spearman = rank_agreement(torch_scores, onnx_scores, args.top)
+    print(f"\nIntent label agreement: {intent_agreement:.3f}")
+    print(f"Rerank top-1 agreement: {top1:.3f} | top-{args.top} overlap: {overlap:.3f} | Spearman: {spearman:.3f}")
+    for item, a, b in zip(golden, torch_intents, onnx_intents):
+        if a != b:
+            print(f"  intent differs: '{item['query']}' torch={a} onnx={b}")
+
+    # Raised rather than asserted so the check still fails under python -O
+    if intent_agreement < args.min_intent_agreement:
+        raise AssertionError(f"ONNX parity: intent agreement {intent_agreement:.3f} is below {args.min_intent_agreement}")
+    if overlap < args.min_top_overlap:
+        raise AssertionError(f"ONNX parity: rerank top-{args.top} overlap {overlap:.3f} is below {args.min_top_overlap}")
+    print("Parity check passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import time
+
+import numpy as np
+
+import intent_detector
+from inference_scheduler import set_concurrent_stages
+from main_assistant import run_pipeline_stream, speculation_stats
+from benchmark_rerank import load_golden
+
+ACTION_QUERIES = [
+    "My laptop is broken, please raise a ticket",
+    "Please reset my password for SAP",
+    "Schedule a meeting with the HR team tomorrow",
+    "I need access to the finance shared drive",
+]
+
+def run_turn(query):
+    # Fresh intent caches so both modes pay for the same model calls
+    intent_detector._embedding_intent.cache_clear()
+    intent_detector._message_embedding.cache_clear()
+    start = time.perf_counter()
+    sources_ms = None
+    for event in run_pipeline_stream(query):
+        if event["type"] == "status" and event["stage"] == "sources":
+            sources_ms = (time.perf_counter() - start) * 1000.0
+    return event, (time.perf_counter() - start) * 1000.0, sources_ms
+
+def main():
+    parser = argparse.ArgumentParser(description="Wall-clock per turn with sequential vs concurrent pipeline stages, and output equality.")
+    parser.add_argument("--golden", default="golden_queries.json")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    queries = [item["query"] for item in load_golden(args.golden)] + ACTION_QUERIES
+    # Load every model outside the timed runs
+    run_turn(queries[0])
+    run_turn(ACTION_QUERIES[0])
+
+    timings = {False: ([], []), True: ([], [])}
+    outputs = {False: [], True: []}
+    for _ in range(args.repeats):
+        for concurrent in (False, True):
+            set_concurrent_stages(concurrent)
+            for query in queries:
+                final, turn_ms, sources_ms = run_turn(query)
+                timings[concurrent][0].append(turn_ms)
+                if sources_ms is not None:
+                    timings[concurrent][1].append(sources_ms)
+                outputs[concurrent].append((final["output"], final["next_step"], final["intent"]))
+    set_concurrent_stages(True)
+
+    print(f"\n{len(queries)} queries x {args.repeats} repeats\n")
+    print(f"{'stages':<10} | {'turn mean ms':>12} | {'turn p50 ms':>11} | {'to sources mean ms':>18}")
+    print("-" * 62)
+    for concurrent in (False, True):
+        turns, sources = timings[concurrent]
+        print(f"{'concurrent' if concurrent else 'sequential':<10} | {np.mean(turns):>12.1f} | {np.percentile(turns, 50):>11.1f} | {np.mean(sources):>18.1f}")
+    saved = np.mean(timings[False][0]) - np.mean(timings[True][0])
+    print(f"\nSaved per turn: {saved:.1f} ms ({100 * saved / np.mean(timings[False][0]):.1f}%)")
+    identical = sum(a == b for a, b in zip(outputs[False], outputs[True]))
+    print(f"Identical outputs: {identical}/{len(outputs[False])}")
+    print(f"Speculative retrieval: {speculation_stats()}")
+
+if __name__ == "__main__":
+    main()
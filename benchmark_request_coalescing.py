@@ -0,0 +1,60 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+
+import intent_detector
+from inference_scheduler import set_request_coalescing, coalescing_stats
+from main_assistant import run_pipeline
+from response_cache import clear_response_cache
+from benchmark_rerank import load_golden
+
+def burst(query, size):
+    # `size` sessions send the same question at the same moment
+    outputs, latencies = [None] * size, [None] * size
+    barrier = threading.Barrier(size)
+    def session(i):
+        barrier.wait()
+        start = time.perf_counter()
+        outputs[i] = run_pipeline(query)
+        latencies[i] = (time.perf_counter() - start) * 1000.0
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(size)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outputs, latencies, time.perf_counter() - start
+
+def saved(before, after):
+    return {group: after[group]["coalesced"] - before.get(group, {}).get("coalesced", 0) for group in after}
+
+def main():
+    parser = argparse.ArgumentParser(description="Bursts of identical concurrent questions with and without in-flight request coalescing.")
+    parser.add_argument("--golden", default="golden_queries.json")
+    parser.add_argument("--burst", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=3)
+    args = parser.parse_args()
+
+    queries = [item["query"] for item in load_golden(args.golden)][:args.queries]
+    # Load every model outside the timed runs
+    run_pipeline(queries[0])
+
+    print(f"{'coalescing':<10} | {'query':<40} | {'burst s':>7} | {'p95 ms':>8} | same | computations saved")
+    print("-" * 110)
+    for query in queries:
+        for enabled in (False, True):
+            set_request_coalescing(enabled)
+            # Every burst starts cold, so the response caches cannot stand in for coalescing
+            clear_response_cache()
+            intent_detector._embedding_intent.cache_clear()
+            intent_detector._message_embedding.cache_clear()
+            before = coalescing_stats()
+            outputs, latencies, seconds = burst(query, args.burst)
+            same = all(output == outputs[0] for output in outputs)
+            print(f"{'on' if enabled else 'off':<10} | {query[:40]:<40} | {seconds:>7.2f} | {np.percentile(latencies, 95):>8.1f} | {str(same):<4} | {saved(before, coalescing_stats()) if enabled else ''}")
+    set_request_coalescing(True)
+
+if __name__ == "__main__":
+    main()
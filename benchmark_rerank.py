@@ -0,0 +1,88 @@
+import argparse
+import itertools
+import json
+import os
+import time
+
+from model_registry import get_model, replace_model
+from query_assistant import retrieve_chunks
+
+def load_golden(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+class CountingReranker:
+    def __init__(self, model):
+        self.model = model
+        self.pairs = 0
+
+    def predict(self, pairs, **kwargs):
+        self.pairs += len(pairs)
+        return self.model.predict(pairs, **kwargs)
+
+def run_setting(golden, index_path, mapping_path, k, policy, counter):
+    latencies, results = [], []
+    counter.pairs = 0
+    for item in golden:
+        start = time.perf_counter()
+        chunks = retrieve_chunks(item["query"], index_path, mapping_path, k=k, intent=item.get("intent"), rerank_policy=policy) or []
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        results.append(chunks)
+    return results, latencies, counter.pairs / max(len(golden), 1)
+
+def recall_at_k(results, reference, golden, k):
+    id_recall, page_recall, page_queries = 0.0, 0.0, 0
+    for got, ref, item in zip(results, reference, golden):
+        ref_ids = {c['chunk_id'] for c in ref[:k]}
+        got_ids = {c['chunk_id'] for c in got[:k]}
+        id_recall += len(ref_ids & got_ids) / max(len(ref_ids), 1)
+        if item.get("relevant_pages"):
+            pages = set(item["relevant_pages"])
+            page_recall += len(pages & {c['page_number'] for c in got[:k]}) / len(pages)
+            page_queries += 1
+    page_value = page_recall / page_queries if page_queries else None
+    return id_recall / max(len(golden), 1), page_value
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs latency report for cascade rerank settings.")
+    parser.add_argument("--golden", default="golden_queries.json")
+    parser.add_argument("--index", default="faq_index.faiss")
+    parser.add_argument("--mapping", default="chunks_mapping.json")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[40, 80, 120, 200, 300])
+    parser.add_argument("--margins", type=float, nargs="+", default=[1.0, 2.0, 3.0])
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    golden = load_golden(os.path.join(base_dir, args.golden))
+    counter = CountingReranker(get_model("reranker"))
+    replace_model("reranker", counter)
+
+    # Warm caches so the first setting does not pay index loading
+    retrieve_chunks(golden[0]["query"], args.index, args.mapping, k=args.k)
+
+    # The exhaustive 300-pair rerank is the reference ranking
+    reference, ref_latencies, ref_pairs = run_setting(golden, args.index, args.mapping, args.k, "exhaustive", counter)
+    rows = [("exhaustive", 300, None, 1.0, None, ref_pairs, percentile(ref_latencies, 0.5), percentile(ref_latencies, 0.95))]
+
+    for pool_size, margin in itertools.product(args.pool_sizes, args.margins + [None]):
+        policy = {"pool_size": pool_size, "batch_size": args.batch_size, "min_scored": min(pool_size, 2 * args.k), "stop_margin": margin}
+        results, latencies, pairs = run_setting(golden, args.index, args.mapping, args.k, policy, counter)
+        recall, page_recall = recall_at_k(results, reference, golden, args.k)
+        rows.append(("cascade", pool_size, margin, recall, page_recall, pairs, percentile(latencies, 0.5), percentile(latencies, 0.95)))
+
+    replace_model("reranker", counter.model)
+    print(f"{'setting':<10} | {'pool':>4} | {'margin':>6} | {f'recall@{args.k}':>9} | {'page rec':>8} | {'pairs/q':>7} | {'p50 ms':>8} | {'p95 ms':>8}")
+    print("-" * 82)
+    for name, pool, margin, recall, page_recall, pairs, p50, p95 in rows:
+        margin_str = "-" if margin is None else f"{margin:.1f}"
+        page_str = "-" if page_recall is None else f"{page_recall:.3f}"
+        print(f"{name:<10} | {pool:>4} | {margin_str:>6} | {recall:>9.3f} | {page_str:>8} | {pairs:>7.1f} | {p50:>8.1f} | {p95:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+import re
+
+import numpy as np
+
+IMPORTANT_NAMES = ["vijaykumar", "roshni", "nadar", "hcltech", "hcl software", "hcl", "vijayakumar", "shiv", "walia", "inspeq", "ethisphere", "forbes", "newsweek", "microsoft", "google", "dell", "intel", "subsidiary", "india", "incorporated", "financial", "asset", "capital"]
+
+BOILERPLATE_KEYWORDS = ["forward-looking", "terms of use", "table of contents", "index", "notice of", "cautionary", "disclaimer"]
+
+FACTUAL_QUERY_TRIGGERS = ["revenue", "profit", "report", "rsus", "payment", "date", "incorporate", "company", "what is"]
+
+NUMBER_PATTERN = re.compile(r'\d{2,}')
+
+SHORT_CHUNK_WORDS = 40
+
+KEYWORD_HIT_CAP = 3
+
+# Each rule adds weight * signal to a candidate's rerank score. "query_triggers" limits a rule to
+# queries containing one of the phrases; "cap" clips the signal before weighting.
+BOOST_RULES = [
+    {"signal": "name_matches", "weight": 12.0},
+    {"signal": "number_matches", "weight": 10.0},
+    {"signal": "boilerplate", "weight": -10.0, "query_triggers": FACTUAL_QUERY_TRIGGERS},
+    {"signal": "short_chunk", "weight": -5.0, "query_triggers": FACTUAL_QUERY_TRIGGERS},
+    {"signal": "keyword_hits", "weight": 1.5, "cap": KEYWORD_HIT_CAP},
+    {"signal": "exact_phrase", "weight": 25.0},
+]
+
+class ChunkFeatures:
+    def __init__(self, names, name_bits, boilerplate, word_count, number_ids, number_postings, number_offsets):
+        self.names = names
+        self.name_bits = name_bits
+        self.boilerplate = boilerplate
+        self.word_count = word_count
+        self.number_ids = number_ids
+        self.number_postings = number_postings
+        self.number_offsets = number_offsets
+
+    @classmethod
+    def from_chunks(cls, chunks, names=None):
+        names = list(names or IMPORTANT_NAMES)
+        count = len(chunks)
+        presence = np.zeros((count, len(names)), dtype=bool)
+        boilerplate = np.zeros(count, dtype=bool)
+        word_count = np.zeros(count, dtype=np.int32)
+        number_rows = {}
+        for row in range(count):
+            content = chunks[row]['content']
+            content_lower = content.lower()
+            presence[row] = [name in content_lower for name in names]
+            boilerplate[row] = any(bk in content_lower for bk in BOILERPLATE_KEYWORDS)
+            word_count[row] = len(content.split())
+            for number in set(NUMBER_PATTERN.findall(content)):
+                number_rows.setdefault(number, []).append(row)
+        number_offsets = np.zeros(len(number_rows) + 1, dtype=np.int64)
+        number_offsets[1:] = np.cumsum([len(rows) for rows in number_rows.values()])
+        number_postings = np.fromiter((r for rows in number_rows.values() for r in rows), dtype=np.int32, count=int(number_offsets[-1]))
+        number_ids = {n: i for i, n in enumerate(number_rows)}
+        return cls(names, np.packbits(presence, axis=1), boilerplate, word_count, number_ids, number_postings, number_offsets)
+
+    @staticmethod
+    def path_for(base_path):
+        return base_path + ".features.npz"
+
+    def save(self, base_path):
+        np.savez(
+            self.path_for(base_path),
+            names=np.array(self.names, dtype=str),
+            name_bits=self.name_bits,
+            boilerplate=self.boilerplate,
+            word_count=self.word_count,
+            number_vocab=np.array(list(self.number_ids), dtype=str),
+            number_postings=self.number_postings,
+            number_offsets=self.number_offsets,
+        )
+
+    @classmethod
+    def load(cls, base_path):
+        path = cls.path_for(base_path)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            names = data["names"].tolist()
+            # Features built against a different name list are stale; the caller rebuilds them
+            if names != IMPORTANT_NAMES:
+                return None
+            number_ids = {n: i for i, n in enumerate(data["number_vocab"].tolist())}
+            return cls(names, data["name_bits"], data["boilerplate"], data["word_count"], number_ids, data["number_postings"], data["number_offsets"])
+
+    def name_matches(self, query_lower, rows):
+        query_names = np.array([name in query_lower for name in self.names], dtype=np.int32)
+        if not query_names.any():
+            return np.zeros(len(rows), dtype=np.int32)
+        presence = np.unpackbits(self.name_bits[rows], axis=1, count=len(self.names))
+        return presence.astype(np.int32) @ query_names
+
+    def number_matches(self, query, rows):
+        counts = np.zeros(len(rows), dtype=np.int32)
+        for number in re.findall(r'\b\d{2,}\b', query):
+            nid = self.number_ids.get(number)
+            if nid is None:
+                continue
+            plist = self.number_postings[self.number_offsets[nid]:self.number_offsets[nid + 1]]
+            pos = np.minimum(np.searchsorted(plist, rows), len(plist) - 1)
+            counts += plist[pos] == rows
+        return counts
+
+def compute_boosts(features, rows, query_clean, contents, keyword_hits):
+    rows = np.asarray(rows, dtype=np.int64)
+    query_lower = query_clean.lower()
+    signals = {
+        "name_matches": lambda: features.name_matches(query_lower, rows),
+        "number_matches": lambda: features.number_matches(query_clean, rows),
+        "boilerplate": lambda: features.boilerplate[rows],
+        "short_chunk": lambda: features.word_count[rows] < SHORT_CHUNK_WORDS,
+        "keyword_hits": lambda: np.asarray(keyword_hits),
+        "exact_phrase": lambda: np.fromiter((query_lower in c.lower() for c in contents), dtype=bool, count=len(rows)),
+    }
+    boosts = np.zeros(len(rows), dtype=np.float64)
+    for rule in BOOST_RULES:
+        triggers = rule.get("query_triggers")
+        if triggers and not any(t in query_lower for t in triggers):
+            continue
+        signal = signals[rule["signal"]]().astype(np.float64)
+        if "cap" in rule:
+            signal = np.minimum(signal, rule["cap"])
+        boosts += rule["weight"] * signal
+    return boosts
@@ -0,0 +1,127 @@
+import json
+import mmap
+import os
+import sys
+
+import numpy as np
+
+import faiss
+
+from lexical_index import LexicalIndex
+
+from chunk_features import ChunkFeatures
+
+STORE_FORMAT_VERSION = 1
+
+def store_base_path(mapping_path):
+    return os.path.splitext(mapping_path)[0]
+
+def _paths(base_path):
+    return base_path + ".store.json", base_path + ".meta.npy", base_path + ".text.bin"
+
+def store_exists(base_path):
+    return all(os.path.exists(p) for p in _paths(base_path))
+
+def write_chunk_store(chunks, base_path):
+    header_path, meta_path, text_path = _paths(base_path)
+    sections, documents = {}, {}
+    id_width = max([len(c.get("chunk_id", "").encode("utf-8")) for c in chunks] + [1])
+    meta = np.zeros(len(chunks), dtype=[
+        ("page_number", "<i4"),
+        ("section_id", "<i4"),
+        ("doc_id", "<i4"),
+        ("word_count", "<i4"),
+        ("text_offset", "<i8"),
+        ("text_length", "<i4"),
+        ("chunk_id", f"S{id_width}"),
+    ])
+    offset = 0
+    with open(text_path, "wb") as blob:
+        for row, chunk in enumerate(chunks):
+            data = chunk["content"].encode("utf-8")
+            blob.write(data)
+            doc_key = (chunk.get("doc_title", ""), chunk.get("version", ""))
+            meta[row] = (
+                chunk.get("page_number", 0),
+                sections.setdefault(chunk.get("section", "N/A"), len(sections)),
+                documents.setdefault(doc_key, len(documents)),
+                chunk.get("word_count", len(chunk["content"].split())),
+                offset,
+                len(data),
+                chunk.get("chunk_id", str(row)).encode("utf-8"),
+            )
+            offset += len(data)
+    np.save(meta_path, meta)
+    header = {
+        "format_version": STORE_FORMAT_VERSION,
+        "count": len(chunks),
+        "sections": list(sections),
+        "documents": [list(d) for d in documents],
+    }
+    with open(header_path, "w", encoding="utf-8") as f:
+        json.dump(header, f, indent=2)
+    LexicalIndex.from_chunks(chunks).save(base_path)
+    ChunkFeatures.from_chunks(chunks).save(base_path)
+
+class ChunkStore:
+    def __init__(self, base_path):
+        header_path, meta_path, text_path = _paths(base_path)
+        with open(header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("format_version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported chunk store version {header.get('format_version')} in {header_path}.")
+        self.base_path = base_path
+        self.sections = header["sections"]
+        self.documents = header["documents"]
+        # Both files are mapped read-only, so worker processes share the same page-cache pages
+        self.meta = np.load(meta_path, mmap_mode="r")
+        self._text_file = open(text_path, "rb")
+        self._text = mmap.mmap(self._text_file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(text_path) else b""
+
+    def __len__(self):
+        return len(self.meta)
+
+    def content(self, row):
+        record = self.meta[row]
+        start = int(record["text_offset"])
+        return self._text[start:start + int(record["text_length"])].decode("utf-8")
+
+    def __getitem__(self, row):
+        record = self.meta[row]
+        doc_title, version = self.documents[int(record["doc_id"])]
+        return {
+            "doc_title": doc_title,
+            "page_number": int(record["page_number"]),
+            "section": self.sections[int(record["section_id"])],
+            "chunk_id": record["chunk_id"].decode("utf-8"),
+            "version": version,
+            "content": self.content(row),
+            "word_count": int(record["word_count"]),
+        }
+
+    def close(self):
+        if isinstance(self._text, mmap.mmap):
+            self._text.close()
+        self._text_file.close()
+
+def read_index_mmap(index_path):
+    # IO_FLAG_MMAP only maps inverted lists, so it suits IVF indexes; flat, SQ and HNSW storage is only left in
+    # the page cache (and shared between workers) with IO_FLAG_MMAP_IFC, which plain IO_FLAG_MMAP copies to the heap
+    with open(index_path, "rb") as f:
+        fourcc = f.read(4)
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if fourcc[:2] in (b"Iw", b"Iv") else faiss.IO_FLAG_MMAP_IFC
+    try:
+        return faiss.read_index(index_path, flags)
+    except RuntimeError:
+        # Index types neither flag can map; fall back to a regular read
+        return faiss.read_index(index_path)
+
+if __name__ == "__main__":
+    mapping_file = sys.argv[1] if len(sys.argv) > 1 else "chunks_mapping.json"
+    if os.path.exists(mapping_file):
+        with open(mapping_file, "r", encoding="utf-8") as f:
+            mapping = json.load(f)
+        write_chunk_store(mapping, store_base_path(mapping_file))
+        print(f"Wrote chunk store for {len(mapping)} chunks to {store_base_path(mapping_file)}.*")
+    else:
+        print(f"Error: {mapping_file} not found.")
@@ -0,0 +1,85 @@
+import copy
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+from nlu_stage import NLU_TASKS, analyze_message
+from intent_detector import message_embedding
+
+MAX_SESSIONS = 500
+# The pipeline looks back five messages; a few more cover repeated questions without growing without bound
+MAX_MESSAGES_PER_SESSION = 20
+
+class ConversationState:
+    # What the pipeline learned about each user message of one conversation: NLU results per task and the
+    # message embedding, computed the first time the message is seen and read back on every later turn
+    def __init__(self, session_id=None):
+        self.session_id = session_id
+        self.messages = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def analysis(self, text, tasks=NLU_TASKS):
+        with self.lock:
+            record = self.messages.get(text, {})
+            missing = tuple(task for task in tasks if task not in record)
+        if missing:
+            fresh = analyze_message(text, tasks=missing)
+            fresh.setdefault("embedding", record.get("embedding"))
+            if fresh["embedding"] is None:
+                fresh["embedding"] = message_embedding(text)
+        with self.lock:
+            record = self.messages.pop(text, record)
+            if missing:
+                record.update(fresh)
+                self.misses += 1
+            else:
+                self.hits += 1
+            self.messages[text] = record
+            while len(self.messages) > MAX_MESSAGES_PER_SESSION:
+                self.messages.popitem(last=False)
+            # Copies, because the pipeline adjusts the intent it gets back
+            return {task: copy.deepcopy(record[task]) for task in tasks}
+
+    def embedding(self, text):
+        with self.lock:
+            record = self.messages.get(text)
+            if record and record.get("embedding") is not None:
+                return record["embedding"]
+        return message_embedding(text)
+
+    def stats(self):
+        with self.lock:
+            return {"messages": len(self.messages), "hits": self.hits, "misses": self.misses}
+
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+def conversation_state(session_id=None):
+    # Without a session id the state lives for one call, which analyses history exactly as before
+    if session_id is None:
+        return ConversationState()
+    with _sessions_lock:
+        state = _sessions.pop(session_id, None) or ConversationState(session_id)
+        _sessions[session_id] = state
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+        return state
+
+def end_session(session_id):
+    with _sessions_lock:
+        _sessions.pop(session_id, None)
+
+def session_stats():
+    with _sessions_lock:
+        states = list(_sessions.values())
+    return {"sessions": len(states), "hits": sum(s.hits for s in states), "misses": sum(s.misses for s in states)}
+
+if __name__ == "__main__":
+    state = conversation_state("demo")
+    for turn in sys.argv[1:] or ["I need a Hardware ticket", "My laptop is broken", "It is for the Finance team"]:
+        state.analysis(turn)
+    state.analysis("My laptop is broken", tasks=("intent", "entities"))
+    print(json.dumps(state.stats(), indent=2))
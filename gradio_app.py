@@ -3,7 +3,13 @@ import json
 import os
 import datetime
 import re
-from main_assistant import run_pipeline
+from main_assistant import run_pipeline_stream, start_model_warmup, readiness
+from query_assistant import reload_index, watch_index, index_handles
+from index_handle import install_reload_signal
+from inference_scheduler import set_inference_batching
+
+# Chat requests served in parallel; their NLI, sentiment, embedding and rerank calls are micro-batched together
+CHAT_CONCURRENCY_LIMIT = 8
 
 # Color Palette Variables (from user schema)
 INK_BLACK = "#0f1020"  # DEFAULT / 500
@@ -274,18 +280,37 @@ def format_meetings_display(meetings):
         """
     return html
 
-def respond(message, history):
+def reload_knowledge_base():
+    version = reload_index(background=False)
+    return f"Knowledge base version: {version}" if version else "Knowledge base not found."
+
+def readiness_status():
+    return json.dumps(readiness())
+
+def status_line(event):
+    if event["stage"] == "intent":
+        return f"_Understood as **{event['intent']}** · looking for sources…_"
+    pages = ", ".join(str(p) for p in event["pages"])
+    return f"_Found {event['count']} passages (pages {pages}) · writing the answer…_" if event["count"] else "_No matching passages found…_"
+
+def respond(message, history, request: gr.Request):
     if not message: return "", history, format_pending_actions_display(pending_actions)
     history.append({"role": "user", "content": message})
     history.append({"role": "assistant", "content": ""})
     yield "", history, format_pending_actions_display(pending_actions)
-    bot_msg_full = run_pipeline(message, history[:-2])
-    words = bot_msg_full.split()
-    streaming_msg = ""
-    for i, word in enumerate(words):
-        streaming_msg += word + " "
-        history[-1]["content"] = streaming_msg
-        if i % 3 == 0 or i == len(words) - 1: yield "", history, format_pending_actions_display(pending_actions)
+    # Status lines and generated tokens are shown as they arrive; the final event replaces them with the formatted answer
+    status, partial, bot_msg_full = "", "", ""
+    # Keyed by the browser session so earlier turns are not re-analyzed
+    session_id = request.session_hash if request else None
+    for event in run_pipeline_stream(message, history[:-2], session_id=session_id):
+        if event["type"] == "status":
+            status = status_line(event)
+        elif event["type"] == "token":
+            partial += event["text"]
+        else:
+            bot_msg_full = event["output"]
+        history[-1]["content"] = bot_msg_full or (f"{status}\n\n{partial}" if partial else status)
+        yield "", history, format_pending_actions_display(pending_actions)
     try:
         json_match = re.search(r'```json\s*\n(.*?)\n```', bot_msg_full, re.DOTALL)
         if json_match:
@@ -372,6 +397,8 @@ with gr.Blocks(title="HCLTech AI Assistant") as demo:
                 
                 gr.Button("🗑 Clear Queue", elem_classes="clear-btn")
                 res_msg = gr.Textbox(visible=False)
+                reload_btn = gr.Button("Reload Knowledge Base", visible=False)
+                readiness_btn = gr.Button("Readiness", visible=False)
 
     # Footer
     gr.HTML("<div class='footer-text'>Use via API • Built with Gradio 🤖 • Settings ⚙️</div>")
@@ -382,9 +409,19 @@ with gr.Blocks(title="HCLTech AI Assistant") as demo:
     ex2.click(handle_example, [ex2], [user_input])
     ex3.click(handle_example, [ex3], [user_input])
 
-    user_input.submit(respond, [user_input, chatbot], [user_input, chatbot, pending_output])
-    submit_btn.click(respond, [user_input, chatbot], [user_input, chatbot, pending_output])
+    # Several chats run at once so their model calls can share micro-batches
+    user_input.submit(respond, [user_input, chatbot], [user_input, chatbot, pending_output], concurrency_limit=CHAT_CONCURRENCY_LIMIT, concurrency_id="chat")
+    submit_btn.click(respond, [user_input, chatbot], [user_input, chatbot, pending_output], concurrency_limit=CHAT_CONCURRENCY_LIMIT, concurrency_id="chat")
     confirm_btn.click(confirm_action, [pending_index], [res_msg, pending_output, meetings_output, tickets_output])
+    reload_btn.click(reload_knowledge_base, None, [res_msg], api_name="reload_index")
+    readiness_btn.click(readiness_status, None, [res_msg], api_name="readiness")
 
 if __name__ == "__main__":
+    # Bind the UI right away; the knowledge base and models load in the background and answers stay extractive
+    # until the generator is up
+    start_model_warmup()
+    # Knowledge base refresh without restarting: SIGHUP, file changes, or the reload_index API endpoint
+    install_reload_signal(index_handles)
+    watch_index(interval=10.0)
+    set_inference_batching(True)
     demo.launch(server_name="127.0.0.1", allowed_paths=["C:\\"], theme=theme, css=CUSTOM_CSS)
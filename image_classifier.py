@@ -2,19 +2,13 @@ import torch
 
 import torchvision.transforms as transforms
 
-from torchvision.models import mobilenet_v2, MobileNet_V2_Weights
-
 from PIL import Image
 
 import io
 
-                                                                   
-
-weights = MobileNet_V2_Weights.DEFAULT
-
-model = mobilenet_v2(weights=weights)
+from model_registry import get_model
 
-model.eval()
+                                                                   
 
                                                        
 
@@ -22,17 +16,19 @@ CHART_CLASSES = {822, 654, 833, 527, 463}
 
 PORTRAIT_CLASSES = {434, 461, 568}                                       
 
-preprocess = weights.transforms()
-
 def classify_image(image_bytes):
 
                                                                           
 
     try:
 
+        # Loaded on the first image rather than when process_pdf is imported
+
+        model, weights = get_model("image_classifier")
+
         img = Image.open(io.BytesIO(image_bytes)).convert('RGB')
 
-        input_tensor = preprocess(img)
+        input_tensor = weights.transforms()(img)
 
         input_batch = input_tensor.unsqueeze(0)
 
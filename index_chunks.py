@@ -2,13 +2,237 @@ import json
 
 import os
 
+import sys
+
+import time
+
 import numpy as np
 
 import faiss
 
-from sentence_transformers import SentenceTransformer
+from chunk_store import write_chunk_store, store_base_path
+
+from model_registry import get_embedding_model
+
+DEFAULT_INDEX_CONFIG = {
+
+    "type": "flat",
+
+    "hnsw_m": 32,
+
+    "ef_construction": 200,
+
+    "ef_search": 128,
+
+    "nlist": None,
+
+    "nprobe": 16,
+
+    "pq_m": 48,
+
+    "pq_nbits": 8,
+
+    "train_sample": 50000,
+
+    "seed": 42
+
+}
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# Encoder assumed when an index has no manifest entry for it; faq_index.faiss was built with it
+
+DEFAULT_EMBEDDING_MODEL = "all-mpnet-base-v2"
+
+def manifest_path_for(index_path):
+
+    return os.path.splitext(index_path)[0] + ".manifest.json"
+
+def read_index_manifest(index_path):
+
+    path = manifest_path_for(index_path)
+
+    manifest = {"index_type": "flat", "metric": "l2", "build_params": {}, "search_params": {}}
+
+    if os.path.exists(path):
+
+        with open(path, 'r', encoding='utf-8') as f:
+
+            manifest = json.load(f)
+
+    manifest.setdefault("embedding_model", {"name": DEFAULT_EMBEDDING_MODEL, "normalize": False})
+
+    return manifest
+
+def validate_index_manifest(manifest, index, chunk_count):
+
+    if manifest.get("dimension", index.d) != index.d:
+
+        raise ValueError(f"Index holds {index.d}-dim vectors but its manifest records {manifest['dimension']}.")
+
+    if manifest.get("chunk_count", chunk_count) != chunk_count or index.ntotal != chunk_count:
+
+        raise ValueError(f"Index has {index.ntotal} vectors and its manifest records {manifest.get('chunk_count')} chunks, but the mapping holds {chunk_count}.")
+
+def write_index_manifest(index_path, manifest):
+
+    with open(manifest_path_for(index_path), 'w', encoding='utf-8') as f:
+
+        json.dump(manifest, f, indent=2)
+
+def build_faiss_index(embeddings, index_config=None):
+
+    config = dict(DEFAULT_INDEX_CONFIG)
+
+    config.update(index_config or {})
+
+    index_type = config["type"]
+
+    if index_type not in INDEX_TYPES:
+
+        raise ValueError(f"Unknown index type '{index_type}'. Expected one of: {', '.join(INDEX_TYPES)}.")
+
+    count, dimension = embeddings.shape
+
+    build_params = {}
+
+    search_params = {}
+
+    if index_type == "flat":
+
+        index = faiss.IndexFlatL2(dimension)
+
+    elif index_type == "hnsw":
+
+        index = faiss.IndexHNSWFlat(dimension, config["hnsw_m"])
+
+        index.hnsw.efConstruction = config["ef_construction"]
+
+        index.hnsw.efSearch = config["ef_search"]
+
+        build_params = {"hnsw_m": config["hnsw_m"], "ef_construction": config["ef_construction"]}
+
+        search_params = {"ef_search": config["ef_search"]}
+
+    else:
+
+        # Rule of thumb: ~4*sqrt(n) lists, but never fewer than 39 training points per centroid
+
+        nlist = config["nlist"] or int(4 * np.sqrt(count))
+
+        nlist = max(1, min(nlist, count // 39 or 1))
+
+        quantizer = faiss.IndexFlatL2(dimension)
+
+        if index_type == "ivf_flat":
+
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+
+            build_params = {"nlist": nlist}
+
+        else:
+
+            pq_m = config["pq_m"]
+
+            if dimension % pq_m != 0:
+
+                raise ValueError(f"pq_m={pq_m} must divide the embedding dimension {dimension}.")
+
+            pq_nbits = min(config["pq_nbits"], max(1, int(np.log2(count))))
 
-def create_index(chunks_path, index_output_path, mapping_output_path):
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, pq_nbits)
+
+            build_params = {"nlist": nlist, "pq_m": pq_m, "pq_nbits": pq_nbits}
+
+        sample_size = min(count, config["train_sample"])
+
+        rng = np.random.default_rng(config["seed"])
+
+        sample = embeddings[np.sort(rng.choice(count, size=sample_size, replace=False))]
+
+        print(f"Training {index_type} index on {sample_size} sampled vectors...")
+
+        index.train(sample)
+
+        index.nprobe = min(config["nprobe"], nlist)
+
+        build_params["train_sample"] = sample_size
+
+        search_params = {"nprobe": index.nprobe}
+
+    index.add(embeddings)
+
+    manifest = {
+
+        "index_type": index_type,
+
+        "metric": "l2",
+
+        "dimension": dimension,
+
+        "build_params": build_params,
+
+        "search_params": search_params
+
+    }
+
+    return index, manifest
+
+def make_search_params(index, search_params=None, selector=None):
+
+    search_params = search_params or {}
+
+    if isinstance(index, faiss.IndexHNSW):
+
+        params = faiss.SearchParametersHNSW()
+
+        if "ef_search" in search_params:
+
+            params.efSearch = int(search_params["ef_search"])
+
+        else:
+
+            params.efSearch = index.hnsw.efSearch
+
+    elif faiss.try_extract_index_ivf(index) is not None:
+
+        params = faiss.SearchParametersIVF()
+
+        params.nprobe = int(search_params.get("nprobe", faiss.try_extract_index_ivf(index).nprobe))
+
+    elif selector is not None:
+
+        params = faiss.SearchParameters()
+
+    else:
+
+        return None
+
+    if selector is not None:
+
+        params.sel = selector
+
+    elif not search_params:
+
+        return None
+
+    return params
+
+def apply_default_search_params(index, manifest):
+
+    defaults = manifest.get("search_params", {})
+
+    if isinstance(index, faiss.IndexHNSW) and "ef_search" in defaults:
+
+        index.hnsw.efSearch = int(defaults["ef_search"])
+
+    ivf = faiss.try_extract_index_ivf(index)
+
+    if ivf is not None and "nprobe" in defaults:
+
+        ivf.nprobe = int(defaults["nprobe"])
+
+def create_index(chunks_path, index_output_path, mapping_output_path, index_config=None, embedding_model=DEFAULT_EMBEDDING_MODEL, normalize=False):
 
     print(f"Loading chunks from {chunks_path}...")
 
@@ -18,9 +242,9 @@ def create_index(chunks_path, index_output_path, mapping_output_path):
 
     
 
-    print("Initializing embedding model...")
+    print(f"Initializing embedding model {embedding_model}...")
 
-    model = SentenceTransformer('all-mpnet-base-v2')
+    model = get_embedding_model(embedding_model)
 
     
 
@@ -30,27 +254,37 @@ def create_index(chunks_path, index_output_path, mapping_output_path):
 
     print(f"Generating embeddings for {len(texts)} chunks...")
 
-    embeddings = model.encode(texts, show_progress_bar=True)
+    start = time.time()
+
+    embeddings = model.encode(texts, show_progress_bar=True, normalize_embeddings=normalize)
 
     embeddings = np.array(embeddings).astype('float32')
 
     
 
-    dimension = embeddings.shape[1]
+    print(f"Building {(index_config or {}).get('type', DEFAULT_INDEX_CONFIG['type'])} index...")
 
-    index = faiss.IndexFlatL2(dimension)
+    index, manifest = build_faiss_index(embeddings, index_config)
 
-    
+    manifest["embedding_model"] = {"name": embedding_model, "normalize": normalize}
 
-    print("Adding embeddings to index...")
+    manifest["chunk_count"] = len(chunks)
 
-    index.add(embeddings)
+    manifest["built_at"] = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+
+    manifest["build_seconds"] = round(time.time() - start, 2)
 
     
 
     print(f"Saving index to {index_output_path}...")
 
-    faiss.write_index(index, index_output_path)
+    # Written beside the old file and renamed over it: workers serving the old index have it memory-mapped
+
+    faiss.write_index(index, index_output_path + ".tmp")
+
+    os.replace(index_output_path + ".tmp", index_output_path)
+
+    write_index_manifest(index_output_path, manifest)
 
     
 
@@ -60,16 +294,24 @@ def create_index(chunks_path, index_output_path, mapping_output_path):
 
     
 
+    print(f"Writing binary chunk store to {store_base_path(mapping_output_path)}.*...")
+
+    write_chunk_store(chunks, store_base_path(mapping_output_path))
+
+    
+
     print("Indexing complete.")
 
 def search_index(query, index_path, mapping_path, k=5):
 
     print(f"Searching for: '{query}'")
 
-    model = SentenceTransformer('all-mpnet-base-v2')
-
     index = faiss.read_index(index_path)
 
+    encoder = read_index_manifest(index_path)["embedding_model"]
+
+    model = get_embedding_model(encoder["name"])
+
     
 
     with open(mapping_path, 'r', encoding='utf-8') as f:
@@ -78,7 +320,7 @@ def search_index(query, index_path, mapping_path, k=5):
 
     
 
-    query_vector = model.encode([query]).astype('float32')
+    query_vector = model.encode([query], normalize_embeddings=encoder["normalize"]).astype('float32')
 
     distances, indices = index.search(query_vector, k)
 
@@ -114,9 +356,15 @@ if __name__ == "__main__":
 
     
 
+    index_type = sys.argv[1] if len(sys.argv) > 1 else "flat"
+
+    embedding_model = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_EMBEDDING_MODEL
+
+    
+
     if os.path.exists(chunks_file):
 
-        create_index(chunks_file, index_file, mapping_file)
+        create_index(chunks_file, index_file, mapping_file, index_config={"type": index_type}, embedding_model=embedding_model)
 
         
 
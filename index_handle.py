@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import re
+import signal
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+from lexical_index import LexicalIndex
+from chunk_features import ChunkFeatures
+from chunk_store import ChunkStore, read_index_mmap, store_base_path, store_exists
+from index_chunks import read_index_manifest, validate_index_manifest, apply_default_search_params, manifest_path_for
+
+def section_matches(section, section_filter):
+    # Filters are section-name prefixes ("Human" -> "Human Resources"); short ones like "HR" must match a whole word
+    pattern = rf"\b{re.escape(section_filter)}\b" if len(section_filter) <= 3 else rf"\b{re.escape(section_filter)}"
+    return re.search(pattern, section, re.IGNORECASE) is not None
+
+def corpus_files(index_path, mapping_path):
+    store_path = store_base_path(mapping_path)
+    files = [index_path, manifest_path_for(index_path)]
+    if store_exists(store_path):
+        files += [store_path + suffix for suffix in (".store.json", ".meta.npy", ".text.bin", ".lexical.npz", ".features.npz")]
+    else:
+        files.append(mapping_path)
+    return files
+
+def corpus_fingerprint(index_path, mapping_path):
+    # Derived from file metadata only, so every worker looking at the same files agrees on the version
+    digest = hashlib.sha1()
+    for path in corpus_files(index_path, mapping_path):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+def _array_bytes(obj):
+    return sum(value.nbytes for value in vars(obj).values() if isinstance(value, np.ndarray))
+
+class LoadedCorpus:
+    def __init__(self, index_path, mapping_path):
+        self.index_path = index_path
+        self.mapping_path = mapping_path
+        self.version = corpus_fingerprint(index_path, mapping_path)
+        self.manifest = read_index_manifest(index_path)
+        self.index = read_index_mmap(index_path)
+        apply_default_search_params(self.index, self.manifest)
+        store_path = store_base_path(mapping_path)
+        if store_exists(store_path):
+            # Binary store: metadata and text stay on disk and are read lazily per row
+            self.chunks = ChunkStore(store_path)
+            self.lexical_index = LexicalIndex.load(store_path) or LexicalIndex.from_chunks(self.chunks)
+            self.features = ChunkFeatures.load(store_path) or ChunkFeatures.from_chunks(self.chunks)
+            self.sections, self.section_ids = self.chunks.sections, self.chunks.meta["section_id"]
+        else:
+            with open(mapping_path, 'r', encoding='utf-8') as f:
+                self.chunks = json.load(f)
+            self.lexical_index = LexicalIndex.from_chunks(self.chunks)
+            self.features = ChunkFeatures.from_chunks(self.chunks)
+            sections = {}
+            self.section_ids = np.array([sections.setdefault(c.get('section', 'N/A'), len(sections)) for c in self.chunks], dtype=np.int32)
+            self.sections = list(sections)
+        # A manifest that disagrees with the files means a half-finished or mixed-up rebuild; refuse to serve it
+        validate_index_manifest(self.manifest, self.index, len(self.chunks))
+        self.loaded_at = time.time()
+        self._section_rows = {}
+        # Approximate resident size: mapped files count at their full size since they end up in the page cache
+        chunk_files = [mapping_path] if isinstance(self.chunks, list) else [store_path + ".meta.npy", store_path + ".text.bin"]
+        self.nbytes = sum(os.path.getsize(p) for p in [index_path] + chunk_files if os.path.exists(p)) + _array_bytes(self.lexical_index) + _array_bytes(self.features)
+
+    def filtered_rows(self, section_filter):
+        rows = self._section_rows.get(section_filter)
+        if rows is None:
+            matching = [i for i, name in enumerate(self.sections) if section_matches(name, section_filter)]
+            rows = np.nonzero(np.isin(self.section_ids, matching))[0].astype('int64')
+            self._section_rows[section_filter] = rows
+        return rows
+
+class IndexHandle:
+    def __init__(self, index_path, mapping_path, corpus_id=None):
+        self.index_path = index_path
+        self.mapping_path = mapping_path
+        self.corpus_id = corpus_id
+        self._current = None
+        self._load_lock = threading.Lock()
+        self._watcher = None
+        self._stop_watch = threading.Event()
+        self.reload_count = 0
+        self.last_error = None
+        self._failed_fingerprint = None
+
+    @property
+    def version(self):
+        return self._current.version if self._current is not None else None
+
+    @property
+    def loaded(self):
+        return self._current is not None
+
+    def acquire(self):
+        # Callers keep the returned snapshot for the whole request, so a concurrent swap never changes it mid-query
+        current = self._current
+        if current is None:
+            with self._load_lock:
+                if self._current is None:
+                    self._current = LoadedCorpus(self.index_path, self.mapping_path)
+                current = self._current
+        return current
+
+    def reload(self, background=True, force=False):
+        if background:
+            thread = threading.Thread(target=self.reload, kwargs={"background": False, "force": force}, daemon=True)
+            thread.start()
+            return thread
+        with self._load_lock:
+            if self._current is None:
+                # Nothing is being served yet; the next acquire() reads the current files anyway
+                return None
+            fingerprint = corpus_fingerprint(self.index_path, self.mapping_path)
+            if not force and self._current is not None and self._current.version == fingerprint:
+                return self._current.version
+            try:
+                loaded = LoadedCorpus(self.index_path, self.mapping_path)
+            except Exception as e:
+                # Keep serving the previous version if the new files are incomplete or invalid
+                self.last_error = str(e)
+                self._failed_fingerprint = fingerprint
+                print(f"Warning: Index reload failed, keeping version {self.version}. Error: {e}")
+                return self.version
+            previous = self.version
+            self._current = loaded
+            self.reload_count += 1
+            self.last_error = None
+            print(f"Index reloaded: {previous} -> {loaded.version}")
+            return loaded.version
+
+    def unload(self):
+        # Snapshots already handed out stay valid; they are released once their last reader drops them
+        with self._load_lock:
+            current, self._current = self._current, None
+        return current
+
+    def watch(self, interval=10.0):
+        if self._watcher is not None:
+            return self._watcher
+
+        def poll():
+            pending = None
+            while not self._stop_watch.wait(interval):
+                fingerprint = corpus_fingerprint(self.index_path, self.mapping_path)
+                if self._current is None or fingerprint in (self._current.version, self._failed_fingerprint):
+                    pending = None
+                elif fingerprint == pending:
+                    # Files were stable for a full interval, so a rebuild has finished writing
+                    self.reload(background=False)
+                    pending = None
+                else:
+                    pending = fingerprint
+
+        self._stop_watch.clear()
+        self._watcher = threading.Thread(target=poll, daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stop_watching(self):
+        self._stop_watch.set()
+        self._watcher = None
+
+class IndexRegistry:
+    def __init__(self, max_bytes=None, max_corpora=None):
+        self.max_bytes = max_bytes
+        self.max_corpora = max_corpora
+        self._lock = threading.Lock()
+        self._handles = {}
+        self._resident = OrderedDict()
+        self._refcounts = {}
+        self._stats = {}
+
+    def register(self, corpus_id, index_path, mapping_path):
+        with self._lock:
+            handle = self._handles.get(corpus_id)
+            if handle is None or (handle.index_path, handle.mapping_path) != (index_path, mapping_path):
+                if handle is not None:
+                    handle.stop_watching()
+                    self._resident.pop(corpus_id, None)
+                handle = self._handles[corpus_id] = IndexHandle(index_path, mapping_path, corpus_id)
+                self._stats.setdefault(corpus_id, {"hits": 0, "misses": 0, "evictions": 0})
+            return handle
+
+    def handle(self, corpus_id):
+        with self._lock:
+            return self._handles.get(corpus_id)
+
+    def handles(self):
+        with self._lock:
+            return list(self._handles.values())
+
+    @contextmanager
+    def lease(self, corpus_id):
+        with self._lock:
+            handle = self._handles.get(corpus_id)
+            if handle is None:
+                raise KeyError(f"Unknown corpus '{corpus_id}'.")
+            self._refcounts[corpus_id] = self._refcounts.get(corpus_id, 0) + 1
+        try:
+            # Loading happens outside the registry lock so a cold corpus never blocks requests for warm ones
+            corpus = handle.acquire()
+            with self._lock:
+                stats = self._stats[corpus_id]
+                if corpus_id in self._resident:
+                    stats["hits"] += 1
+                else:
+                    stats["misses"] += 1
+                self._resident[corpus_id] = corpus.nbytes
+                self._resident.move_to_end(corpus_id)
+                self._evict()
+            yield corpus
+        finally:
+            with self._lock:
+                self._refcounts[corpus_id] -= 1
+                self._evict()
+
+    def _evict(self):
+        # Least recently used first; corpora with requests in flight are skipped, even if that leaves the pool over budget
+        total = sum(self._resident.values())
+        for corpus_id in list(self._resident):
+            over_bytes = self.max_bytes is not None and total > self.max_bytes
+            over_count = self.max_corpora is not None and len(self._resident) > self.max_corpora
+            if not (over_bytes or over_count):
+                break
+            if self._refcounts.get(corpus_id):
+                continue
+            total -= self._resident.pop(corpus_id)
+            self._handles[corpus_id].unload()
+            self._stats[corpus_id]["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                corpus_id: dict(
+                    self._stats[corpus_id],
+                    loaded=corpus_id in self._resident,
+                    bytes=self._resident.get(corpus_id, 0),
+                    in_flight=self._refcounts.get(corpus_id, 0),
+                    version=handle.version,
+                )
+                for corpus_id, handle in self._handles.items()
+            }
+
+def install_reload_signal(handles, signum=None):
+    signum = signum or getattr(signal, "SIGHUP", None)
+    if signum is None:
+        return False
+
+    def handler(received, frame):
+        for handle in handles():
+            handle.reload(background=True, force=True)
+
+    signal.signal(signum, handler)
+    return True
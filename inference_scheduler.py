@@ -0,0 +1,321 @@
+import copy
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from model_registry import get_model, get_embedding_model
+
+# Off by default: a single caller would only sit out the window. Servers handling concurrent sessions turn it on.
+INFERENCE_BATCHING = False
+INFERENCE_BATCH_WINDOW_MS = 5.0
+INFERENCE_MAX_BATCH = 32
+
+# Independent pipeline stages (sentiment next to the NLI pass, speculative retrieval next to NLU) run on a shared pool
+CONCURRENT_STAGES = True
+STAGE_WORKERS = 8
+
+# Identical requests in flight at the same time share one computation
+COALESCE_REQUESTS = True
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+_model_locks = {}
+_stage_pool = None
+
+def set_inference_batching(enabled, window_ms=None, max_batch=None):
+    global INFERENCE_BATCHING, INFERENCE_BATCH_WINDOW_MS, INFERENCE_MAX_BATCH
+    INFERENCE_BATCHING = enabled
+    if window_ms is not None:
+        INFERENCE_BATCH_WINDOW_MS = window_ms
+    if max_batch is not None:
+        INFERENCE_MAX_BATCH = max_batch
+
+def set_concurrent_stages(enabled):
+    global CONCURRENT_STAGES
+    CONCURRENT_STAGES = enabled
+
+def stage_executor():
+    global _stage_pool
+    with _batchers_lock:
+        if _stage_pool is None:
+            _stage_pool = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="stage")
+        return _stage_pool
+
+def run_stage(fn, *args, **kwargs):
+    # A future for fn(*args); with concurrent stages off it has already run in the caller's thread
+    if CONCURRENT_STAGES:
+        return stage_executor().submit(fn, *args, **kwargs)
+    future = Future()
+    try:
+        future.set_result(fn(*args, **kwargs))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+def set_request_coalescing(enabled):
+    global COALESCE_REQUESTS
+    COALESCE_REQUESTS = enabled
+
+def _model_lock(model_key):
+    with _batchers_lock:
+        return _model_locks.setdefault(model_key, threading.Lock())
+
+def _unit_length(unit):
+    return len(unit) if isinstance(unit, str) else sum(len(part) for part in unit)
+
+class MicroBatcher:
+    # Collects the units (texts or text pairs) concurrent callers submit within a short window, runs them as
+    # length-sorted batches of at most max_batch units so each batch pads to similar lengths, and hands every
+    # caller its own slice of the outputs through a future. One worker thread per model.
+    def __init__(self, name, run_batch, window_ms=None, max_batch=None):
+        self.name = name
+        self.run_batch = run_batch
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self._pending = []
+        self._condition = threading.Condition()
+        self._worker = None
+        self._stats = {"calls": 0, "units": 0, "batches": 0, "largest_batch": 0, "queue_seconds": 0.0, "run_seconds": 0.0}
+
+    def submit(self, units):
+        future = Future()
+        units = list(units)
+        if not units:
+            future.set_result([])
+            return future
+        with self._condition:
+            self._pending.append((units, future, time.perf_counter()))
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._loop, name=f"batcher-{self.name}", daemon=True)
+                self._worker.start()
+            self._condition.notify()
+        return future
+
+    def __call__(self, units):
+        return self.submit(units).result()
+
+    def _collect(self):
+        window = (INFERENCE_BATCH_WINDOW_MS if self.window_ms is None else self.window_ms) / 1000.0
+        max_batch = self.max_batch or INFERENCE_MAX_BATCH
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+            # The window opens when the oldest waiting call arrived, so no caller waits longer than one window
+            deadline = self._pending[0][2] + window
+            while sum(len(units) for units, _, _ in self._pending) < max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            jobs, self._pending = self._pending, []
+        return jobs, max_batch
+
+    def _run(self, jobs, max_batch):
+        started = time.perf_counter()
+        flat = [unit for units, _, _ in jobs for unit in units]
+        order = sorted(range(len(flat)), key=lambda i: _unit_length(flat[i]))
+        outputs = [None] * len(flat)
+        batches = 0
+        try:
+            for start in range(0, len(order), max_batch):
+                bucket = order[start:start + max_batch]
+                for i, output in zip(bucket, self.run_batch([flat[i] for i in bucket])):
+                    outputs[i] = output
+                batches += 1
+        except Exception as e:
+            for _, future, _ in jobs:
+                future.set_exception(e)
+            return
+        finally:
+            with self._condition:
+                self._stats["calls"] += len(jobs)
+                self._stats["units"] += len(flat)
+                self._stats["batches"] += batches
+                self._stats["largest_batch"] = max(self._stats["largest_batch"], min(len(flat), max_batch))
+                self._stats["queue_seconds"] += sum(started - queued for _, _, queued in jobs)
+                self._stats["run_seconds"] += time.perf_counter() - started
+        offset = 0
+        for units, future, _ in jobs:
+            future.set_result(outputs[offset:offset + len(units)])
+            offset += len(units)
+
+    def _loop(self):
+        while True:
+            self._run(*self._collect())
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self._stats)
+        stats["mean_batch"] = stats["units"] / stats["batches"] if stats["batches"] else 0.0
+        stats["mean_queue_ms"] = 1000.0 * stats["queue_seconds"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
+
+def batcher(key, run_batch):
+    with _batchers_lock:
+        if key not in _batchers:
+            _batchers[key] = MicroBatcher(key, run_batch)
+        return _batchers[key]
+
+def run_batched(key, units, run_batch, model_key=None):
+    # Same runner either way, so results do not depend on whether batching is on
+    if not units:
+        return []
+    if model_key is not None:
+        # Only a model shared under several keys is locked: an encoder with and without normalization has a
+        # batcher (and worker thread) per key, and concurrent stages embed the message and the retrieval query
+        # with it at once, so without the lock two threads would drive its tokenizer together. A model with a
+        # single key needs no lock: its batcher runs one batch at a time, and unbatched calls run as they always did.
+        lock, unlocked = _model_lock(model_key), run_batch
+        def run_batch(batch):
+            with lock:
+                return unlocked(batch)
+    if not INFERENCE_BATCHING:
+        return run_batch(list(units))
+    return batcher(key, run_batch)(units)
+
+def scheduler_stats():
+    with _batchers_lock:
+        batchers = dict(_batchers)
+    return {key: b.stats() for key, b in batchers.items()}
+
+class FlightAbandoned(Exception):
+    # The caller computing a shared result stopped before finishing; whoever waited on it computes its own
+    pass
+
+class StageCancelled(FlightAbandoned):
+    # Work nobody needs any more (a discarded speculation) stopped at its next checkpoint
+    pass
+
+def raise_if_cancelled(cancel):
+    if cancel is not None and cancel.is_set():
+        raise StageCancelled()
+
+class SingleFlight:
+    # The first caller with a key computes; callers arriving with the same key while it runs wait on its
+    # future and get a copy of the result (or its exception). Nothing is kept once the computation ends.
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def claim(self, group, key):
+        # (future, True) for the caller that must compute, (future, False) for one that should wait
+        with self._lock:
+            counts = self._stats.setdefault(group, {"calls": 0, "computed": 0, "coalesced": 0})
+            counts["calls"] += 1
+            future = self._inflight.get((group, key))
+            if future is not None:
+                counts["coalesced"] += 1
+                return future, False
+            future = self._inflight[(group, key)] = Future()
+            counts["computed"] += 1
+            return future, True
+
+    def recomputed(self, group):
+        # A waiting caller whose shared computation was abandoned did the work after all
+        with self._lock:
+            self._stats[group]["coalesced"] -= 1
+            self._stats[group]["computed"] += 1
+
+    def release(self, group, key, future, result=None, error=None):
+        with self._lock:
+            self._inflight.pop((group, key), None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return {group: dict(counts, in_flight=sum(1 for g, _ in self._inflight if g == group)) for group, counts in self._stats.items()}
+
+_flights = SingleFlight()
+
+def coalesce(group, key, fn, *args, **kwargs):
+    if not COALESCE_REQUESTS:
+        return fn(*args, **kwargs)
+    future, leader = _flights.claim(group, key)
+    if not leader:
+        try:
+            return copy.deepcopy(future.result())
+        except FlightAbandoned:
+            _flights.recomputed(group)
+            return fn(*args, **kwargs)
+    try:
+        result = fn(*args, **kwargs)
+    except BaseException as e:
+        _flights.release(group, key, future, error=e if isinstance(e, Exception) else FlightAbandoned())
+        raise
+    # The future holds a private copy: the leader may go on changing its result while followers copy theirs
+    _flights.release(group, key, future, copy.deepcopy(result))
+    return result
+
+def coalesce_stream(group, key, stream, replay):
+    # Generator version: the computing caller streams its events as usual and the waiting ones get
+    # replay(result) once it is done. stream() and replay() both return generators.
+    if not COALESCE_REQUESTS:
+        return (yield from stream())
+    future, leader = _flights.claim(group, key)
+    if not leader:
+        try:
+            result = copy.deepcopy(future.result())
+        except FlightAbandoned:
+            _flights.recomputed(group)
+            return (yield from stream())
+        yield from replay(result)
+        return result
+    try:
+        result = yield from stream()
+    except BaseException as e:
+        # Includes a consumer closing the stream early (GeneratorExit)
+        _flights.release(group, key, future, error=e if isinstance(e, Exception) else FlightAbandoned())
+        raise
+    # The future holds a private copy: the leader may go on changing its result while followers copy theirs
+    _flights.release(group, key, future, copy.deepcopy(result))
+    return result
+
+def coalescing_stats():
+    # "coalesced" is the number of computations saved by waiting on an identical one already running
+    return _flights.stats()
+
+def _nli_logits(pairs):
+    import torch
+    nli = get_model("nli")
+    premises, hypotheses = [p for p, _ in pairs], [h for _, h in pairs]
+    inputs = nli.tokenizer(premises, hypotheses, padding=True, truncation="only_first", return_tensors="pt")
+    inputs = {name: tensor for name, tensor in inputs.items() if name in nli.tokenizer.model_input_names}
+    with torch.no_grad():
+        logits = nli.model(**inputs).logits
+    return logits.float().cpu().numpy() if hasattr(logits, "cpu") else np.asarray(logits, dtype=np.float32)
+
+def nli_logits(pairs):
+    # (premise, hypothesis) pairs -> one row of NLI logits per pair
+    return np.stack(run_batched("nli", pairs, _nli_logits)) if pairs else np.zeros((0, 0), dtype=np.float32)
+
+def _batch_size(units):
+    # Micro-batches never exceed INFERENCE_MAX_BATCH; unbatched callers with long lists get the same bound
+    return min(len(units), INFERENCE_MAX_BATCH)
+
+def _sentiment(texts):
+    return get_model("sentiment")(texts, batch_size=_batch_size(texts))
+
+def sentiment(texts):
+    return run_batched("sentiment", texts, _sentiment)
+
+def embed(encoder_name, texts, normalize=False):
+    run = lambda batch: get_embedding_model(encoder_name).encode(batch, normalize_embeddings=normalize, batch_size=_batch_size(batch))
+    return np.stack(run_batched(f"embedding:{encoder_name}:{normalize}", texts, run, model_key=f"embedding:{encoder_name}")) if texts else np.zeros((0, 0), dtype=np.float32)
+
+def _rerank(pairs):
+    return get_model("reranker").predict(pairs, batch_size=_batch_size(pairs))
+
+def rerank(pairs):
+    return np.asarray(run_batched("reranker", [tuple(p) for p in pairs], _rerank), dtype=np.float32)
+
+if __name__ == "__main__":
+    set_inference_batching(True)
+    print(sentiment(["The results were excellent", "My laptop is broken again"]))
+    print(json.dumps(scheduler_stats(), indent=2))
@@ -4,117 +4,233 @@ import sys
 
 import os
 
-from transformers import pipeline
+import threading
 
-classifier = pipeline("zero-shot-classification", model="valhalla/distilbart-mnli-12-1")
+from functools import lru_cache
 
-def detect_intent(query, context=""):
-    if isinstance(query, list): query = " ".join([str(x) for x in query])
-    if isinstance(query, dict): query = query.get("text", str(query))
-    if not isinstance(query, str): query = str(query)
-    if not query or not query.strip():
+import numpy as np
 
-        return {"intent": "other", "confidence": 0.0, "rationale": "Empty query."}
+from zero_shot import zero_shot
 
-        
+from inference_scheduler import embed
 
-    intent_map = {
+from index_chunks import read_index_manifest, manifest_path_for
 
-        "company performance, revenue, financial numbers, annual report statistics": "ask_finance",
+from keyword_rules import match_rules, count_fast_lane
 
-        "HR policy, employee benefits, headcount, leave, recruitment": "ask_hr",
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-        "IT guidelines, security policy, company rules, standards": "ask_it_policy",
+INTENT_MAP = {
 
-        "technical software, code, development, engineering": "ask_dev",
+    "company performance, revenue, financial numbers, annual report statistics": "ask_finance",
 
-        "technical issue, repair, hardware fix, create IT ticket": "action_ticket",
+    "HR policy, employee benefits, headcount, leave, recruitment": "ask_hr",
 
-        "request access, permissions, reset password, login": "action_access",
+    "IT guidelines, security policy, company rules, standards": "ask_it_policy",
 
-        "schedule meeting, book calendar, arrange call": "action_schedule",
+    "technical software, code, development, engineering": "ask_dev",
 
-        "company leaders, board directors, CEO, executives, nadar, vijaykumar": "ask_people",
+    "technical issue, repair, hardware fix, create IT ticket": "action_ticket",
 
-        "general greeting, conversation, hello, thanks": "other"
+    "request access, permissions, reset password, login": "action_access",
 
-    }
+    "schedule meeting, book calendar, arrange call": "action_schedule",
 
-    
+    "company leaders, board directors, CEO, executives, nadar, vijaykumar": "ask_people",
 
-    candidate_labels = list(intent_map.keys())
+    "general greeting, conversation, hello, thanks": "other"
 
-    results = classifier(query, candidate_labels)
+}
 
-    
+INTENT_EXAMPLES_PATH = os.path.join(BASE_DIR, "intent_examples.json")
 
-    best_label = results['labels'][0]
+INTENT_INDEX_PATH = os.path.join(BASE_DIR, "faq_index.faiss")
 
-    top_intent = intent_map[best_label]
+# Below this gap between the two most likely intents the embedding head defers to the NLI classifier
 
-    confidence = results['scores'][0]
+INTENT_MARGIN_THRESHOLD = 0.3
 
-    
+# Keyword hits needed before the rules alone decide the intent, and the confidence reported when they do
 
-                                                                                   
+RULE_INTENT_MIN_HITS = 2
 
-    keyword_priorities = {
+RULE_INTENT_CONFIDENCE = 0.9
 
-        "ask_finance": ["revenue", "profit", "ebitda", "cagr", "dividend", "fiscal", "annual report", "finances", "expenditure"],
+_intent_heads = {}
 
-        "ask_people": ["ceo", "chairman", "chairperson", "vijaykumar", "roshni", "nadar", "director", "executives", "founder", "board of directors"],
+_intent_heads_lock = threading.Lock()
 
-        "ask_hr": ["leave", "policy", "employees", "headcount", "recruitment", "payroll"],
-        "action_schedule": ["schedule", "meeting", "book a", "arrange"],
-        "action_ticket": ["broken", "not working", "create a ticket", "raise a ticket"]
+def intent_encoder_name():
 
-    }
+    # Same encoder retrieval uses, so the fast path adds no model to memory. The manifest is parsed once per
+    # version of the file; a rebuild that rewrites it changes the modification time and so the cache key.
 
-    
+    path = manifest_path_for(INTENT_INDEX_PATH)
 
-    query_lower = query.lower()
+    return _manifest_encoder_name(INTENT_INDEX_PATH, os.stat(path).st_mtime_ns if os.path.exists(path) else None)
 
-    for intent_key, keywords in keyword_priorities.items():
+@lru_cache(maxsize=8)
 
-        if any(k in query_lower for k in keywords):
+def _manifest_encoder_name(index_path, modified):
 
-                                                                                                        
+    return read_index_manifest(index_path)["embedding_model"]["name"]
 
-            if top_intent != intent_key and confidence < 0.85:
-                top_intent = intent_key
-                confidence = max(confidence, 0.75)
-                break
+def _intent_head(encoder_name):
 
-    
+    with _intent_heads_lock:
 
-    if confidence < 0.7:
+        if encoder_name not in _intent_heads:
+
+            from sklearn.linear_model import LogisticRegression
+
+            with open(INTENT_EXAMPLES_PATH, 'r', encoding='utf-8') as f:
+
+                examples = json.load(f)
+
+            texts, labels = [], []
+
+            for label, intent in INTENT_MAP.items():
+
+                for text in [label] + examples.get(intent, []):
+
+                    texts.append(text)
+
+                    labels.append(intent)
+
+            features = embed(encoder_name, texts, normalize=True)
+
+            _intent_heads[encoder_name] = LogisticRegression(C=10.0, max_iter=1000).fit(features, labels)
+
+        return _intent_heads[encoder_name]
+
+def embedding_intent(query):
+
+    return _embedding_intent(intent_encoder_name(), query)
+
+def message_embedding(query):
+
+    # Normalized query vector in the retrieval index's space; the intent head reads the same vector
+
+    return _message_embedding(intent_encoder_name(), query)
+
+@lru_cache(maxsize=1024)
+
+def _message_embedding(encoder_name, query):
+
+    return embed(encoder_name, [query], normalize=True)[0]
+
+@lru_cache(maxsize=1024)
+
+def _embedding_intent(encoder_name, query):
+
+    head = _intent_head(encoder_name)
+
+    probabilities = head.predict_proba(_message_embedding(encoder_name, query)[None, :])[0]
+
+    order = np.argsort(-probabilities)
+
+    return str(head.classes_[order[0]]), float(probabilities[order[0]]), float(probabilities[order[0]] - probabilities[order[1]])
+
+def rule_intent(query):
+
+    # Decisive only when a priority keyword hits, every matching keyword points at the same intent and
+    # at least RULE_INTENT_MIN_HITS distinct keywords agree; anything ambiguous goes to the models
 
-        keyword_maps = {
+    rules = match_rules(query)
 
-            "ask_people": ["ceo", "cfo", "chairman", "chairperson", "leader", "executive", "founder", "roshni", "nadar", "shiv", "vijaykumar", "management", "directors", "chairwoman", "who is", "who are"],
+    priority = rules.groups("intent_priority")
 
-            "ask_hr": ["policy", "leave", "holiday", "benefit", "payroll", "salary", "pf", "insurance", "hr", "recruitment", "headcount", "employees", "workers"],
+    candidates = set(priority) | set(rules.groups("intent_keywords"))
 
-            "action_access": ["password", "reset", "access", "login", "permission", "account", "vpn", "mfa", "outlook", "teams"],
+    if len(candidates) != 1 or not priority:
 
-            "action_ticket": ["broken", "not working", "fail", "error", "laptop", "monitor", "hardware", "fix", "repair", "ticket", "issue"],
+        return None
 
-            "ask_finance": ["revenue", "profit", "ebitda", "margin", "growth", "financial", "expenditure", "cost", "dividend", "shareholder", "earnings", "cagr", "turnover"],
-            "action_schedule": ["schedule", "meeting", "book", "call", "appointment", "calendar"]
+    intent = priority[0]
 
-        }
+    keywords = set(rules.hits("intent_priority", intent)) | set(rules.hits("intent_keywords", intent))
+
+    return (intent, sorted(keywords)) if len(keywords) >= RULE_INTENT_MIN_HITS else None
+
+def intent_needs_nli(query, method="auto"):
+
+    if method == "auto" and rule_intent(query):
+
+        return False
+
+    return method == "nli" or (method == "auto" and embedding_intent(query)[2] < INTENT_MARGIN_THRESHOLD)
+
+
+def detect_intent(query, context="", method="auto", classifier=None):
+    if isinstance(query, list): query = " ".join([str(x) for x in query])
+    if isinstance(query, dict): query = query.get("text", str(query))
+    if not isinstance(query, str): query = str(query)
+    if not query or not query.strip():
+
+        return {"intent": "other", "confidence": 0.0, "rationale": "Empty query."}
 
         
 
-        override_intent = None
+    intent_map = INTENT_MAP
+
+    
+
+    candidate_labels = list(intent_map.keys())
+
+    top_intent = None
+
+    rules = match_rules(query)
+
+    if method == "auto":
+
+        decided = rule_intent(query)
+
+        count_fast_lane("intent", decided)
 
-        for intent_key, keywords in keyword_maps.items():
+        if decided:
 
-            if any(k in query.lower() for k in keywords):
+            top_intent, confidence = decided[0], RULE_INTENT_CONFIDENCE
 
-                override_intent = intent_key
+            model_rationale = f"Keyword rules matched '{top_intent}' ({', '.join(decided[1])})."
+
+    if top_intent is None and method != "nli":
+
+        fast_intent, fast_confidence, margin = embedding_intent(query)
+
+        if method == "embedding" or margin >= INTENT_MARGIN_THRESHOLD:
+
+            top_intent, confidence = fast_intent, fast_confidence
+
+            model_rationale = f"Embedding match for '{fast_intent}' with {fast_confidence:.2f} confidence (margin {margin:.2f})."
+
+    if top_intent is None:
+
+        results = (classifier or zero_shot)(query, candidate_labels)
+
+        best_label = results['labels'][0]
+
+        top_intent = intent_map[best_label]
+
+        confidence = results['scores'][0]
+
+        model_rationale = f"Classified as '{best_label}' with {confidence:.2f} confidence."
+
+    
+
+                                                                                   
+
+    for intent_key in rules.groups("intent_priority"):
+
+        if top_intent != intent_key and confidence < 0.85:
+            top_intent = intent_key
+            confidence = max(confidence, 0.75)
+            break
+
+    
+
+    if confidence < 0.7:
 
-                break
+        override_intent = rules.first("intent_keywords")
 
         
 
@@ -133,7 +249,7 @@ def detect_intent(query, context=""):
 
     else:
 
-        rationale = f"Classified as '{best_label}' with {confidence:.2f} confidence."
+        rationale = model_rationale
 
     
 
@@ -0,0 +1,180 @@
+import json
+import sys
+import threading
+from collections import deque
+from functools import lru_cache
+
+# family -> (match mode, {group: keywords}). Groups keep their declaration order, which callers rely on
+# for "first matching group wins" decisions.
+#   substring: keyword anywhere in the lower-cased text (the old `k in query.lower()` checks)
+#   word:      like a literal regex with \b on every edge that is a word character
+#   prefix:    text starts with the keyword
+RULES = {
+    "intent_priority": ("substring", {
+        "ask_finance": ["revenue", "profit", "ebitda", "cagr", "dividend", "fiscal", "annual report", "finances", "expenditure"],
+        "ask_people": ["ceo", "chairman", "chairperson", "vijaykumar", "roshni", "nadar", "director", "executives", "founder", "board of directors"],
+        "ask_hr": ["leave", "policy", "employees", "headcount", "recruitment", "payroll"],
+        "action_schedule": ["schedule", "meeting", "book a", "arrange"],
+        "action_ticket": ["broken", "not working", "create a ticket", "raise a ticket"],
+    }),
+    "intent_keywords": ("substring", {
+        "ask_people": ["ceo", "cfo", "chairman", "chairperson", "leader", "executive", "founder", "roshni", "nadar", "shiv", "vijaykumar", "management", "directors", "chairwoman", "who is", "who are"],
+        "ask_hr": ["policy", "leave", "holiday", "benefit", "payroll", "salary", "pf", "insurance", "hr", "recruitment", "headcount", "employees", "workers"],
+        "action_access": ["password", "reset", "access", "login", "permission", "account", "vpn", "mfa", "outlook", "teams"],
+        "action_ticket": ["broken", "not working", "fail", "error", "laptop", "monitor", "hardware", "fix", "repair", "ticket", "issue"],
+        "ask_finance": ["revenue", "profit", "ebitda", "margin", "growth", "financial", "expenditure", "cost", "dividend", "shareholder", "earnings", "cagr", "turnover"],
+        "action_schedule": ["schedule", "meeting", "book", "call", "appointment", "calendar"],
+    }),
+    "question": ("prefix", {
+        "question": ["what", "how", "who", "where", "when", "why", "revenue", "profit", "ebitda", "growth"],
+    }),
+    "urgency": ("word", {
+        "signals": ["asap", "urgent", "critical", "immediately", "fire", "emergency", "stuck", "blocking", "deadline", "(urgent)", "(asap)", "(critical)"],
+    }),
+    "slots": ("substring", {
+        "ticket": ["issue", "broken", "failed", "repair", "ticket", "not working"],
+        "access": ["access", "password", "login", "permission", "account"],
+        "metric": ["how many", "what is", "revenue", "profit", "report", "growth", "metric"],
+        "meeting": ["meeting", "book", "schedule", "arrange"],
+        "it_action": ["broken", "issue", "laptop", "access", "failed", "problem", "reset", "password", "slow", "flickering", "ticket", "hardware", "monitor", "screen", "keyboard", "mouse", "functioning", "working", "help", "repair", "fix"],
+        "ticket_or_help": ["ticket", "help"],
+    }),
+    "pipeline": ("substring", {
+        "informational": ["who is", "tell me about", "what is", "where is", "how many", "revenue", "about", "goals", "policy", "sustainability", "esg", "cfo", "headcount", "strategy", "growth", "profit", "margin", "ebitda", "dividend"],
+        "continuation": ["more", "detail", "elaborate", "tell me more", "go on", "what about", "and then", "yes", "confirm", "ok", "go ahead", "yep", "sure"],
+        "already_given": ["already", "provided", "mentioned", "said", "told you", "gave you"],
+        "policy": ["policy", "guideline", "rules", "terms", "entitlement", "duration", "leave", "holiday"],
+        "leadership": ["cfo", "leadership", "ceo", "chairman", "shiv", "roshni"],
+        "financial": ["revenue", "growth", "profit", "financial", "results"],
+        "hr": ["policy", "leave", "holiday", "benefit", "payroll", "salary", "pf", "insurance", "hr", "recruitment", "headcount"],
+        "people": ["ceo", "cfo", "chairman", "roshni", "shiv", "vijaykumar", "leader", "leadership", "board", "director"],
+        "validation": ["ceo", "cfo", "chairman", "revenue", "policy", "leave", "bonus", "roshni", "nadar", "shiv", "vijaykumar", "leader", "growth", "profit", "ebitda", "dividend", "headcount", "sustainability", "esg", "strategy", "director", "board"],
+    }),
+}
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+class KeywordAutomaton:
+    # Aho-Corasick automaton over every keyword of every rule group: one scan of the text reports all
+    # occurrences, however many groups share a keyword
+    def __init__(self, rules):
+        self.rules = rules
+        self.groups = [(family, group) for family, (_, groups) in rules.items() for group in groups]
+        self.modes = {family: mode for family, (mode, _) in rules.items()}
+        self.keywords = []
+        # keyword -> [(group index, position within the group)]
+        self.owners = []
+        keyword_ids = {}
+        for group_index, (family, group) in enumerate(self.groups):
+            for position, keyword in enumerate(rules[family][1][group]):
+                keyword = keyword.lower()
+                if keyword not in keyword_ids:
+                    keyword_ids[keyword] = len(self.keywords)
+                    self.keywords.append(keyword)
+                    self.owners.append([])
+                self.owners[keyword_ids[keyword]].append((group_index, position))
+        self.goto, self.fail, self.output = [{}], [0], [[]]
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            self.output[state].append(keyword_id)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def scan(self, text):
+        # Yields (keyword id, start, end) for every occurrence, overlapping ones included
+        state = 0
+        for end, ch in enumerate(text, 1):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for keyword_id in self.output[state]:
+                yield keyword_id, end - len(self.keywords[keyword_id]), end
+
+    def _accepts(self, mode, text, keyword, start, end):
+        if mode == "prefix":
+            return start == 0
+        if mode == "word":
+            if _is_word_char(keyword[0]) and start > 0 and _is_word_char(text[start - 1]):
+                return False
+            if _is_word_char(keyword[-1]) and end < len(text) and _is_word_char(text[end]):
+                return False
+        return True
+
+    def match(self, text):
+        text = text.lower()
+        hits = {}
+        for keyword_id, start, end in self.scan(text):
+            for group_index, position in self.owners[keyword_id]:
+                family = self.groups[group_index][0]
+                if self._accepts(self.modes[family], text, self.keywords[keyword_id], start, end):
+                    hits.setdefault(group_index, set()).add(position)
+        matched = {}
+        for group_index, positions in hits.items():
+            family, group = self.groups[group_index]
+            keywords = self.rules[family][1][group]
+            matched[(family, group)] = tuple(keywords[p] for p in sorted(positions))
+        return RuleMatches(matched, self.rules)
+
+class RuleMatches:
+    # Matched keywords per (family, group), each tuple in the group's declared keyword order
+    def __init__(self, matched, rules=RULES):
+        self.matched = matched
+        self.rules = rules
+
+    def hits(self, family, group):
+        return self.matched.get((family, group), ())
+
+    def any(self, family, group):
+        return (family, group) in self.matched
+
+    def groups(self, family):
+        # Matching groups of a family in declaration order
+        return [group for group in self.rules[family][1] if (family, group) in self.matched]
+
+    def first(self, family):
+        groups = self.groups(family)
+        return groups[0] if groups else None
+
+    def as_dict(self):
+        return {f"{family}.{group}": list(keywords) for (family, group), keywords in self.matched.items()}
+
+_automaton = KeywordAutomaton(RULES)
+
+@lru_cache(maxsize=4096)
+def match_rules(text):
+    # Cached so the intent, sentiment, slot and pipeline checks on one message share a single scan
+    return _automaton.match(text if isinstance(text, str) else str(text))
+
+_fast_lane = {}
+_fast_lane_lock = threading.Lock()
+
+def count_fast_lane(name, fired):
+    with _fast_lane_lock:
+        counts = _fast_lane.setdefault(name, {"fired": 0, "checked": 0})
+        counts["checked"] += 1
+        counts["fired"] += int(bool(fired))
+
+def fast_lane_stats():
+    # How often the keyword rules alone settled a decision that would otherwise have needed a model call
+    with _fast_lane_lock:
+        return {name: dict(counts, rate=counts["fired"] / counts["checked"] if counts["checked"] else 0.0) for name, counts in _fast_lane.items()}
+
+if __name__ == "__main__":
+    test_query = sys.argv[1] if len(sys.argv) > 1 else "My laptop is broken, please raise a ticket ASAP (urgent)"
+    print(json.dumps(match_rules(test_query).as_dict(), indent=2))
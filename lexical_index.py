@@ -0,0 +1,118 @@
+import os
+import re
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r'\w{3,}')
+
+QUERY_STOPWORDS = {'what', 'which', 'who', 'the', 'and', 'for', 'with', 'from', 'that', 'this', 'date', 'name', 'how', 'when', 'where', 'why', 'does', 'did', 'has', 'have', 'been', 'were', 'was', 'is', 'are', 'it', 'in', 'on', 'at', 'about'}
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def get_bigrams(text):
+    # Canonical bigram form shared by ingestion and query time: "revenue growth"
+    words = tokenize(text)
+    return [" ".join(pair) for pair in zip(words, words[1:])]
+
+def query_terms(query):
+    words = tokenize(query)
+    tokens = {w for w in words if w not in QUERY_STOPWORDS}
+    bigrams = {f"{a} {b}" for a, b in zip(words, words[1:]) if a not in QUERY_STOPWORDS and b not in QUERY_STOPWORDS}
+    return tokens, bigrams
+
+def _pack_postings(term_rows):
+    # One contiguous int32 array per vocabulary plus offsets, instead of an array object per term
+    offsets = np.zeros(len(term_rows) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(rows) for rows in term_rows.values()])
+    postings = np.fromiter((row for rows in term_rows.values() for row in rows), dtype=np.int32, count=int(offsets[-1]))
+    return postings, offsets
+
+class LexicalIndex:
+    def __init__(self, token_ids, token_postings, token_offsets, bigram_ids, bigram_postings, bigram_offsets, num_chunks):
+        self.token_ids = token_ids
+        self.token_postings = token_postings
+        self.token_offsets = token_offsets
+        self.bigram_ids = bigram_ids
+        self.bigram_postings = bigram_postings
+        self.bigram_offsets = bigram_offsets
+        self.num_chunks = num_chunks
+
+    @classmethod
+    def from_texts(cls, texts):
+        token_rows, bigram_rows = {}, {}
+        num_chunks = 0
+        for row, text in enumerate(texts):
+            words = tokenize(text)
+            for token in set(words):
+                token_rows.setdefault(token, []).append(row)
+            for bigram in {f"{a} {b}" for a, b in zip(words, words[1:])}:
+                bigram_rows.setdefault(bigram, []).append(row)
+            num_chunks = row + 1
+        # Rows are appended in increasing order, so every posting list is already sorted
+        token_postings, token_offsets = _pack_postings(token_rows)
+        bigram_postings, bigram_offsets = _pack_postings(bigram_rows)
+        token_ids = {t: i for i, t in enumerate(token_rows)}
+        bigram_ids = {b: i for i, b in enumerate(bigram_rows)}
+        return cls(token_ids, token_postings, token_offsets, bigram_ids, bigram_postings, bigram_offsets, num_chunks)
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        return cls.from_texts(chunks[i]['content'] for i in range(len(chunks)))
+
+    @staticmethod
+    def path_for(base_path):
+        return base_path + ".lexical.npz"
+
+    def save(self, base_path):
+        np.savez(
+            self.path_for(base_path),
+            token_vocab=np.array(list(self.token_ids), dtype=str),
+            token_postings=self.token_postings,
+            token_offsets=self.token_offsets,
+            bigram_vocab=np.array(list(self.bigram_ids), dtype=str),
+            bigram_postings=self.bigram_postings,
+            bigram_offsets=self.bigram_offsets,
+            num_chunks=np.array(self.num_chunks),
+        )
+
+    @classmethod
+    def load(cls, base_path):
+        path = cls.path_for(base_path)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            token_ids = {t: i for i, t in enumerate(data["token_vocab"].tolist())}
+            bigram_ids = {b: i for i, b in enumerate(data["bigram_vocab"].tolist())}
+            return cls(token_ids, data["token_postings"], data["token_offsets"], bigram_ids, data["bigram_postings"], data["bigram_offsets"], int(data["num_chunks"]))
+
+    def _term_hits(self, term_ids, postings, offsets, terms, rows):
+        counts = np.zeros(len(rows), dtype=np.int32)
+        for term in terms:
+            tid = term_ids.get(term)
+            if tid is None:
+                continue
+            plist = postings[offsets[tid]:offsets[tid + 1]]
+            pos = np.searchsorted(plist, rows)
+            pos[pos >= len(plist)] = len(plist) - 1
+            counts += plist[pos] == rows
+        return counts
+
+    def keyword_hits(self, keywords, rows):
+        rows = np.asarray(rows, dtype=np.int32)
+        tokens, bigrams = set(), set()
+        for keyword in keywords:
+            words = tokenize(keyword)
+            if len(words) == 1:
+                tokens.add(words[0])
+            elif len(words) == 2:
+                bigrams.add(" ".join(words))
+        return (self._term_hits(self.token_ids, self.token_postings, self.token_offsets, tokens, rows)
+                + self._term_hits(self.bigram_ids, self.bigram_postings, self.bigram_offsets, bigrams, rows))
+
+    def overlap_scores(self, query, rows):
+        rows = np.asarray(rows, dtype=np.int32)
+        tokens, bigrams = query_terms(query)
+        token_overlap = self._term_hits(self.token_ids, self.token_postings, self.token_offsets, tokens, rows)
+        bigram_overlap = self._term_hits(self.bigram_ids, self.bigram_postings, self.bigram_offsets, bigrams, rows)
+        return token_overlap, bigram_overlap
@@ -6,17 +6,25 @@ import os
 
 import re
 
-from transformers import pipeline
+import threading
 
-from intent_detector import detect_intent
+from conversation_state import conversation_state
 
-from ner_extractor import extract_entities
+from nlu_stage import NLU_TASKS
 
-from sentiment_analyzer import analyze_sentiment_and_urgency
+from stage_graph import Stage, StageGraph
 
-from query_assistant import retrieve_chunks
+from intent_detector import detect_intent, rule_intent, intent_needs_nli
 
-from agent_policy import decide_next_step
+import inference_scheduler
+
+import response_cache
+
+from keyword_rules import match_rules, fast_lane_stats
+
+from query_assistant import retrieve_chunks, retrieve_chunks_batch, knowledge_base_exists, serving_index_version
+
+from agent_policy import decide_next_step, required_inputs
 
 from action_generator import generate_action_json
 
@@ -26,9 +34,153 @@ from citation_enforcer import verify_and_enforce_citations
 
 from ui_formatter import format_ui_response
 
-generator = pipeline("text2text-generation", model="google/flan-t5-small")
+from model_registry import get_model, model_status, embedding_model_key, start_background_warmup
 
-def synthesize_answer(query, chunks):
+from index_chunks import read_index_manifest
+
+DEFAULT_INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq_index.faiss")
+
+DEFAULT_MAPPING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chunks_mapping.json")
+
+def capability_models(index_file=DEFAULT_INDEX_FILE):
+
+    # Also the warmup priority: understanding and retrieving come first, generation last
+
+    embedding_key = embedding_model_key(read_index_manifest(index_file)["embedding_model"]["name"])
+
+    return {"intent": ["nli"], "retrieval": [embedding_key, "reranker"], "sentiment": ["sentiment"], "generation": ["generator"]}
+
+def start_model_warmup(index_file=DEFAULT_INDEX_FILE):
+
+    # The knowledge base loads first on the warmup thread, so binding the UI never waits for it
+
+    return start_background_warmup([key for keys in capability_models(index_file).values() for key in keys], prepare=serving_index_version)
+
+def readiness(index_file=DEFAULT_INDEX_FILE):
+
+    capabilities = capability_models(index_file)
+
+    statuses = {key: model_status(key) for keys in capabilities.values() for key in keys}
+
+    available = {name: all(statuses[key] in ("ready", "loaded") for key in keys) for name, keys in capabilities.items()}
+
+    return {"ready": all(available.values()), "capabilities": available, "models": statuses, "fast_lane": fast_lane_stats(), "speculation": speculation_stats(), "response_cache": response_cache.response_cache_stats(), "coalescing": inference_scheduler.coalescing_stats()}
+
+_generator_lock = threading.Lock()
+
+def generator_available():
+
+    # While the background warmup has not reached the generator, answer from the retrieved text instead of blocking
+
+    return model_status("generator") not in ("pending", "loading", "failed")
+
+def extractive_answer(chunks):
+
+    lines = []
+
+    for c in chunks[:3]:
+
+        sentences = re.split(r'(?<=[.!?])\s+', c['content'].strip())
+
+        lines.append(f"- {' '.join(sentences[:2])[:400]} [Annual Report 2024–25, Page {c['page_number']}]")
+
+    if model_status("generator") == "failed":
+
+        lines.append("\n_The answer generator could not be loaded, so these are the most relevant passages from the report._")
+
+    else:
+
+        lines.append("\n_The answer generator is still starting up, so these are the most relevant passages from the report._")
+
+    return "\n".join(lines)
+
+def drain(stream):
+
+    # Runs an event stream to completion and returns its result
+
+    while True:
+
+        try:
+
+            next(stream)
+
+        except StopIteration as done:
+
+            return done.value
+
+def generate_stream(prompt, **generate_kwargs):
+
+    # Yields token events while the generator decodes and returns the pipeline's own final text, so the
+
+    # streamed and non-streamed answers are the same string
+
+    generator = get_model("generator")
+
+    if getattr(generator, "tokenizer", None) is None:
+
+        with _generator_lock:
+
+            text = generator(prompt, **generate_kwargs)[0]['generated_text']
+
+        yield {"type": "token", "text": text}
+
+        return text
+
+    from transformers import TextIteratorStreamer
+
+    streamer = TextIteratorStreamer(generator.tokenizer, skip_prompt=True, skip_special_tokens=True)
+
+    outcome = {}
+
+    def run():
+
+        try:
+
+            # Generation is not micro-batched; concurrent sessions take turns on the one pipeline
+
+            with _generator_lock:
+
+                outcome["result"] = generator(prompt, streamer=streamer, **generate_kwargs)
+
+        except Exception as e:
+
+            outcome["error"] = e
+
+            streamer.end()
+
+    worker = threading.Thread(target=run, name="generator-stream", daemon=True)
+
+    worker.start()
+
+    for piece in streamer:
+
+        if piece:
+
+            yield {"type": "token", "text": piece}
+
+    worker.join()
+
+    if "error" in outcome:
+
+        raise outcome["error"]
+
+    return outcome["result"][0]['generated_text']
+
+def synthesize_answer_stream(query, chunks):
+
+    # Identical concurrent questions over the same passages share one generation; the callers that waited
+
+    # get the finished text as a single token event
+
+    key = json.dumps([str(query), [[c.get('chunk_id'), c['page_number'], c['content']] for c in (chunks or [])[:10]]])
+
+    return (yield from inference_scheduler.coalesce_stream("synthesis", key, lambda: _synthesize_answer_stream(query, chunks), replay_answer))
+
+def replay_answer(answer):
+
+    yield {"type": "token", "text": answer}
+
+def _synthesize_answer_stream(query, chunks):
 
     if isinstance(query, list): query = " ".join([str(x) for x in query])
     if not isinstance(query, str): query = str(query)
@@ -98,9 +250,17 @@ def synthesize_answer(query, chunks):
         f"Answer:"
     )
     
-    result = generator(prompt, max_new_tokens=512, do_sample=False, truncation=True)
+    if generator_available():
 
-    synthesized = result[0]['generated_text'].strip()
+        synthesized = yield from generate_stream(prompt, max_new_tokens=512, do_sample=False, truncation=True)
+
+        synthesized = synthesized.strip()
+
+    else:
+
+        synthesized = extractive_answer(chunks)
+
+        yield {"type": "token", "text": synthesized}
 
     
 
@@ -114,107 +274,279 @@ def synthesize_answer(query, chunks):
         f"[Annual Report 2024–25 Sources: {sources_str}]"
     )
 
-def run_pipeline(user_query, history=None):
+def synthesize_answer(query, chunks):
 
-                                              
+    return drain(synthesize_answer_stream(query, chunks))
 
-    if isinstance(user_query, dict):
+SECTION_MAP = {
 
-        user_query = user_query.get("text", "")
+    "ask_finance": "Financial",
 
-    
+    "ask_hr": "Human",
 
-    if isinstance(user_query, dict): user_query = user_query.get("text", "")
-    if isinstance(user_query, list): user_query = " ".join([str(x) for x in user_query])
-    if not isinstance(user_query, str): user_query = str(user_query)
+    "ask_people": "Governance",
 
-    if not user_query or not user_query.strip():
+    "ask_it_policy": "Information Technology"
 
-        return "I'm sorry, I didn't catch that. Could you please rephrase your request?"
+}
 
-    print(f"\n--- PROCESSING QUERY: {user_query} ---\n")
+def looks_informational(rules):
 
-    
+    return rules.any("pipeline", "informational") or rules.any("question", "question")
 
-    intent_data = detect_intent(user_query)
+def informational_intent(intent, rules):
 
-    intent = intent_data["intent"]
+    # Informational queries the classifier did not put under an ask_ intent are routed by keyword
 
-    
+    if intent.startswith("ask_"):
 
-    previous_action_intent = None
+        return intent
 
-    historical_entities = {}
+    if rules.any("pipeline", "hr"):
 
-    conversation_context = []
+        return "ask_hr"
 
-    
+    if rules.any("pipeline", "people"):
+
+        return "ask_people"
 
-    if history:
+    return "ask_finance"
 
-                                                                     
+def retrieval_request(user_query, intent, rules):
 
-        for msg in reversed(history[-5:]):
+    # Everything retrieval depends on as one comparable value, so a speculative run can be checked against the real one
 
-            if isinstance(msg, dict):
+    boost_kws = []
 
-                m = msg
+    if rules.any("pipeline", "policy"):
+
+        boost_kws = ["policy", "eligibility", "weeks", "months", "benefit", "guidelines", "entitlement", "leave", "holiday"]
 
-            elif isinstance(msg, (list, tuple)):
+    elif rules.any("pipeline", "leadership"):
 
-                m = {"role": "user", "content": msg[0]} if len(msg) > 0 else {}
+        boost_kws = ["chief", "officer", "director", "leadership", "management", "founder", "chairman", "secretary"]
 
-            else:
+    elif rules.any("pipeline", "financial"):
 
-                m = msg.__dict__
+        boost_kws = ["revenue", "profit", "growth", "financial", "margin", "ebitda", "consolidated", "income"]
 
-            
+    if intent == "ask_people":
 
-            if m.get("role") == "user":
+        boost_kws = ["ceo", "cfo", "chairman", "chairperson", "leader", "executive", "founder", "director", "board", "management", "biography", "profile"]
 
-                user_msg = m["content"]
+    if " and " in user_query.lower() or "," in user_query:
 
-                if isinstance(user_msg, list):
+        query_parts = re.split(r' and |,', user_query.lower())
 
-                    user_msg = " ".join([item["text"] for item in user_msg if item.get("type") == "text"])
+        query_parts = [p.strip() for p in query_parts if len(p.strip()) > 5]
 
-                
+        return ("parts", tuple(query_parts), tuple(boost_kws), SECTION_MAP.get(intent), intent)
 
-                if not user_msg: continue
+    return ("query", user_query, tuple(boost_kws), SECTION_MAP.get(intent), intent)
 
-                conversation_context.insert(0, user_msg)
+def run_retrieval(request, index_file=DEFAULT_INDEX_FILE, mapping_file=DEFAULT_MAPPING_FILE, cancel=None):
 
-                prev_intent_data = detect_intent(user_msg)
+    kind, queries, boost_kws, target_section, intent = request
 
-                if prev_intent_data["intent"].startswith("action_") and not previous_action_intent:
+    if kind == "query":
 
-                    previous_action_intent = prev_intent_data["intent"]
+        retrieved_chunks = retrieve_chunks(queries, index_file, mapping_file, k=20, boost_keywords=list(boost_kws), section_filter=target_section, intent=intent, cancel=cancel)
 
-                
+        return retrieved_chunks, (retrieved_chunks[0]['score'] if retrieved_chunks else -10.0)
 
-                prev_entities = extract_entities(user_msg)
+    seen_ids = set()
 
-                for k, v in prev_entities.items():
+    top_part_score = -10.0
 
-                    if v and v != "..." and v not in ["Low|Medium|High", "TBD"]:
+    all_part_chunks = []
 
-                        if k not in historical_entities or historical_entities[k] in ["...", "TBD", "Low|Medium|High"]:
+    part_results = retrieve_chunks_batch(list(queries), index_file, mapping_file, k=10, boost_keywords=list(boost_kws), section_filter=target_section, intent=intent, cancel=cancel) or []
 
-                            historical_entities[k] = v
+    for part_chunks in part_results:
 
-            
+        if part_chunks:
 
-    current_entities = extract_entities(user_query)
+            top_part_score = max(top_part_score, part_chunks[0]['score'])
 
-    entities = current_entities.copy()
+            for c in part_chunks:
 
-    
+                if c['chunk_id'] not in seen_ids:
 
-    informational_keywords = ["who is", "tell me about", "what is", "where is", "how many", "revenue", "about", "goals", "policy", "sustainability", "esg", "cfo", "headcount", "strategy", "growth", "profit", "margin", "ebitda", "dividend"]
+                    all_part_chunks.append(c)
 
-    is_informational_query = any(k in user_query.lower() for k in informational_keywords)
+                    seen_ids.add(c['chunk_id'])
 
-    
+    all_part_chunks.sort(key=lambda x: x.get('score', 0), reverse=True)
+
+    return all_part_chunks, top_part_score
+
+_speculation = {"launched": 0, "used": 0, "discarded": 0}
+
+_speculation_lock = threading.Lock()
+
+def _count_speculation(outcome):
+
+    with _speculation_lock:
+
+        _speculation[outcome] += 1
+
+def speculation_stats():
+
+    with _speculation_lock:
+
+        return dict(_speculation)
+
+class SpeculativeRetrieval:
+
+    def __init__(self, user_query, rules):
+
+        _count_speculation("launched")
+
+        # future.cancel() alone cannot stop a task the pool already started; the retrieval checks this event instead
+
+        self.cancelled = threading.Event()
+
+        self.future = inference_scheduler.run_stage(self._run, user_query, rules)
+
+    def _run(self, user_query, rules):
+
+        # Keyword rules or a confident embedding head give the exact intent; below the margin this is a guess
+
+        decided = rule_intent(user_query)
+
+        guess = decided[0] if decided else detect_intent(user_query, method="embedding")["intent"]
+
+        request = retrieval_request(user_query, informational_intent(guess, rules), rules)
+
+        inference_scheduler.raise_if_cancelled(self.cancelled)
+
+        return request, run_retrieval(request, cancel=self.cancelled)
+
+    def take(self, request):
+
+        try:
+
+            speculated, result = self.future.result()
+
+        except Exception:
+
+            speculated = None
+
+        if speculated == request:
+
+            _count_speculation("used")
+
+            return result
+
+        _count_speculation("discarded")
+
+        return None
+
+    def discard(self):
+
+        self.cancelled.set()
+
+        self.future.cancel()
+
+        _count_speculation("discarded")
+
+def retrieval_route(context):
+
+    # Decided before any slot filling or history analysis: the router needs retrieval for ask_ intents, and
+
+    # informational wording sends other intents to retrieval too
+
+    return "retrieval" in required_inputs(context["intent_data"]) or context["rules"].any("pipeline", "informational")
+
+def intent_stage(context):
+
+    # When the intent needs the NLI classifier every task is scored in that one pass anyway; otherwise the
+
+    # route is known before any NLI and later stages compute only what it needs
+
+    user_query = context["user_query"]
+
+    tasks = NLU_TASKS if intent_needs_nli(user_query) else ("intent",)
+
+    intent_data = context["state"].analysis(user_query, tasks=tasks)["intent"]
+
+    return {"intent_data": intent_data, "intent": intent_data["intent"]}
+
+def mentions_stage(context):
+
+    return {"current_entities": context["state"].analysis(context["user_query"], tasks=("mentions",))["mentions"]}
+
+def slot_filling_stage(context):
+
+    return {"current_entities": context["state"].analysis(context["user_query"], tasks=("entities",))["entities"]}
+
+def history_stage(context):
+
+    state = context["state"]
+
+    previous_action_intent = None
+
+    historical_entities = {}
+
+    for msg in reversed(context["history"][-5:]):
+
+        if isinstance(msg, dict):
+
+            m = msg
+
+        elif isinstance(msg, (list, tuple)):
+
+            m = {"role": "user", "content": msg[0]} if len(msg) > 0 else {}
+
+        else:
+
+            m = msg.__dict__
+
+        if m.get("role") == "user":
+
+            user_msg = m["content"]
+
+            if isinstance(user_msg, list):
+
+                user_msg = " ".join([item["text"] for item in user_msg if item.get("type") == "text"])
+
+            if not user_msg: continue
+
+            prev_nlu = state.analysis(user_msg, tasks=("intent", "entities"))
+
+            prev_intent_data = prev_nlu["intent"]
+
+            if prev_intent_data["intent"].startswith("action_") and not previous_action_intent:
+
+                previous_action_intent = prev_intent_data["intent"]
+
+            prev_entities = prev_nlu["entities"]
+
+            for k, v in prev_entities.items():
+
+                if v and v != "..." and v not in ["Low|Medium|High", "TBD"]:
+
+                    if k not in historical_entities or historical_entities[k] in ["...", "TBD", "Low|Medium|High"]:
+
+                        historical_entities[k] = v
+
+    return {"previous_action_intent": previous_action_intent, "historical_entities": historical_entities}
+
+def follow_up_stage(context):
+
+    user_query, history, rules, state = context["user_query"], context["history"], context["rules"], context["state"]
+
+    intent_data = context["intent_data"]
+
+    intent = intent_data["intent"]
+
+    current_entities = context["current_entities"]
+
+    previous_action_intent = context["previous_action_intent"]
+
+    historical_entities = context["historical_entities"]
+
+    is_informational_query = rules.any("pipeline", "informational")
 
     is_simple_info_response = False
 
@@ -230,35 +562,23 @@ def run_pipeline(user_query, history=None):
 
     should_adopt_previous = False
 
-                                                                         
-
-    is_continuation_like = any(k in user_query.lower() for k in ["more", "detail", "elaborate", "tell me more", "go on", "what about", "and then", "yes", "confirm", "ok", "go ahead", "yep", "sure"])
-
-    
+    is_continuation_like = rules.any("pipeline", "continuation")
 
     if (previous_action_intent or (history and len(history) > 0)) and intent == "other" and not is_informational_query:
 
-                                                                
-
         prev_intent = previous_action_intent
 
         if not prev_intent and history:
 
-                                                   
-
             last_user_msg = history[-2]["content"] if len(history) >= 2 else ""
 
             if last_user_msg:
 
-                prev_intent = detect_intent(last_user_msg)["intent"]
+                prev_intent = state.analysis(last_user_msg, tasks=("intent",))["intent"]["intent"]
 
         if prev_intent and (prev_intent.startswith("action_") or prev_intent.startswith("ask_")):
 
-            continuation_keywords = ["already", "provided", "mentioned", "said", "told you", "gave you"]
-
-            has_continuation_kws = any(k in user_query.lower() for k in continuation_keywords)
-
-            
+            has_continuation_kws = rules.any("pipeline", "already_given")
 
             if is_simple_info_response or has_continuation_kws or is_continuation_like or intent_data["confidence"] < 0.4:
 
@@ -272,9 +592,7 @@ def run_pipeline(user_query, history=None):
 
     entities = current_entities.copy()
 
-    global_entities = ["employee_id", "department"] 
-
-    
+    global_entities = ["employee_id", "department"]
 
     if should_adopt_previous or (intent.startswith("action_") and previous_action_intent == intent):
 
@@ -296,253 +614,237 @@ def run_pipeline(user_query, history=None):
 
             if (not v_curr or v_curr in ["...", "TBD"]) and v_hist:
 
-                 entities[k] = v_hist
-
-    
-
-    sentiment_data = analyze_sentiment_and_urgency(user_query)
-
-    
-
-    retrieval_score = 0.0
-
-    retrieved_chunks = []
+                entities[k] = v_hist
 
-    rag_answer = ""
+    yield {"type": "status", "stage": "intent", "intent": intent, "confidence": intent_data["confidence"]}
 
-    
+    return {"intent_data": intent_data, "intent": intent, "entities": entities}
 
-    is_policy_query = any(k in user_query.lower() for k in ["policy", "guideline", "rules", "terms", "entitlement", "duration", "leave", "holiday"])
+def needs_retrieval(context):
 
-    boost_kws = []
+    return context["intent"].startswith("ask_") or context["rules"].any("pipeline", "informational")
 
-    if is_policy_query:
-
-        boost_kws = ["policy", "eligibility", "weeks", "months", "benefit", "guidelines", "entitlement", "leave", "holiday"]
+def discard_speculation(context):
 
-    elif any(k in user_query.lower() for k in ["cfo", "leadership", "ceo", "chairman", "shiv", "roshni"]):
+    # Routing went to an action or small talk; the speculative passages are not needed
 
-        boost_kws = ["chief", "officer", "director", "leadership", "management", "founder", "chairman", "secretary"]
+    if context["speculative"]:
 
-    elif any(k in user_query.lower() for k in ["revenue", "growth", "profit", "financial", "results"]):
+        context["speculative"].discard()
 
-        boost_kws = ["revenue", "profit", "growth", "financial", "margin", "ebitda", "consolidated", "income"]
+def sources_event(retrieved_chunks):
 
-    if intent.startswith("ask_") or is_informational_query:
+    return {"type": "status", "stage": "sources", "count": len(retrieved_chunks), "pages": sorted({c['page_number'] for c in retrieved_chunks[:5]})}
 
-        if not intent.startswith("ask_"):
+def retrieval_stage(context):
 
-            hr_kws = ["policy", "leave", "holiday", "benefit", "payroll", "salary", "pf", "insurance", "hr", "recruitment", "headcount"]
+    user_query, rules, intent_data, speculative = context["user_query"], context["rules"], context["intent_data"], context["speculative"]
 
-            if any(k in user_query.lower() for k in hr_kws):
+    intent = context["intent"]
 
-                intent = "ask_hr"
+    if not intent.startswith("ask_"):
 
-            elif any(k in user_query.lower() for k in ["ceo", "cfo", "chairman", "roshni", "shiv", "vijaykumar", "leader", "leadership", "board", "director"]):
+        intent = informational_intent(intent, rules)
 
-                intent = "ask_people"
+        intent_data["intent"] = intent
 
-            else:
+        intent_data["confidence"] = 0.8
 
-                intent = "ask_finance" 
+        yield {"type": "status", "stage": "intent", "intent": intent, "confidence": intent_data["confidence"]}
 
-            intent_data["intent"] = intent 
+    request = retrieval_request(user_query, intent, rules)
 
-            intent_data["confidence"] = 0.8
+    retrieved_chunks, top_score = [], -10.0
 
-        section_map = {
+    rag_answer = "I could not find this information in the dataset."
 
-            "ask_finance": "Financial",
+    if knowledge_base_exists(DEFAULT_INDEX_FILE, DEFAULT_MAPPING_FILE):
 
-            "ask_hr": "Human",
+        # Passages retrieved speculatively are used only when they were fetched for exactly this request
 
-            "ask_people": "Governance",
+        speculated = speculative.take(request) if speculative else None
 
-            "ask_it_policy": "IT"
+        retrieved_chunks, top_score = speculated or run_retrieval(request)
 
-        }
+    else:
 
-        target_section = section_map.get(intent)
+        # A deployment without its index is an error, not an empty search result
 
-        if intent == "ask_people":
+        print(f"Warning: Knowledge base not found at {DEFAULT_INDEX_FILE} / {DEFAULT_MAPPING_FILE}.")
 
-            boost_kws = ["ceo", "cfo", "chairman", "chairperson", "leader", "executive", "founder", "director", "board", "management", "biography", "profile"]
+        rag_answer = "Internal Error: Knowledge base not found."
 
-        
+        if speculative:
 
-        base_dir = os.path.dirname(os.path.abspath(__file__))
+            speculative.discard()
 
-        index_file = os.path.join(base_dir, "faq_index.faiss")
+    retrieved_chunks = retrieved_chunks or []
 
-        mapping_file = os.path.join(base_dir, "chunks_mapping.json")
+    yield sources_event(retrieved_chunks)
 
-        
+    retrieval_score = 0.0
 
-        if not os.path.exists(index_file) or not os.path.exists(mapping_file):
+    if retrieved_chunks:
 
-            retrieval_score = 0.0
+        retrieval_score = 1.0 / (1.0 + pow(2.718, -(top_score + 2.0)))
 
-            rag_answer = "Internal Error: Knowledge base not found."
+        validation_entities = [v for k, v in context["entities"].items() if v and v not in ["...", "TBD", "Low|Medium|High"]]
 
-        else:
+        query_keywords = list(rules.hits("pipeline", "validation"))
 
-            if " and " in user_query.lower() or "," in user_query:
+        check_list = list(set(validation_entities + query_keywords))
 
-                query_parts = re.split(r' and |,', user_query.lower())
+        if check_list:
 
-                query_parts = [p.strip() for p in query_parts if len(p.strip()) > 5]
+            found_relevant = False
 
-                seen_ids = set()
+            combined_content = " ".join([c['content'].lower() for c in retrieved_chunks])
 
-                top_part_score = -10.0
+            for item in check_list:
 
-                all_part_chunks = []
+                if item.lower() in combined_content:
 
-                for qp in query_parts:
+                    found_relevant = True
 
-                    part_chunks = retrieve_chunks(qp, index_file, mapping_file, k=10, boost_keywords=boost_kws, section_filter=target_section)
+                    break
 
-                    if part_chunks:
+            if not found_relevant:
 
-                        top_part_score = max(top_part_score, part_chunks[0]['score'])
+                retrieval_score *= 0.6
 
-                        for c in part_chunks:
+        print(f"DEBUG: Intent={intent} ({intent_data['confidence']:.2f}), Retrieval Score={retrieval_score:.2f}")
 
-                            if c['chunk_id'] not in seen_ids:
+    # The snapshot that served these passages, even if the index was reloaded or evicted since
 
-                                all_part_chunks.append(c)
+    index_version = retrieved_chunks[0].get("index_version") if retrieved_chunks else None
 
-                                seen_ids.add(c['chunk_id'])
+    return {"intent_data": intent_data, "intent": intent, "retrieved_chunks": retrieved_chunks, "retrieval_score": retrieval_score,
 
-                
+            "rag_answer": rag_answer, "index_version": index_version}
 
-                                                                      
+def synthesis_stage(context):
 
-                all_part_chunks.sort(key=lambda x: x.get('score', 0), reverse=True)
+    user_query, history, retrieved_chunks = context["user_query"], context["history"], context["retrieved_chunks"]
 
-                retrieved_chunks = all_part_chunks
+    if context["rules"].any("pipeline", "policy"):
 
-                top_score = top_part_score
+        combined_content = " ".join([c['content'].lower() for i, c in enumerate(retrieved_chunks) if i < 3])
 
-            else:
+        contains_policy_details = any(k in combined_content for k in ["weeks", "days", "months", "eligible", "entitlement", "duration"])
 
-                retrieved_chunks = retrieve_chunks(user_query, index_file, mapping_file, k=20, boost_keywords=boost_kws, section_filter=target_section)
+        contains_financial_terms = any(k in combined_content for k in ["expenditure", "cost", "crore", "budget", "remuneration", "accounting"])
 
-                top_score = retrieved_chunks[0]['score'] if retrieved_chunks else -10.0
+        if contains_financial_terms and not contains_policy_details:
 
-            
+            print("Policy query matched financial terms warning.")
 
-        if retrieved_chunks:
+    synthesized = yield from synthesize_answer_stream(user_query, retrieved_chunks)
 
-                                                                     
+    return {"rag_answer": numbered_answer(context, synthesized), "synthesized": synthesized}
 
-            
+def numbered_answer(context, synthesized):
 
-                                                                                    
+    q_idx = (len(context["history"]) // 2) + 1 if context["history"] else 1
 
-            retrieval_score = 1.0 / (1.0 + pow(2.718, -(top_score + 2.0)))                
+    return f"Question {q_idx}: {context['user_query']}\n{synthesized}"
 
-            
+def cache_lookup_stage(context):
 
-                                                                      
+    # Keyed on the intent retrieval runs under, so an entry stands for exactly the passages it would fetch
 
-            validation_entities = [v for k, v in entities.items() if v and v not in ["...", "TBD", "Low|Medium|High"]]
+    intent = informational_intent(context["intent"], context["rules"])
 
-            query_keywords = [k for k in ["ceo", "cfo", "chairman", "revenue", "policy", "leave", "bonus", "roshni", "nadar", "shiv", "vijaykumar", "leader", "growth", "profit", "ebitda", "dividend", "headcount", "sustainability", "esg", "strategy", "director", "board"] if k in user_query.lower()]
+    index_version = serving_index_version()
 
-            
+    if not response_cache.cacheable(intent, index_version):
 
-            check_list = list(set(validation_entities + query_keywords))
+        return {"cache_key": None, "cached": None, "cache_match": None, "cache_version": None}
 
-            
+    key = response_cache.response_key(context["user_query"], intent, index_version)
 
-            if check_list:
+    cached = response_cache.lookup_response(key)
 
-                found_relevant = False
+    if cached is not None:
 
-                                                                    
+        return {"cache_key": key, "cached": cached, "cache_match": "exact", "cache_version": index_version}
 
-                combined_content = " ".join([c['content'].lower() for c in retrieved_chunks])
+    # A paraphrase of an answered question; the message embedding is already in the conversation state
 
-                for item in check_list:
+    embedding = context["state"].embedding(context["user_query"])
 
-                    if item.lower() in combined_content:
+    cached = response_cache.lookup_similar_response(context["user_query"], embedding, intent, index_version)
 
-                        found_relevant = True
+    return {"cache_key": key, "cached": cached, "cache_match": "semantic" if cached is not None else None, "cache_version": index_version}
 
-                        break
+def cached_answer_stage(context):
 
-                
+    cached, intent_data = context["cached"], context["intent_data"]
 
-                                                                                                               
+    if cached["intent"] != context["intent"]:
 
-                if not found_relevant:
+        intent_data["intent"] = cached["intent"]
 
-                    retrieval_score *= 0.6 
+        intent_data["confidence"] = 0.8
 
-            print(f"DEBUG: Intent={intent} ({intent_data['confidence']:.2f}), Retrieval Score={retrieval_score:.2f}")
+        yield {"type": "status", "stage": "intent", "intent": cached["intent"], "confidence": intent_data["confidence"]}
 
-            if retrieval_score >= 0.4: 
+    yield sources_event(cached["retrieved_chunks"])
 
-                if is_policy_query:
+    rag_answer = "I could not find this information in the dataset."
 
-                    combined_content = " ".join([c['content'].lower() for i, c in enumerate(retrieved_chunks) if i < 3])
+    if cached["answer"] is not None:
 
-                    contains_policy_details = any(k in combined_content for k in ["weeks", "days", "months", "eligible", "entitlement", "duration"])
+        yield {"type": "token", "text": cached["answer"]}
 
-                    contains_financial_terms = any(k in combined_content for k in ["expenditure", "cost", "crore", "budget", "remuneration", "accounting"])
+        rag_answer = numbered_answer(context, cached["answer"])
 
-                    
+    return {"intent_data": intent_data, "intent": cached["intent"], "retrieved_chunks": cached["retrieved_chunks"],
 
-                    if contains_financial_terms and not contains_policy_details:
+            "retrieval_score": cached["retrieval_score"], "rag_answer": rag_answer, "index_version": context["cache_version"]}
 
-                        print("Policy query matched financial terms warning.")
+def cache_store_stage(context):
 
-                q_idx = (len(history) // 2) + 1 if history else 1
+    value = {"intent": context["intent"], "retrieved_chunks": context["retrieved_chunks"], "retrieval_score": context["retrieval_score"], "answer": context["synthesized"]}
 
-                synthesized = synthesize_answer(user_query, retrieved_chunks)
+    # Stored under the version retrieval actually used, which differs from the looked-up one after a reload in between
 
-                rag_answer = f"Question {q_idx}: {user_query}\n{synthesized}"
+    user_query, index_version = context["user_query"], context["index_version"]
 
-            else:
+    if not response_cache.cacheable(context["intent"], index_version):
 
-                rag_answer = "I could not find this information in the dataset."
+        return
 
-        else:
+    key = response_cache.response_key(user_query, context["intent"], index_version)
 
-            retrieval_score = 0.0
+    response_cache.store_response(key, value)
 
-            rag_answer = "I could not find this information in the dataset."
+    response_cache.store_similar_response(key, user_query, context["state"].embedding(user_query), context["intent"], index_version, value)
 
-    policy_decision = decide_next_step(
+def sentiment_stage(context):
 
-        intent_data, 
+    return {"sentiment_data": context["state"].analysis(context["user_query"], tasks=("sentiment",))["sentiment"]}
 
-        sentiment_data, 
+def decision_stage(context):
 
-        entities, 
+    return {"policy_decision": decide_next_step(context["intent_data"], context["sentiment_data"], context["entities"], retrieval_score=context["retrieval_score"])}
 
-        retrieval_score=retrieval_score
+def response_stage(context):
 
-    )
-
-    
+    policy_decision = context["policy_decision"]
 
     next_step = policy_decision["next_step"]
 
     final_output = ""
 
-    
-
     if next_step == "answer":
 
-        enforced_answer = verify_and_enforce_citations(rag_answer, retrieved_chunks)
+        enforced_answer = verify_and_enforce_citations(context["rag_answer"], context["retrieved_chunks"])
 
         final_output = format_ui_response("answer", enforced_answer)
 
     elif next_step == "action":
 
-        action_json = generate_action_json(intent, entities)
+        action_json = generate_action_json(context["intent"], context["entities"])
 
         final_output = format_ui_response("action", action_json)
 
@@ -566,9 +868,147 @@ def run_pipeline(user_query, history=None):
 
         final_output = f"I am escalating this request to a human agent. Reason: {reason}"
 
-    
+    return {"next_step": next_step, "final_output": final_output}
+
+# Each turn runs these in order. A stage's condition is checked against what earlier stages produced, so
+
+# work the chosen route never reads (retrieval and synthesis for actions, slot filling and history for
+
+# questions, sentiment whenever the router will not look at it, retrieval and synthesis again for a question
+
+# already in the response cache) is skipped and recorded as such.
+
+PIPELINE_STAGES = StageGraph([
+
+    Stage("intent", intent_stage, inputs=("user_query", "state"), outputs=("intent_data", "intent")),
+
+    Stage("mentions", mentions_stage, inputs=("user_query", "state", "intent_data", "rules"), outputs=("current_entities",),
+
+          when=retrieval_route, skip_reason="action or follow-up route: slots are filled instead", defaults={"current_entities": {}}),
+
+    Stage("slot_filling", slot_filling_stage, inputs=("user_query", "state", "intent_data", "rules"), outputs=("current_entities",),
+
+          when=lambda c: not retrieval_route(c), skip_reason="retrieval route: only entities named in the query are used", defaults={"current_entities": {}}),
+
+    Stage("history", history_stage, inputs=("history", "state", "intent_data", "rules"), outputs=("previous_action_intent", "historical_entities"),
+
+          when=lambda c: bool(c["history"]) and not retrieval_route(c), skip_reason="no history, or retrieval route: earlier turns are not read",
+
+          defaults={"previous_action_intent": None, "historical_entities": {}}),
+
+    Stage("follow_up", follow_up_stage, inputs=("user_query", "history", "rules", "state", "intent_data", "current_entities", "previous_action_intent", "historical_entities"),
+
+          outputs=("intent_data", "intent", "entities")),
+
+    Stage("cache_lookup", cache_lookup_stage, inputs=("user_query", "state", "rules", "intent"), outputs=("cache_key", "cached", "cache_match", "cache_version"),
+
+          when=lambda c: (response_cache.RESPONSE_CACHE or response_cache.SEMANTIC_CACHE) and needs_retrieval(c),
+
+          skip_reason="action or small-talk route, or the response caches are off", defaults={"cache_key": None, "cached": None, "cache_match": None, "cache_version": None}),
+
+    Stage("cached_answer", cached_answer_stage, inputs=("user_query", "history", "intent_data", "intent", "cached", "cache_version"),
+
+          outputs=("intent_data", "intent", "retrieved_chunks", "retrieval_score", "rag_answer", "index_version"),
+
+          when=lambda c: c["cached"] is not None, skip_reason="not in the response cache",
+
+          defaults={"retrieved_chunks": [], "retrieval_score": 0.0, "rag_answer": "", "index_version": None}),
+
+    Stage("retrieval", retrieval_stage, inputs=("user_query", "rules", "intent_data", "intent", "entities", "speculative", "cached"),
+
+          outputs=("intent_data", "intent", "retrieved_chunks", "retrieval_score", "rag_answer", "index_version"),
+
+          when=lambda c: needs_retrieval(c) and c["cached"] is None, skip_reason="action or small-talk route, or answered from the response cache",
+
+          on_skip=discard_speculation),
+
+    Stage("synthesis", synthesis_stage, inputs=("user_query", "history", "rules", "retrieved_chunks", "cached"), outputs=("rag_answer", "synthesized"),
+
+          when=lambda c: c["cached"] is None and bool(c["retrieved_chunks"]) and c["retrieval_score"] >= 0.4,
+
+          skip_reason="retrieval score below 0.4, or answered from the response cache", defaults={"synthesized": None}),
+
+    Stage("cache_store", cache_store_stage, inputs=("user_query", "state", "cache_key", "cached", "intent", "retrieved_chunks", "retrieval_score", "synthesized", "index_version"),
+
+          when=lambda c: c["cache_key"] is not None and c["cached"] is None, skip_reason="nothing new to cache"),
+
+    Stage("sentiment", sentiment_stage, inputs=("user_query", "state", "intent_data", "retrieval_score"), outputs=("sentiment_data",),
+
+          when=lambda c: "sentiment" in required_inputs(c["intent_data"], c["retrieval_score"]), skip_reason="the router does not read sentiment at this confidence",
+
+          defaults={"sentiment_data": {}}),
+
+    Stage("decision", decision_stage, inputs=("intent_data", "sentiment_data", "entities", "retrieval_score"), outputs=("policy_decision",)),
+
+    Stage("response", response_stage, inputs=("policy_decision", "rag_answer", "retrieved_chunks", "intent", "entities"), outputs=("next_step", "final_output")),
+
+], initial=("user_query", "history", "state", "rules", "speculative"))
+
+def run_pipeline_stream(user_query, history=None, session_id=None):
+
+    # Yields status events (intent, sources), token events while the answer is generated and one final event
+
+    if isinstance(user_query, dict):
+
+        user_query = user_query.get("text", "")
+
+    if isinstance(user_query, dict): user_query = user_query.get("text", "")
+
+    if isinstance(user_query, list): user_query = " ".join([str(x) for x in user_query])
+
+    if not isinstance(user_query, str): user_query = str(user_query)
+
+    if not user_query or not user_query.strip():
+
+        empty_reply = "I'm sorry, I didn't catch that. Could you please rephrase your request?"
+
+        yield {"type": "final", "output": empty_reply, "next_step": "clarify", "intent": "other", "index_version": None, "stages": {"ran": [], "skipped": {}, "ms": {}}, "cache": None}
+
+        return
+
+    print(f"\n--- PROCESSING QUERY: {user_query} ---\n")
+
+    rules = match_rules(user_query)
+
+    context = {
+
+        "user_query": user_query,
+
+        "history": history or [],
+
+        # Messages already analyzed on an earlier turn of this session are read back instead of re-classified
+
+        "state": conversation_state(session_id),
+
+        "rules": rules,
+
+        # Questions are likely to need passages: retrieval starts now on a guessed intent while the NLU stage runs
+
+        "speculative": SpeculativeRetrieval(user_query, rules) if inference_scheduler.CONCURRENT_STAGES and looks_informational(rules) else None,
+
+    }
+
+    yield from PIPELINE_STAGES.run(context)
+
+    # The index version is that of the snapshot the passages came from (None when the route read none), so
+
+    # downstream caches can invalidate answers built from an older knowledge base; the stage record shows
+
+    # which stages ran and which the route made unnecessary
+
+    yield {"type": "final", "output": context["final_output"], "next_step": context["next_step"], "intent": context["intent"], "index_version": context["index_version"], "stages": context["stages"], "cache": context["cache_match"]}
+
+def run_pipeline(user_query, history=None, return_details=False, session_id=None):
+
+    for event in run_pipeline_stream(user_query, history, session_id):
+
+        if event["type"] == "final":
+
+            break
+
+    details = {key: value for key, value in event.items() if key != "type"}
 
-    return final_output
+    return details if return_details else details["output"]
 
 if __name__ == "__main__":
 
@@ -0,0 +1,247 @@
+import os
+import sys
+import threading
+import time
+
+NLI_MODEL = "valhalla/distilbart-mnli-12-1"
+
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+
+GENERATOR_MODEL = "google/flan-t5-small"
+
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# "onnx" serves the NLI classifier and the cross-encoder as dynamically quantized int8 ONNX Runtime models
+MODEL_BACKEND = "torch"
+
+MODEL_BACKENDS = ("torch", "onnx")
+
+ONNX_CAPABLE = ("nli", "reranker")
+
+def _pipeline(task, model_name):
+    def load():
+        from transformers import pipeline
+        return pipeline(task, model=model_name)
+    return load
+
+def _cross_encoder(model_name):
+    def load():
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(model_name)
+    return load
+
+def _sentence_transformer(model_name):
+    def load():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    return load
+
+def _onnx_zero_shot(model_name):
+    def load():
+        from onnx_backend import load_quantized_zero_shot
+        return load_quantized_zero_shot(model_name)
+    return load
+
+def _onnx_cross_encoder(model_name):
+    def load():
+        from onnx_backend import load_quantized_cross_encoder
+        return load_quantized_cross_encoder(model_name)
+    return load
+
+def _backend_choice(torch_loader, onnx_loader):
+    def load():
+        return onnx_loader() if MODEL_BACKEND == "onnx" else torch_loader()
+    return load
+
+def _mobilenet():
+    from torchvision.models import mobilenet_v2, MobileNet_V2_Weights
+    weights = MobileNet_V2_Weights.DEFAULT
+    model = mobilenet_v2(weights=weights)
+    model.eval()
+    return model, weights
+
+# One entry per distinct set of weights; every module that needs the same model shares the instance
+_loaders = {
+    "nli": _backend_choice(_pipeline("zero-shot-classification", NLI_MODEL), _onnx_zero_shot(NLI_MODEL)),
+    "sentiment": _pipeline("sentiment-analysis", SENTIMENT_MODEL),
+    "generator": _pipeline("text2text-generation", GENERATOR_MODEL),
+    "reranker": _backend_choice(_cross_encoder(RERANK_MODEL), _onnx_cross_encoder(RERANK_MODEL)),
+    "image_classifier": _mobilenet,
+}
+
+# A tiny inference per model so the first real request does not pay for lazy kernel/graph initialisation
+_warmup_calls = {
+    "nli": lambda model: model("What was the revenue growth last year?", ["finance", "other"]),
+    "sentiment": lambda model: model("Hello there"),
+    "generator": lambda model: model("Question: What is HCLTech?\n\nAnswer:", max_new_tokens=4),
+    "reranker": lambda model: model.predict([["revenue growth", "Revenue grew 6.5% year on year."]]),
+}
+
+_models = {}
+_stats = {}
+_status = {}
+_key_locks = {}
+_registry_lock = threading.Lock()
+_warmup_thread = None
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS, but still grows by roughly the size of a newly loaded model
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+def _weight_bytes(model):
+    for candidate in (model, getattr(model, "model", None), model[0] if isinstance(model, tuple) else None):
+        parameters = getattr(candidate, "parameters", None)
+        if callable(parameters):
+            return sum(p.numel() * p.element_size() for p in parameters())
+    return None
+
+def register_model(key, loader):
+    with _registry_lock:
+        _loaders.setdefault(key, loader)
+
+def embedding_model_key(model_name):
+    key = f"embedding:{model_name}"
+    register_model(key, _sentence_transformer(model_name))
+    return key
+
+def get_model(key):
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _registry_lock:
+        if key not in _loaders:
+            raise KeyError(f"Unknown model '{key}'. Expected one of: {', '.join(_loaders)}.")
+        lock = _key_locks.setdefault(key, threading.Lock())
+    # Per-model lock: two threads asking for the same model load it once, different models load in parallel
+    with lock:
+        if key not in _models:
+            _status[key] = "loading"
+            rss_before = _rss_bytes()
+            start = time.perf_counter()
+            try:
+                model = _loaders[key]()
+            except Exception:
+                _status[key] = "failed"
+                raise
+            load_seconds = time.perf_counter() - start
+            rss_after = _rss_bytes()
+            weight_bytes = _weight_bytes(model)
+            _stats[key] = {
+                "backend": MODEL_BACKEND if key in ONNX_CAPABLE else "torch",
+                "load_seconds": round(load_seconds, 3),
+                "rss_delta_mb": round((rss_after - rss_before) / (1024 * 1024), 1) if rss_before is not None else None,
+                "weights_mb": round(weight_bytes / (1024 * 1024), 1) if weight_bytes is not None else None,
+            }
+            _models[key] = model
+            _status[key] = "loaded"
+            print(f"Loaded model '{key}' in {load_seconds:.2f}s")
+    return _models[key]
+
+def set_model_backend(backend):
+    global MODEL_BACKEND
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(f"Unknown model backend '{backend}'. Expected one of: {', '.join(MODEL_BACKENDS)}.")
+    with _registry_lock:
+        MODEL_BACKEND = backend
+        # Drop the instances built for the other backend; the next get_model() loads the new one
+        for key in ONNX_CAPABLE:
+            _models.pop(key, None)
+            _stats.pop(key, None)
+            _status.pop(key, None)
+
+def get_embedding_model(model_name):
+    return get_model(embedding_model_key(model_name))
+
+def is_loaded(key):
+    return key in _models
+
+def model_status(key):
+    # "not_loaded" models load on first use; "pending"/"loading" ones are queued in the background warmup
+    return _status.get(key, "loaded" if key in _models else "not_loaded")
+
+def replace_model(key, model):
+    # Lets benchmarks wrap a model (e.g. to count calls) without reaching into module globals
+    with _registry_lock:
+        previous = _models.get(key)
+        _models[key] = model
+        _status[key] = "ready"
+        _loaders.setdefault(key, lambda: model)
+    return previous
+
+def _warm(key):
+    model = get_model(key)
+    warmup_call = _warmup_calls.get(key)
+    if key.startswith("embedding:"):
+        warmup_call = lambda m: m.encode(["warmup query"])
+    start = time.perf_counter()
+    if warmup_call is not None:
+        warmup_call(model)
+    _stats.setdefault(key, {})["warmup_seconds"] = round(time.perf_counter() - start, 3)
+    _status[key] = "ready"
+
+def warmup(keys=None):
+    for key in keys or list(_loaders):
+        try:
+            _warm(key)
+        except Exception as e:
+            _status[key] = "failed"
+            _stats.setdefault(key, {})["error"] = str(e)
+            print(f"Warning: Could not load model '{key}'. Error: {e}")
+    return model_stats()
+
+def start_background_warmup(keys, prepare=None):
+    # Loads models in the given priority order while the caller goes on to bind its UI/server. `prepare` runs
+    # first on the same thread (loading the knowledge base, say); if it fails the models still load.
+    global _warmup_thread
+    with _registry_lock:
+        if _warmup_thread is not None:
+            return _warmup_thread
+        for key in keys:
+            if key not in _models:
+                _status[key] = "pending"
+
+        def run():
+            start = time.perf_counter()
+            if prepare is not None:
+                try:
+                    prepare()
+                except Exception as e:
+                    print(f"Warning: Startup preparation failed. Error: {e}")
+            stats = warmup(keys)
+            print(startup_report(stats, keys, time.perf_counter() - start))
+
+        _warmup_thread = threading.Thread(target=run, daemon=True)
+        _warmup_thread.start()
+    return _warmup_thread
+
+def model_stats():
+    with _registry_lock:
+        keys = list(_loaders)
+    return {key: dict(_stats.get(key, {}), loaded=key in _models, status=model_status(key)) for key in keys}
+
+def _fmt(value, spec):
+    return "-" if value is None else format(value, spec)
+
+def startup_report(stats, keys=None, total_seconds=None):
+    lines = [f"{'model':<36} | {'status':<8} | {'load s':>7} | {'warmup s':>8} | {'rss MB':>7} | {'weights MB':>10}", "-" * 91]
+    for key in keys or list(stats):
+        entry = stats.get(key, {})
+        lines.append(f"{key:<36} | {entry.get('status', '-'):<8} | {_fmt(entry.get('load_seconds'), '7.2f'):>7} | {_fmt(entry.get('warmup_seconds'), '8.2f'):>8} | {_fmt(entry.get('rss_delta_mb'), '7.1f'):>7} | {_fmt(entry.get('weights_mb'), '10.1f'):>10}")
+    if total_seconds is not None:
+        lines.append(f"Startup finished after {total_seconds:.2f}s")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    keys = sys.argv[1:] or None
+    start = time.perf_counter()
+    print(startup_report(warmup(keys), keys, time.perf_counter() - start))
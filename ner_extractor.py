@@ -4,11 +4,149 @@ import sys
 
 import re
 
-from transformers import pipeline
+import difflib
 
-ner_classifier = pipeline("zero-shot-classification", model="valhalla/distilbart-mnli-12-1")
+from functools import lru_cache
 
-def extract_entities(query):
+from zero_shot import PrecomputedZeroShot
+
+from keyword_rules import match_rules
+
+SLOTS_TO_FILL = {
+
+    "department": ["Finance", "HR", "Engineering", "IT", "Sales", "Marketing", "Legal"],
+
+    "ticket_type": ["Software Issue", "Hardware Issue", "Network Issue", "Access Request"],
+
+    "application_name": ["SAP", "Outlook", "Teams", "Jira", "Workday", "Azure", "AWS", "Salesforce", "ServiceNow", "Slack"],
+
+    "metric": ["Revenue", "Growth", "Headcount", "Turnover", "Profit", "EBITDA", "Margin", "Dividend", "ESG", "Sustainability", "Carbon", "Retention"]
+
+}
+
+# Mentions this close to a label (difflib ratio) count as that label, so typos skip the model too
+
+GAZETTEER_FUZZY_CUTOFF = 0.85
+
+# Words too common in ordinary questions to name a value on their own ("sales figures", "access to the drive");
+# the classifier decides those, and the full label ("Access Request") still matches
+
+GAZETTEER_GENERIC_WORDS = {"access", "software", "network", "sales"}
+
+def _gazetteer_aliases(label):
+
+    # A multi-word label is also named by its head word: "hardware" means "Hardware Issue"
+
+    words = label.split()
+
+    aliases = [label] + ([words[0]] if len(words) > 1 else [])
+
+    return [alias for alias in aliases if alias.lower() not in GAZETTEER_GENERIC_WORDS]
+
+def _gazetteer_pattern(alias):
+
+    # Two-letter acronyms only match in capitals, otherwise every "it" would be the IT department
+
+    return re.compile(r'\b' + re.escape(alias) + r'\b', 0 if len(alias) <= 2 else re.IGNORECASE)
+
+GAZETTEER = {slot: [(label, [_gazetteer_pattern(alias) for alias in _gazetteer_aliases(label)]) for label in labels] for slot, labels in SLOTS_TO_FILL.items()}
+
+def _fuzzy_label(words, slot):
+
+    best_label, best_ratio, ambiguous = None, GAZETTEER_FUZZY_CUTOFF, False
+
+    for label in SLOTS_TO_FILL[slot]:
+
+        for alias in _gazetteer_aliases(label):
+
+            # Short names are one edit away from ordinary words ("team" / "Teams"), so only long ones are fuzzy
+
+            if len(alias) < 6:
+
+                continue
+
+            size = len(alias.split())
+
+            matcher = difflib.SequenceMatcher(None, "", alias.lower())
+
+            for i in range(len(words) - size + 1):
+
+                matcher.set_seq1(" ".join(words[i:i + size]))
+
+                if matcher.real_quick_ratio() < best_ratio or matcher.quick_ratio() < best_ratio:
+
+                    continue
+
+                ratio = matcher.ratio()
+
+                if ratio > best_ratio or (ratio == best_ratio and best_label is None):
+
+                    best_label, best_ratio, ambiguous = label, ratio, False
+
+                elif ratio == best_ratio and label != best_label:
+
+                    # Two different labels equally close is not an obvious value; only a closer one settles it
+
+                    ambiguous = True
+
+    return None if ambiguous else best_label
+
+@lru_cache(maxsize=1024)
+
+def gazetteer_matches(query):
+
+    # Slot values named in the query itself, exactly or with a small typo. A slot whose mentions point at more
+    # than one label is left out, since that is exactly the case the classifier is for.
+
+    words = re.findall(r"[a-z][\w&-]*", query.lower())
+
+    matches = {}
+
+    for slot, entries in GAZETTEER.items():
+
+        exact = [label for label, patterns in entries if any(p.search(query) for p in patterns)]
+
+        if len(exact) == 1:
+
+            matches[slot] = exact[0]
+
+        elif not exact:
+
+            fuzzy = _fuzzy_label(words, slot)
+
+            if fuzzy:
+
+                matches[slot] = fuzzy
+
+    return tuple(matches.items())
+
+def slots_to_check(query):
+
+    rules = match_rules(query)
+
+    likely_slots = []
+
+    if rules.any("slots", "ticket"):
+
+        likely_slots.extend(["department", "ticket_type"])
+
+    if rules.any("slots", "access"):
+
+        likely_slots.extend(["application_name"])
+
+    if rules.any("slots", "metric"):
+
+        likely_slots.extend(["metric"])
+
+    return list(dict.fromkeys(likely_slots)) if likely_slots else list(SLOTS_TO_FILL.keys())
+
+def slots_needing_nli(query):
+
+    resolved = dict(gazetteer_matches(query))
+
+    return [slot for slot in slots_to_check(query) if slot not in resolved]
+
+def extract_entities(query, classifier=None, fill_slots=True):
     if isinstance(query, list): query = " ".join([str(x) for x in query])
     if isinstance(query, dict): query = query.get("text", str(query))
     if not isinstance(query, str): query = str(query)
@@ -88,47 +226,29 @@ def extract_entities(query):
 
         entities["priority"] = "Medium"
 
-    slots_to_fill = {
-
-        "department": ["Finance", "HR", "Engineering", "IT", "Sales", "Marketing", "Legal"],
-
-        "ticket_type": ["Software Issue", "Hardware Issue", "Network Issue", "Access Request"],
-
-        "application_name": ["SAP", "Outlook", "Teams", "Jira", "Workday", "Azure", "AWS", "Salesforce", "ServiceNow", "Slack"],
-
-        "metric": ["Revenue", "Growth", "Headcount", "Turnover", "Profit", "EBITDA", "Margin", "Dividend", "ESG", "Sustainability", "Carbon", "Retention"]
-
-    }
-
-    
+    slots = slots_to_check(query)
 
-                                                                          
+    resolved = dict(gazetteer_matches(query))
 
-    likely_slots = []
+    # Only slots this query calls for are filled, from the gazetteer where the query names the value outright
 
-    if any(k in query.lower() for k in ["issue", "broken", "failed", "repair", "ticket", "not working"]):
+    entities.update({slot: value for slot, value in resolved.items() if slot in slots})
 
-        likely_slots.extend(["department", "ticket_type"])
+    # Without slot filling only what the query names outright is kept; no classifier call is made
 
-    if any(k in query.lower() for k in ["access", "password", "login", "permission", "account"]):
+    pending = [slot for slot in slots if slot not in resolved] if fill_slots else []
 
-        likely_slots.extend(["application_name"])
+    # Whatever the gazetteer could not settle is scored against the query in one NLI batch
 
-    if any(k in query.lower() for k in ["how many", "what is", "revenue", "profit", "report", "growth", "metric"]):
+    if pending:
 
-        likely_slots.extend(["metric"])
+        classifier = classifier or PrecomputedZeroShot(query, [SLOTS_TO_FILL[slot] for slot in pending])
 
-        
-
-                                                                 
-
-    slots_to_check = list(set(likely_slots)) if likely_slots else list(slots_to_fill.keys())
+    for slot in pending:
 
-    for slot in slots_to_check:
+        labels = SLOTS_TO_FILL[slot]
 
-        labels = slots_to_fill[slot]
-
-        result = ner_classifier(query, labels, multi_label=False)
+        result = classifier(query, labels, multi_label=False)
 
         if result['scores'][0] > 0.65:
 
@@ -166,9 +286,9 @@ def extract_entities(query):
 
             break
 
-    meeting_keywords = ['meeting', 'book', 'schedule', 'arrange']
+    rules = match_rules(query)
 
-    if any(keyword in query.lower() for keyword in meeting_keywords):
+    if rules.any("slots", "meeting"):
 
         topic_patterns = [
 
@@ -200,9 +320,7 @@ def extract_entities(query):
 
                 entities["topic"] = "Business Discussion"
 
-    it_keywords = ['broken', 'issue', 'laptop', 'access', 'failed', 'problem', 'reset', 'password', 'slow', 'flickering', 'ticket', 'hardware', 'monitor', 'screen', 'keyboard', 'mouse', 'functioning', 'working', 'help', 'repair', 'fix']
-
-    is_action_like = any(k in query.lower() for k in it_keywords)
+    is_action_like = rules.any("slots", "it_action")
 
     
 
@@ -210,7 +328,7 @@ def extract_entities(query):
 
         entities["description"] = query
 
-    elif "ticket" in query.lower() or "help" in query.lower():
+    elif rules.any("slots", "ticket_or_help"):
 
         entities["description"] = "..."
 
@@ -0,0 +1,50 @@
+import json
+import sys
+
+from intent_detector import INTENT_MAP, detect_intent, intent_needs_nli
+from sentiment_analyzer import URGENCY_LABELS, urgency_signals, analyze_sentiment_and_urgency
+from ner_extractor import SLOTS_TO_FILL, slots_needing_nli, extract_entities
+from zero_shot import PrecomputedZeroShot
+from inference_scheduler import coalesce, run_stage, sentiment
+
+NLU_TASKS = ("intent", "sentiment", "entities")
+# "mentions" is also available: entities without NLI slot filling (ids, dates, priorities, gazetteer values)
+
+def nli_label_groups(query, tasks=NLU_TASKS, intent_method="auto"):
+    groups = []
+    if "intent" in tasks and intent_needs_nli(query, intent_method):
+        groups.append(list(INTENT_MAP))
+    if "sentiment" in tasks and not urgency_signals(query):
+        groups.append(URGENCY_LABELS)
+    if "entities" in tasks:
+        groups.extend(SLOTS_TO_FILL[slot] for slot in slots_needing_nli(query))
+    return groups
+
+def analyze_message(query, tasks=NLU_TASKS, intent_method="auto"):
+    if isinstance(query, list): query = " ".join([str(x) for x in query])
+    if isinstance(query, dict): query = query.get("text", str(query))
+    if not isinstance(query, str): query = str(query)
+    # A burst of the same message is analysed once
+    return coalesce("nlu", (query, tuple(tasks), intent_method), _analyze_message, query, tuple(tasks), intent_method)
+
+def _analyze_message(query, tasks, intent_method):
+    # The SST-2 pass needs nothing from the NLI batch, so it runs alongside it
+    polarity = run_stage(sentiment, [query]) if "sentiment" in tasks and query.strip() else None
+    # Every hypothesis the requested tasks need is scored in one padded NLI batch; each analyzer then
+    # reads its label set back out of the shared result instead of calling the model itself
+    groups = nli_label_groups(query, tasks, intent_method) if query.strip() else []
+    classifier = PrecomputedZeroShot(query, groups)
+    results = {}
+    if "intent" in tasks:
+        results["intent"] = detect_intent(query, method=intent_method, classifier=classifier)
+    if "sentiment" in tasks:
+        results["sentiment"] = analyze_sentiment_and_urgency(query, classifier=classifier, polarity=polarity.result()[0] if polarity else None)
+    if "entities" in tasks:
+        results["entities"] = extract_entities(query, classifier=classifier)
+    if "mentions" in tasks:
+        results["mentions"] = extract_entities(query, fill_slots=False)
+    return results
+
+if __name__ == "__main__":
+    test_query = sys.argv[1] if len(sys.argv) > 1 else "My laptop is broken and I need a Hardware ticket for the Finance team ASAP"
+    print(json.dumps(analyze_message(test_query), indent=2))
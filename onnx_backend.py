@@ -0,0 +1,51 @@
+import os
+import platform
+
+# Exported and quantized models are cached here, one directory per model
+ONNX_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx_models")
+
+def default_quantization():
+    # avx2 kernels run on every x86 node we deploy to; ARM hosts need the arm64 config
+    return "arm64" if platform.machine().lower() in ("arm64", "aarch64") else "avx2"
+
+def cache_dir_for(model_name):
+    return os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "__"))
+
+def _require_optimum():
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    except ImportError:
+        raise ImportError("The ONNX backend needs Optimum and ONNX Runtime: pip install -r requirements-onnx.txt")
+    return ORTModelForSequenceClassification, ORTQuantizer, AutoQuantizationConfig
+
+def load_quantized_zero_shot(model_name, quantization=None):
+    ORTModelForSequenceClassification, ORTQuantizer, AutoQuantizationConfig = _require_optimum()
+    from transformers import AutoTokenizer, pipeline
+    quantization = quantization or default_quantization()
+    save_dir = cache_dir_for(model_name)
+    file_name = f"model_qint8_{quantization}.onnx"
+    if not os.path.exists(os.path.join(save_dir, file_name)):
+        print(f"Exporting {model_name} to ONNX with dynamic int8 quantization ({quantization})...")
+        fp32_dir = os.path.join(save_dir, "fp32")
+        ORTModelForSequenceClassification.from_pretrained(model_name, export=True).save_pretrained(fp32_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(save_dir)
+        quantizer = ORTQuantizer.from_pretrained(fp32_dir)
+        config = getattr(AutoQuantizationConfig, quantization)(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=save_dir, quantization_config=config, file_suffix=f"qint8_{quantization}")
+    model = ORTModelForSequenceClassification.from_pretrained(save_dir, file_name=file_name)
+    # The transformers pipeline keeps the exact zero-shot semantics (hypothesis template, entailment softmax)
+    return pipeline("zero-shot-classification", model=model, tokenizer=AutoTokenizer.from_pretrained(save_dir))
+
+def load_quantized_cross_encoder(model_name, quantization=None):
+    _require_optimum()
+    from sentence_transformers import CrossEncoder, export_dynamic_quantized_onnx_model
+    quantization = quantization or default_quantization()
+    save_dir = cache_dir_for(model_name)
+    file_name = os.path.join("onnx", f"model_qint8_{quantization}.onnx")
+    if not os.path.exists(os.path.join(save_dir, file_name)):
+        print(f"Exporting {model_name} to ONNX with dynamic int8 quantization ({quantization})...")
+        model = CrossEncoder(model_name, backend="onnx")
+        model.save_pretrained(save_dir)
+        export_dynamic_quantized_onnx_model(model, quantization, save_dir)
+    return CrossEncoder(save_dir, backend="onnx", model_kwargs={"file_name": file_name})
@@ -10,7 +10,27 @@ from PIL import Image
 
 import io
 
-nltk.download("punkt", quiet=True)
+from lexical_index import get_bigrams
+
+_punkt_ready = False
+
+def ensure_punkt():
+
+    # Checked on first use instead of at import, so importing this module never touches the network
+
+    global _punkt_ready
+
+    if not _punkt_ready:
+
+        try:
+
+            nltk.data.find("tokenizers/punkt")
+
+        except LookupError:
+
+            nltk.download("punkt", quiet=True)
+
+        _punkt_ready = True
 
 def clean_text(text: str) -> str:
 
@@ -48,18 +68,12 @@ def clean_text(text: str) -> str:
 
     return text.strip()
 
-def get_bigrams(text):
-
-                                                                  
-
-    words = re.findall(r'\w{3,}', text.lower())
-
-    return [" ".join(pair) for pair in zip(words, words[1:])]
-
 def chunk_text(text, max_words=450, overlap_words=80):
 
                                                                                   
 
+    ensure_punkt()
+
     sentences = nltk.sent_tokenize(text)
 
     chunks, current_chunk, current_len = [], [], 0
@@ -154,6 +168,10 @@ def detect_section(text: str) -> str:
 
         return "Risk Management"
 
+    if "information technology" in text_lower or "information security" in text_lower or "cybersecurity" in text_lower or "cyber security" in text_lower:
+
+        return "Information Technology"
+
     if "environmental" in text_lower or "sustainability" in text_lower or "esg" in text_lower:
 
         return "Sustainability"
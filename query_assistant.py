@@ -8,19 +8,47 @@ import faiss
 
 import re
 
-from sentence_transformers import SentenceTransformer, CrossEncoder
+from index_chunks import make_search_params
 
-embedding_model = SentenceTransformer('all-mpnet-base-v2')
+from chunk_store import store_base_path, store_exists
 
-rerank_model = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
+from chunk_features import KEYWORD_HIT_CAP, compute_boosts
 
-_cached_index = None
+from index_handle import IndexRegistry
 
-_cached_mapping = None
+from model_registry import get_embedding_model
 
-_cached_index_path = None
+from inference_scheduler import coalesce, embed, rerank, raise_if_cancelled
 
-_cached_mapping_path = None
+SECTION_FILTER_MIN_CHUNKS = 30
+
+DEFAULT_INDEX_PATH = "faq_index.faiss"
+
+DEFAULT_MAPPING_PATH = "chunks_mapping.json"
+
+# Several corpora can stay loaded at once; the least recently used idle one is unloaded past either limit
+
+INDEX_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+INDEX_CACHE_MAX_CORPORA = 4
+
+_index_registry = IndexRegistry(max_bytes=INDEX_CACHE_MAX_BYTES, max_corpora=INDEX_CACHE_MAX_CORPORA)
+
+def query_encoder(corpus):
+
+    # The query side must use the encoder that built the index; a different model gives meaningless distances
+
+    encoder = corpus.manifest["embedding_model"]
+
+    model = get_embedding_model(encoder["name"])
+
+    dimension = model.get_sentence_embedding_dimension()
+
+    if dimension != corpus.index.d:
+
+        raise ValueError(f"Encoder '{encoder['name']}' produces {dimension}-dim vectors but {corpus.index_path} holds {corpus.index.d}-dim vectors. Rebuild the index or fix its manifest.")
+
+    return model, encoder.get("normalize", False)
 
 def expand_query(query):
 
@@ -84,39 +112,127 @@ def expand_query(query):
 
                                                                            
 
-        return query + " " + " ".join(list(set(expanded_terms))[:4])
+        # First-seen order, so every process expands a query the same way
+
+        return query + " " + " ".join(list(dict.fromkeys(expanded_terms))[:4])
 
     return query
 
-def get_bigrams(text):
+RERANK_POLICIES = {
 
-    words = re.findall(r'\w{3,}', text.lower())
+    "default": {"pool_size": 120, "batch_size": 32, "min_scored": 64, "stop_margin": 2.0},
 
-                                                                    
+    "ask_finance": {"pool_size": 150, "batch_size": 32, "min_scored": 64, "stop_margin": 2.0},
 
-    stops = {'the', 'and', 'for', 'with', 'from', 'that', 'this'}
+    "ask_hr": {"pool_size": 120, "batch_size": 32, "min_scored": 48, "stop_margin": 2.0},
 
-    words = [w for w in words if w not in stops]
+    "ask_people": {"pool_size": 80, "batch_size": 16, "min_scored": 32, "stop_margin": 3.0},
 
-    return set(zip(words, words[1:]))
+    "ask_it_policy": {"pool_size": 100, "batch_size": 32, "min_scored": 48, "stop_margin": 2.0},
 
-def retrieve_chunks(query, index_path, mapping_path, k=5, boost_keywords=None, section_filter=None):
+    "exhaustive": {"pool_size": 300, "batch_size": 300, "min_scored": 300, "stop_margin": None}
 
-                                                                                 
+}
 
-    global _cached_index, _cached_mapping, _cached_index_path, _cached_mapping_path
+def resolve_rerank_policy(intent=None, rerank_policy=None):
 
-    
+    if isinstance(rerank_policy, str):
 
-                                     
+        return dict(RERANK_POLICIES[rerank_policy])
 
-    query_clean = query.strip().replace("?", "").replace("!", "")
+    policy = dict(RERANK_POLICIES.get(intent) or RERANK_POLICIES["default"])
 
-                                                                
+    if rerank_policy:
 
-    
+        policy.update(rerank_policy)
+
+    return policy
+
+def _apply_boosts(candidates, rerank_scores):
+
+    for candidate, rerank_score in zip(candidates, rerank_scores):
+
+        candidate["score"] = float(rerank_score) + candidate["boost"]
+
+def _rerank_cascade(queries_clean, pools, k, policy):
+
+    batch_size = max(1, policy["batch_size"])
+
+    min_scored = max(policy["min_scored"], k)
+
+    stop_margin = policy["stop_margin"]
+
+    scored = [[] for _ in pools]
+
+    previous_top = [None] * len(pools)
+
+    active = [bool(pool) for pool in pools]
+
+    offset = 0
+
+    while any(active):
+
+        batches = [pools[p][offset:offset + batch_size] if active[p] else [] for p in range(len(pools))]
+
+        # One cross-encoder call per round covers every active part; identical (query, chunk) pairs are scored once
+
+        pair_index = {}
+
+        pairs = []
+
+        for p, batch in enumerate(batches):
+
+            for c in batch:
+
+                key = (queries_clean[p], c['chunk_id'])
+
+                if key not in pair_index:
+
+                    pair_index[key] = len(pairs)
+
+                    pairs.append([queries_clean[p], c['content']])
 
-    expanded_query = expand_query(query_clean)
+        rerank_scores = rerank(pairs) if pairs else []
+
+        for p, batch in enumerate(batches):
+
+            if not batch:
+
+                active[p] = False
+
+                continue
+
+            _apply_boosts(batch, [rerank_scores[pair_index[(queries_clean[p], c['chunk_id'])]] for c in batch])
+
+            scored[p].extend(batch)
+
+            if offset + batch_size >= len(pools[p]):
+
+                active[p] = False
+
+            if stop_margin is None or len(scored[p]) < min_scored:
+
+                continue
+
+            ranked = sorted(scored[p], key=lambda x: x['score'], reverse=True)
+
+            top_ids = [c['chunk_id'] for c in ranked[:k]]
+
+            kth_score = ranked[min(k, len(ranked)) - 1]['score']
+
+            # Stop once the top-k survived a full increment and the latest batch fell clearly below it
+
+            if top_ids == previous_top[p] and max(c['score'] for c in batch) < kth_score - stop_margin:
+
+                active[p] = False
+
+            previous_top[p] = top_ids
+
+        offset += batch_size
+
+    return scored
+
+def _resolve_paths(index_path, mapping_path):
 
     base_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -124,189 +240,192 @@ def retrieve_chunks(query, index_path, mapping_path, k=5, boost_keywords=None, s
 
     if not os.path.isabs(mapping_path): mapping_path = os.path.join(base_dir, mapping_path)
 
-    
+    return index_path, mapping_path
 
-    if not os.path.exists(index_path) or not os.path.exists(mapping_path): return None
+def knowledge_base_exists(index_path, mapping_path):
 
-        
+    index_path, mapping_path = _resolve_paths(index_path, mapping_path)
 
-    if _cached_index_path != index_path or _cached_index is None:
+    return os.path.exists(index_path) and (os.path.exists(mapping_path) or store_exists(store_base_path(mapping_path)))
 
-        _cached_index = faiss.read_index(index_path)
+def register_corpus(corpus_id, index_path, mapping_path):
 
-        _cached_index_path = index_path
+    return _index_registry.register(corpus_id, *_resolve_paths(index_path, mapping_path))
 
-    
+def get_index_handle(index_path=DEFAULT_INDEX_PATH, mapping_path=DEFAULT_MAPPING_PATH, corpus_id=None):
 
-    if _cached_mapping_path != mapping_path or _cached_mapping is None:
+    if corpus_id is None:
 
-        with open(mapping_path, 'r', encoding='utf-8') as f:
+        # Unnamed corpora are keyed by their resolved file paths
 
-            _cached_mapping = json.load(f)
+        corpus_id = _resolve_paths(index_path, mapping_path)
 
-                                                       
+        if not knowledge_base_exists(*corpus_id): return None
 
-            for chunk in _cached_mapping:
+        return _index_registry.register(corpus_id, *corpus_id)
 
-                if 'bigrams' not in chunk:
+    handle = _index_registry.handle(corpus_id)
 
-                    chunk['bigrams'] = list(get_bigrams(chunk['content']))
+    if handle is None: raise ValueError(f"Unknown corpus '{corpus_id}'. Register it with register_corpus() first.")
 
-        _cached_mapping_path = mapping_path
+    return handle if knowledge_base_exists(handle.index_path, handle.mapping_path) else None
 
-    
+def index_handles():
 
-    index = _cached_index
+    return _index_registry.handles()
 
-    chunks = _cached_mapping
+def index_registry_stats():
 
-        
+    return _index_registry.stats()
 
-                                            
+def current_index_version(index_path=DEFAULT_INDEX_PATH, mapping_path=DEFAULT_MAPPING_PATH, corpus_id=None):
 
-                                                        
+    handle = get_index_handle(index_path, mapping_path, corpus_id)
 
-    query_vector = embedding_model.encode([expanded_query]).astype('float32')
+    return handle.version if handle else None
 
-    distances_sem, indices_sem = index.search(query_vector, 1000) 
+def serving_index_version(index_path=DEFAULT_INDEX_PATH, mapping_path=DEFAULT_MAPPING_PATH, corpus_id=None):
 
-    
+    # Version of the snapshot a request would be served from now; unlike current_index_version() this loads the
 
-                                          
+    # corpus when it is not resident, so it is only None when there is no knowledge base
 
-    stops = {'what', 'which', 'who', 'the', 'and', 'for', 'with', 'from', 'that', 'this', 'date', 'name', 'how', 'when', 'where', 'why', 'does', 'did', 'has', 'have', 'been', 'were', 'was', 'is', 'are', 'it', 'in', 'on', 'at', 'about'}
+    handle = get_index_handle(index_path, mapping_path, corpus_id)
 
-    query_tokens = set(re.findall(r'\w{3,}', query_clean.lower()))
+    if handle is None: return None
 
-    query_tokens = {t for t in query_tokens if t not in stops}
+    with _index_registry.lease(handle.corpus_id) as corpus:
 
-    
+        return corpus.version
 
-    candidate_map = {}
+def reload_index(index_path=DEFAULT_INDEX_PATH, mapping_path=DEFAULT_MAPPING_PATH, background=True, corpus_id=None):
 
-    for rank, idx in enumerate(indices_sem[0]):
+    handle = get_index_handle(index_path, mapping_path, corpus_id)
 
-        if idx < len(chunks):
+    if handle is None: return None
 
-            chunk = chunks[idx].copy()
+    return handle.reload(background=background, force=True)
 
-            content_lower = chunk['content'].lower()
+def watch_index(index_path=DEFAULT_INDEX_PATH, mapping_path=DEFAULT_MAPPING_PATH, interval=10.0, corpus_id=None):
 
-            chunk_tokens = set(re.findall(r'\w{3,}', content_lower))
+    handle = get_index_handle(index_path, mapping_path, corpus_id)
 
-            
+    if handle is None: return None
 
-                                 
+    # Nothing is loaded here: until a request (or the warmup) loads the corpus the watcher has nothing to refresh,
+    # and that first load reads the current files anyway
 
-            overlap = len(query_tokens.intersection(chunk_tokens))
+    return handle.watch(interval)
 
-            
+def _first_stage_pool(query_clean, distances, indices, chunks, lexical_index, features, pool_size, boost_keywords=None):
 
-                            
+    ranks = np.nonzero((indices >= 0) & (indices < len(chunks)))[0]
 
-            query_bigrams = get_bigrams(query_clean)
+    rows = indices[ranks]
 
-            chunk_bigrams = set(chunk.get('bigrams', []))
+    overlap, bigram_overlap = lexical_index.overlap_scores(query_clean, rows)
 
-            bigram_overlap = len(query_bigrams.intersection(chunk_bigrams))
+    keyword_hits = lexical_index.keyword_hits(boost_keywords, rows) if boost_keywords else np.zeros(len(rows), dtype=np.int32)
 
-            
+    rrf_scores = 1.0 / (60 + ranks) + (overlap * 0.5) + (bigram_overlap * 1.0) + (np.minimum(keyword_hits, KEYWORD_HIT_CAP) * 0.25)
 
-                                                          
+    order = np.argsort(-rrf_scores, kind='stable')[:pool_size]
 
-            rrf_base = 1.0 / (60 + rank)
+    pool = [dict(chunks[row]) for row in rows[order]]
 
-            lex_score = (overlap * 0.5) + (bigram_overlap * 1.0)                    
+    # Boosts depend only on (query, chunk), so the whole pool is scored in one vectorised pass up front
 
-            
+    boosts = compute_boosts(features, rows[order], query_clean, [c['content'] for c in pool], keyword_hits[order])
 
-            chunk["rrf_score"] = rrf_base + lex_score
+    for chunk, pos, boost in zip(pool, order, boosts):
 
-            candidate_map[idx] = chunk
+        chunk["rrf_score"] = float(rrf_scores[pos])
 
-                                                                          
+        chunk["vector_distance"] = float(distances[ranks[pos]])
 
-    sorted_candidates = sorted(candidate_map.values(), key=lambda x: x["rrf_score"], reverse=True)
+        chunk["keyword_hits"] = int(keyword_hits[pos])
 
-    rerank_pool = sorted_candidates[:300]
+        chunk["boost"] = float(boost)
 
-    if not rerank_pool: return []
+    return pool
 
-                                                                   
+def _retrieve_from_corpus(corpus, queries, k, boost_keywords, section_filter, intent, rerank_policy, search_params, cancel=None):
 
-    pairs = [[query_clean, c['content']] for c in rerank_pool]
+    index, chunks, lexical_index, features = corpus.index, corpus.chunks, corpus.lexical_index, corpus.features
 
-    rerank_scores = rerank_model.predict(pairs)
+    queries_clean = [q.strip().replace("?", "").replace("!", "") for q in queries]
 
-    
+    expanded_queries = [expand_query(q) for q in queries_clean]
 
-    for i, candidate in enumerate(rerank_pool):
+    _, normalize = query_encoder(corpus)
 
-        boost = 0.0
+    query_vectors = embed(corpus.manifest["embedding_model"]["name"], expanded_queries, normalize).astype('float32')
 
-        content_lower = candidate['content'].lower()
+    search_k = min(1000, index.ntotal)
 
-        
+    selector = None
 
-                                          
+    if section_filter:
 
-        important_names = ["vijaykumar", "roshni", "nadar", "hcltech", "hcl software", "hcl", "vijayakumar", "shiv", "walia", "inspeq", "ethisphere", "forbes", "newsweek", "microsoft", "google", "dell", "intel", "subsidiary", "india", "incorporated", "financial", "asset", "capital"]
+        section_rows = corpus.filtered_rows(section_filter)
 
-        for name in important_names:
+        # Push the filter into FAISS; fall back to the full corpus when the section is too thin to answer from
 
-            if name in query_clean.lower() and name in content_lower:
+        if len(section_rows) >= max(SECTION_FILTER_MIN_CHUNKS, k):
 
-                boost += 12.0                                   
+            selector = faiss.IDSelectorBatch(section_rows)
 
-        
+            search_k = min(search_k, len(section_rows))
 
-                                             
+    distances_sem, indices_sem = index.search(query_vectors, search_k, params=make_search_params(index, search_params, selector))
 
-        query_numbers = re.findall(r'\b\d{2,}\b', query_clean)
+    policy = resolve_rerank_policy(intent, rerank_policy)
 
-        for num in query_numbers:
+    # A caller that no longer needs the result (cancel set) stops here or before reranking, the two costly steps left
 
-            if num in candidate['content']:
+    raise_if_cancelled(cancel)
 
-                boost += 10.0                         
+    pools = [_first_stage_pool(q, distances_sem[i], indices_sem[i], chunks, lexical_index, features, policy["pool_size"], boost_keywords) for i, q in enumerate(queries_clean)]
 
-        
+    results = []
 
-                                                                        
+    raise_if_cancelled(cancel)
 
-        if any(kw in query_clean.lower() for kw in ["revenue", "profit", "report", "rsus", "payment", "date", "incorporate", "company", "what is"]):
+    for scored in _rerank_cascade(queries_clean, pools, k, policy):
 
-            boilerplate_kws = ["forward-looking", "terms of use", "table of contents", "index", "notice of", "cautionary", "disclaimer"]
+        scored.sort(key=lambda x: x['score'], reverse=True)
 
-            if any(bk in content_lower for bk in boilerplate_kws):
+        for chunk in scored[:k]:
 
-                boost -= 10.0
+            chunk["index_version"] = corpus.version
 
-            
+        results.append(scored[:k])
 
-                                                                                   
+    return results
 
-            if len(candidate['content'].split()) < 40:
+def retrieve_chunks_batch(queries, index_path=DEFAULT_INDEX_PATH, mapping_path=DEFAULT_MAPPING_PATH, k=5, boost_keywords=None, section_filter=None, intent=None, rerank_policy=None, search_params=None, corpus_id=None, cancel=None):
 
-                boost -= 5.0
+    handle = get_index_handle(index_path, mapping_path, corpus_id)
 
-            
+    if handle is None: return None
 
-        candidate["score"] = float(rerank_scores[i]) + boost
+    if not queries: return []
 
-        
+    # The lease pins the corpus so it cannot be evicted while this request is still reading it
+
+    with _index_registry.lease(handle.corpus_id) as corpus:
 
-                                                                              
+        # Identical requests in flight against the same corpus version share one search
 
-        if query_clean.lower() in content_lower:
+        key = json.dumps([handle.corpus_id, corpus.version, list(queries), k, boost_keywords, section_filter, intent, rerank_policy, search_params], sort_keys=True, default=str)
 
-            candidate["score"] += 25.0
+        return coalesce("retrieval", key, _retrieve_from_corpus, corpus, queries, k, boost_keywords, section_filter, intent, rerank_policy, search_params, cancel)
 
-        candidate["vector_distance"] = float(distances_sem[0][i]) if i < len(distances_sem[0]) else 100.0
+def retrieve_chunks(query, index_path=DEFAULT_INDEX_PATH, mapping_path=DEFAULT_MAPPING_PATH, k=5, boost_keywords=None, section_filter=None, intent=None, rerank_policy=None, search_params=None, corpus_id=None, cancel=None):
 
-    rerank_pool.sort(key=lambda x: x['score'], reverse=True)
+    results = retrieve_chunks_batch([query], index_path, mapping_path, k=k, boost_keywords=boost_keywords, section_filter=section_filter, intent=intent, rerank_policy=rerank_policy, search_params=search_params, corpus_id=corpus_id, cancel=cancel)
 
-    return rerank_pool[:k]
+    return None if results is None else results[0]
 
 def format_rag_prompt(user_query, retrieved_chunks):
 
@@ -0,0 +1,198 @@
+import copy
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, deque
+
+import numpy as np
+
+RESPONSE_CACHE = True
+RESPONSE_CACHE_TTL_SECONDS = 3600.0
+RESPONSE_CACHE_MAX_ENTRIES = 512
+
+# Paraphrases of an answered question: cosine similarity of normalized query embeddings, same intent and index version
+SEMANTIC_CACHE = True
+SEMANTIC_CACHE_THRESHOLD = 0.9
+SEMANTIC_CACHE_MAX_ENTRIES = 256
+# Semantic hits, and misses within this margin of the threshold, are kept for tuning it
+SEMANTIC_AUDIT_MARGIN = 0.05
+SEMANTIC_AUDIT_SIZE = 1000
+SEMANTIC_AUDIT_PATH = None
+
+def set_response_cache(enabled, ttl_seconds=None, max_entries=None):
+    global RESPONSE_CACHE, RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_ENTRIES
+    RESPONSE_CACHE = enabled
+    if ttl_seconds is not None:
+        RESPONSE_CACHE_TTL_SECONDS = ttl_seconds
+    if max_entries is not None:
+        RESPONSE_CACHE_MAX_ENTRIES = max_entries
+
+def set_semantic_cache(enabled, threshold=None, max_entries=None, audit_path=None):
+    global SEMANTIC_CACHE, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_AUDIT_PATH
+    SEMANTIC_CACHE = enabled
+    if threshold is not None:
+        SEMANTIC_CACHE_THRESHOLD = threshold
+    if max_entries is not None:
+        SEMANTIC_CACHE_MAX_ENTRIES = max_entries
+    if audit_path is not None:
+        SEMANTIC_AUDIT_PATH = audit_path
+
+def normalize_query(query):
+    # Case, Unicode width, punctuation and spacing do not change the question being asked
+    text = unicodedata.normalize("NFKC", query).casefold()
+    return " ".join(re.findall(r"\w+", text))
+
+def cacheable(intent, index_version):
+    # Actions have side effects and answers without a known index version cannot be invalidated
+    return index_version is not None and not intent.startswith("action_")
+
+def response_key(query, intent, index_version):
+    # A stable digest rather than hash(), which is salted per process, so workers agree on keys
+    payload = json.dumps([normalize_query(query), intent, index_version], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    # RAG results (passages, retrieval score, synthesized answer) by response_key, least recently used first
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.counts = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "stores": 0}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None and time.monotonic() - entry[0] > RESPONSE_CACHE_TTL_SECONDS:
+                self.counts["expired"] += 1
+                entry = None
+            if entry is None:
+                self.counts["misses"] += 1
+                return None
+            self.entries[key] = entry
+            self.counts["hits"] += 1
+            # Copies, because the pipeline annotates the passages it gets back
+            return copy.deepcopy(entry[1])
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (time.monotonic(), copy.deepcopy(value))
+            self.counts["stores"] += 1
+            while len(self.entries) > RESPONSE_CACHE_MAX_ENTRIES:
+                self.entries.popitem(last=False)
+                self.counts["evictions"] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counts, entries=len(self.entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+def query_numbers(query):
+    # Years and figures must agree for two questions to share an answer; 2025 and FY25 both count as 25
+    return frozenset(n[2:] if len(n) == 4 and n.startswith("20") else n for n in re.findall(r"\d+", query))
+
+class SemanticResponseCache:
+    # Small in-memory vector index over the query embeddings of answered questions. Lookups only compare
+    # entries of the same intent and index version; entries of any other version are dropped on sight.
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.audit = deque(maxlen=SEMANTIC_AUDIT_SIZE)
+        self.counts = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidated": 0, "stores": 0}
+
+    def get(self, query, embedding, intent, index_version):
+        now = time.monotonic()
+        numbers = query_numbers(query)
+        with self.lock:
+            for key in [k for k, e in self.entries.items() if e["index_version"] != index_version]:
+                del self.entries[key]
+                self.counts["invalidated"] += 1
+            for key in [k for k, e in self.entries.items() if now - e["created"] > RESPONSE_CACHE_TTL_SECONDS]:
+                del self.entries[key]
+                self.counts["expired"] += 1
+            candidates = [k for k, e in self.entries.items() if e["intent"] == intent and e["numbers"] == numbers]
+            best_key, similarity = None, 0.0
+            if candidates:
+                similarities = np.stack([self.entries[k]["embedding"] for k in candidates]) @ embedding
+                best = int(np.argmax(similarities))
+                best_key, similarity = candidates[best], float(similarities[best])
+            hit = best_key is not None and similarity >= SEMANTIC_CACHE_THRESHOLD
+            self.counts["hits" if hit else "misses"] += 1
+            if best_key is not None and similarity >= SEMANTIC_CACHE_THRESHOLD - SEMANTIC_AUDIT_MARGIN:
+                self._log({"time": time.time(), "hit": hit, "query": query, "matched_query": self.entries[best_key]["query"],
+                           "similarity": round(similarity, 4), "threshold": SEMANTIC_CACHE_THRESHOLD, "intent": intent, "index_version": index_version})
+            if not hit:
+                return None
+            self.entries.move_to_end(best_key)
+            return copy.deepcopy(self.entries[best_key]["value"])
+
+    def put(self, key, query, embedding, intent, index_version, value):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = {"created": time.monotonic(), "query": query, "embedding": np.asarray(embedding, dtype=np.float32),
+                                 "numbers": query_numbers(query), "intent": intent, "index_version": index_version, "value": copy.deepcopy(value)}
+            self.counts["stores"] += 1
+            while len(self.entries) > SEMANTIC_CACHE_MAX_ENTRIES:
+                self.entries.popitem(last=False)
+                self.counts["evictions"] += 1
+
+    def _log(self, record):
+        self.audit.append(record)
+        if SEMANTIC_AUDIT_PATH:
+            with open(SEMANTIC_AUDIT_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counts, entries=len(self.entries), threshold=SEMANTIC_CACHE_THRESHOLD)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+_cache = ResponseCache()
+_semantic_cache = SemanticResponseCache()
+
+def lookup_response(key):
+    return _cache.get(key) if RESPONSE_CACHE else None
+
+def store_response(key, value):
+    if RESPONSE_CACHE:
+        _cache.put(key, value)
+
+def lookup_similar_response(query, embedding, intent, index_version):
+    return _semantic_cache.get(query, embedding, intent, index_version) if SEMANTIC_CACHE else None
+
+def store_similar_response(key, query, embedding, intent, index_version, value):
+    # Only grounded answers are worth serving to a paraphrase
+    if SEMANTIC_CACHE and value.get("answer") is not None:
+        _semantic_cache.put(key, query, embedding, intent, index_version, value)
+
+def clear_response_cache():
+    _cache.clear()
+    _semantic_cache.clear()
+
+def semantic_audit_log(limit=None):
+    with _semantic_cache.lock:
+        records = list(_semantic_cache.audit)
+    return records[-limit:] if limit else records
+
+def response_cache_stats():
+    return {"exact": _cache.stats(), "semantic": _semantic_cache.stats()}
+
+if __name__ == "__main__":
+    queries = sys.argv[1:] or ["What was revenue growth in FY25?", "what was revenue growth in FY25", "What was  Revenue Growth in FY25 ?"]
+    for query in queries:
+        print(f"{normalize_query(query)!r} -> {response_key(query, 'ask_finance', 'demo')[:16]}")
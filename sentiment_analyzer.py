@@ -2,15 +2,19 @@ import json
 
 import sys
 
-import re
+from inference_scheduler import sentiment
 
-from transformers import pipeline
+from zero_shot import zero_shot
 
-sentiment_pipeline = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
+from keyword_rules import match_rules, count_fast_lane
 
-zero_shot_pipeline = pipeline("zero-shot-classification", model="valhalla/distilbart-mnli-12-1")
+URGENCY_LABELS = ["urgent assistance required", "informational or general inquiry"]
 
-def analyze_sentiment_and_urgency(query):
+def urgency_signals(query):
+
+    return [signal.strip("()") for signal in match_rules(query).hits("urgency", "signals")]
+
+def analyze_sentiment_and_urgency(query, classifier=None, polarity=None):
     if isinstance(query, list): query = " ".join([str(x) for x in query])
     if isinstance(query, dict): query = query.get("text", str(query))
     if not isinstance(query, str): query = str(query)
@@ -20,7 +24,7 @@ def analyze_sentiment_and_urgency(query):
 
         
 
-    sentiment_result = sentiment_pipeline(query)[0]
+    sentiment_result = polarity or sentiment([query])[0]
 
     label = sentiment_result['label'].lower()
 
@@ -28,9 +32,7 @@ def analyze_sentiment_and_urgency(query):
 
     
 
-    question_keywords = ["what", "how", "who", "where", "when", "why", "revenue", "profit", "ebitda", "growth"]
-
-    is_question = any(query.lower().startswith(kw) for kw in question_keywords) or "?" in query
+    is_question = match_rules(query).any("question", "question") or "?" in query
 
     
 
@@ -48,49 +50,27 @@ def analyze_sentiment_and_urgency(query):
 
         
 
-    candidate_labels = ["urgent assistance required", "informational or general inquiry"]
+    signals = urgency_signals(query)
 
-    urgency_result = zero_shot_pipeline(query, candidate_labels)
-
-    
+    # A keyword signal makes the message urgent whatever the classifier says, so it is only asked when none fired
 
-    is_urgent_ml = (
+    count_fast_lane("urgency", signals)
 
-        urgency_result['labels'][0] == "urgent assistance required" 
-
-        and urgency_result['scores'][0] > 0.85
-
-    )
-
-    
+    is_urgent_ml = False
 
-    urgency_signals = []
-
-    keywords = [
-
-        r"\basap\b", r"\burgent\b", r"\bcritical\b", r"\bimmediately\b", 
-
-        r"\bfire\b", r"\bemergency\b", r"\bstuck\b", 
-
-        r"\bblocking\b", r"\bdeadline\b",
-
-        r"\(urgent\)", r"\(asap\)", r"\(critical\)" 
-
-    ]
-
-    
+    if not signals:
 
-    for kw in keywords:
+        urgency_result = (classifier or zero_shot)(query, URGENCY_LABELS)
 
-        if re.search(kw, query, re.IGNORECASE):
+        is_urgent_ml = (
 
-            signal_name = re.sub(r'\\b|\(|\)', '', kw)
+            urgency_result['labels'][0] == "urgent assistance required" 
 
-            urgency_signals.append(signal_name)
+            and urgency_result['scores'][0] > 0.85
 
-            
+        )
 
-    final_urgent = is_urgent_ml or len(urgency_signals) > 0
+    final_urgent = is_urgent_ml or len(signals) > 0
 
     
 
@@ -106,7 +86,7 @@ def analyze_sentiment_and_urgency(query):
 
         "is_urgent": final_urgent,
 
-        "signals": urgency_signals
+        "signals": signals
 
     }
 
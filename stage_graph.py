@@ -0,0 +1,52 @@
+import copy
+import inspect
+import time
+
+class Stage:
+    # One node of a pipeline: what it reads from the context, what it writes, and when it is worth running.
+    # A skipped stage fills in its defaults for outputs no earlier stage wrote, so later stages always find
+    # their inputs; of two stages that write the same output only one is meant to run.
+    def __init__(self, name, run, inputs=(), outputs=(), when=None, skip_reason="", defaults=None, on_skip=None):
+        self.name = name
+        self.run = run
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.when = when
+        self.skip_reason = skip_reason
+        self.defaults = defaults or {}
+        self.on_skip = on_skip
+
+class StageGraph:
+    # Stages run in declaration order; each may be a plain function returning its outputs or a generator that
+    # yields events on the way and returns its outputs
+    def __init__(self, stages, initial=()):
+        self.stages = list(stages)
+        available = set(initial)
+        for stage in self.stages:
+            missing = [name for name in stage.inputs if name not in available]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' reads {missing} before any earlier stage writes them.")
+            missing = [name for name in stage.outputs if name not in stage.defaults and name not in available and stage.when is not None]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' can be skipped but has no defaults for {missing}.")
+            available.update(stage.outputs)
+
+    def run(self, context):
+        record = {"ran": [], "skipped": {}, "ms": {}}
+        context["stages"] = record
+        for stage in self.stages:
+            if stage.when is not None and not stage.when(context):
+                record["skipped"][stage.name] = stage.skip_reason
+                for name, value in stage.defaults.items():
+                    context.setdefault(name, copy.deepcopy(value))
+                if stage.on_skip:
+                    stage.on_skip(context)
+                continue
+            started = time.perf_counter()
+            outputs = stage.run(context)
+            if inspect.isgenerator(outputs):
+                outputs = yield from outputs
+            context.update(outputs or {})
+            record["ran"].append(stage.name)
+            record["ms"][stage.name] = round((time.perf_counter() - started) * 1000.0, 1)
+        return context
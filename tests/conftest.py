@@ -0,0 +1,28 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def write_corpus(directory, name, count=6, dimension=8, seed=0):
+    # A flat FAISS index and a JSON chunk mapping, the smallest corpus LoadedCorpus accepts
+    import faiss
+    index_path, mapping_path = os.path.join(directory, f"{name}.faiss"), os.path.join(directory, f"{name}.json")
+    vectors = np.random.default_rng(seed).standard_normal((count, dimension)).astype("float32")
+    index = faiss.IndexFlatL2(dimension)
+    index.add(vectors)
+    # Renamed into place like index_chunks does, so a snapshot that has the old file mapped keeps reading it
+    faiss.write_index(index, index_path + ".tmp")
+    os.replace(index_path + ".tmp", index_path)
+    chunks = [{"chunk_id": i, "content": f"{name} chunk {i} on revenue growth", "page_number": i + 1, "section": "Financial"} for i in range(count)]
+    with open(mapping_path, "w", encoding="utf-8") as f:
+        json.dump(chunks, f)
+    return index_path, mapping_path
+
+@pytest.fixture
+def make_corpus(tmp_path):
+    return lambda name, **kwargs: write_corpus(str(tmp_path), name, **kwargs)
@@ -0,0 +1,89 @@
+import re
+
+import numpy as np
+import pytest
+
+from chunk_features import IMPORTANT_NAMES, ChunkFeatures, compute_boosts
+
+def legacy_boost(query_clean, content, keyword_hits=0):
+    # The per-chunk loop compute_boosts replaced (keyword hits were added beside it, capped at 3)
+    boost = 0.0
+    content_lower = content.lower()
+    for name in IMPORTANT_NAMES:
+        if name in query_clean.lower() and name in content_lower:
+            boost += 12.0
+    for num in re.findall(r'\b\d{2,}\b', query_clean):
+        if num in content:
+            boost += 10.0
+    if any(kw in query_clean.lower() for kw in ["revenue", "profit", "report", "rsus", "payment", "date", "incorporate", "company", "what is"]):
+        if any(bk in content_lower for bk in ["forward-looking", "terms of use", "table of contents", "index", "notice of", "cautionary", "disclaimer"]):
+            boost -= 10.0
+        if len(content.split()) < 40:
+            boost -= 5.0
+    boost += 1.5 * min(keyword_hits, 3)
+    if query_clean.lower() in content_lower:
+        boost += 25.0
+    return boost
+
+def boosts(query_clean, contents, keyword_hits=None):
+    features = ChunkFeatures.from_chunks([{"content": c} for c in contents])
+    rows = np.arange(len(contents))
+    return compute_boosts(features, rows, query_clean, contents, keyword_hits if keyword_hits is not None else np.zeros(len(contents), dtype=np.int32))
+
+LONG = " ".join(["filler"] * 45)
+
+CONTENTS = [
+    f"HCLTech revenue grew 6.5% in 2024 to $13.8 billion. {LONG}",
+    "Cautionary statement on forward-looking information.",
+    f"Roshni Nadar Malhotra chairs the board of HCL. {LONG}",
+    "Revenue was strong.",
+    f"Table of contents and index of the report for 2024 and 2023. {LONG}",
+    f"Microsoft and Google partnerships; what is the company strategy {LONG}",
+]
+
+QUERIES = [
+    "HCLTech revenue in 2024",
+    "Who is Roshni Nadar",
+    "what is the company strategy",
+    "Microsoft partnership",
+    "dividend per share",
+    "report for 2023 and 2024",
+]
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_boost_table_matches_the_legacy_loop(query):
+    hits = np.array([0, 1, 2, 3, 4, 5], dtype=np.int32)
+    expected = [legacy_boost(query, content, h) for content, h in zip(CONTENTS, hits)]
+    np.testing.assert_allclose(boosts(query, CONTENTS, hits), expected)
+
+# (query, chunk text, legacy boost, current boost). The chunk side now indexes whole digit runs, so a query number
+# only matches a run equal to it: the legacy substring hits inside longer runs are lost and no pair gains a boost.
+# The query side keeps the legacy \b\d{2,}\b, so "FY25" in a query never matches, while "FY25" in a chunk matches "25".
+NUMBER_CASES = [
+    ("growth in 2025", "2025 was a solid year", 10.0, 10.0),
+    ("growth in 25 markets", "present in 25 countries", 10.0, 10.0),
+    ("growth in 25 markets", "the FY25 results", 10.0, 10.0),
+    ("growth in 25 markets", "the 25.5% margin", 10.0, 10.0),
+    ("growth in 25 markets", "the 2025 results", 10.0, 0.0),
+    ("growth in 2025", "item 20250 in the ledger", 10.0, 0.0),
+    ("growth in 150 cities", "1,500 employees", 0.0, 0.0),
+    ("growth in FY25", "the FY25 results", 0.0, 0.0),
+    ("growth in FY25", "25 new offices", 0.0, 0.0),
+    ("growth in 25 or 25 markets", "25 markets", 20.0, 20.0),
+    ("growth in 7 markets", "7 markets", 0.0, 0.0),
+]
+
+@pytest.mark.parametrize("query, content, legacy, current", NUMBER_CASES)
+def test_which_pairs_keep_gain_or_lose_the_number_boost(query, content, legacy, current):
+    # Contents are padded past the short-chunk penalty and the queries trigger no other rule
+    content = f"{content} {LONG}"
+    assert legacy_boost(query, content) == legacy
+    assert boosts(query, [content])[0] == current
+
+def test_features_round_trip(tmp_path):
+    features = ChunkFeatures.from_chunks([{"content": c} for c in CONTENTS])
+    features.save(str(tmp_path / "store"))
+    loaded = ChunkFeatures.load(str(tmp_path / "store"))
+    rows = np.arange(len(CONTENTS))
+    for query in QUERIES:
+        np.testing.assert_array_equal(compute_boosts(loaded, rows, query, CONTENTS, np.zeros(len(rows))), compute_boosts(features, rows, query, CONTENTS, np.zeros(len(rows))))
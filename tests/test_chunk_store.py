@@ -0,0 +1,40 @@
+import os
+import sys
+
+import faiss
+import numpy as np
+import pytest
+
+from chunk_store import read_index_mmap
+
+def resident_bytes():
+    with open("/proc/self/statm", "r") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+def write_index(path, index, vectors):
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    faiss.write_index(index, path)
+    return path
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads resident memory from /proc")
+@pytest.mark.parametrize("kind", ["flat", "ivf"])
+def test_loading_maps_the_index_instead_of_copying_it(tmp_path, kind):
+    vectors = np.random.default_rng(0).standard_normal((50000, 256)).astype(np.float32)
+    index = faiss.IndexFlatL2(256) if kind == "flat" else faiss.IndexIVFFlat(faiss.IndexFlatL2(256), 256, 16)
+    path = write_index(str(tmp_path / f"{kind}.faiss"), index, vectors)
+    del vectors, index
+    size = os.path.getsize(path)
+    before = resident_bytes()
+    mapped = read_index_mmap(path)
+    assert resident_bytes() - before < size / 4
+    assert mapped.ntotal == 50000
+
+def test_mapped_and_read_indexes_search_alike(tmp_path):
+    vectors = np.random.default_rng(1).standard_normal((500, 16)).astype(np.float32)
+    for name, index in [("flat", faiss.IndexFlatIP(16)), ("hnsw", faiss.IndexHNSWFlat(16, 8)), ("ivf", faiss.IndexIVFFlat(faiss.IndexFlatL2(16), 16, 4))]:
+        path = write_index(str(tmp_path / f"{name}.faiss"), index, vectors)
+        expected = faiss.read_index(path).search(vectors[:5], 10)
+        actual = read_index_mmap(path).search(vectors[:5], 10)
+        np.testing.assert_array_equal(actual[1], expected[1])
@@ -0,0 +1,128 @@
+import copy
+import threading
+import time
+import uuid
+
+import pytest
+
+import inference_scheduler
+from inference_scheduler import coalesce, coalesce_stream, coalescing_stats
+
+FOLLOWERS = 3
+
+@pytest.fixture(autouse=True)
+def coalescing_on():
+    inference_scheduler.set_request_coalescing(True)
+    yield
+    inference_scheduler.set_request_coalescing(True)
+
+def wait_for_followers(group, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while coalescing_stats().get(group, {}).get("coalesced", 0) < count:
+        assert time.monotonic() < deadline, "followers never joined the flight"
+        time.sleep(0.005)
+
+def run_threads(targets):
+    threads = [threading.Thread(target=target, name=name) for name, target in targets]
+    for t in threads:
+        t.start()
+    return threads
+
+def test_followers_are_isolated_from_the_leader_changing_its_result():
+    group = f"isolation-{uuid.uuid4()}"
+    mutated = threading.Event()
+
+    class Value(dict):
+        # Followers only get to copy after the leader has changed its own result
+        def __deepcopy__(self, memo):
+            if threading.current_thread().name != "leader":
+                mutated.wait(5)
+            return Value(copy.deepcopy(dict(self), memo))
+
+    def compute():
+        wait_for_followers(group, FOLLOWERS)
+        return Value(answer=42)
+
+    results = {}
+    def leader():
+        value = coalesce(group, "key", compute)
+        value["added_by_leader"] = True
+        mutated.set()
+        results["leader"] = value
+    def follower(i):
+        results[i] = coalesce(group, "key", compute)
+
+    threads = run_threads([("leader", leader)])
+    while coalescing_stats().get(group, {}).get("computed", 0) < 1:
+        time.sleep(0.005)
+    threads += run_threads([(f"follower-{i}", lambda i=i: follower(i)) for i in range(FOLLOWERS)])
+    for t in threads:
+        t.join(10)
+
+    assert results["leader"] == {"answer": 42, "added_by_leader": True}
+    assert [results[i] for i in range(FOLLOWERS)] == [{"answer": 42}] * FOLLOWERS
+    assert coalescing_stats()[group]["coalesced"] == FOLLOWERS
+    assert coalescing_stats()[group]["computed"] == 1
+
+def test_followers_get_their_own_copies_under_concurrent_mutation():
+    group = f"stress-{uuid.uuid4()}"
+    errors, results = [], []
+    def compute():
+        time.sleep(0.01)
+        return {"labels": list(range(200)), "nested": {str(i): i for i in range(200)}}
+    def caller():
+        try:
+            value = coalesce(group, "key", compute)
+            # What ConversationState does with an analysis result
+            for i in range(200):
+                value.setdefault(f"extra-{i}", i)
+            results.append(value)
+        except Exception as e:
+            errors.append(e)
+    for _ in range(20):
+        for t in run_threads([(f"caller-{i}", caller) for i in range(8)]):
+            t.join(10)
+    assert errors == []
+    assert len(results) == 160
+    assert len({id(value) for value in results}) == 160
+
+def test_an_exception_is_shared_with_the_followers():
+    group = f"error-{uuid.uuid4()}"
+    def compute():
+        wait_for_followers(group, FOLLOWERS)
+        raise ValueError("model failed")
+    errors = []
+    def caller():
+        try:
+            coalesce(group, "key", compute)
+        except ValueError as e:
+            errors.append(str(e))
+    for t in run_threads([(f"caller-{i}", caller) for i in range(FOLLOWERS + 1)]):
+        t.join(10)
+    assert errors == ["model failed"] * (FOLLOWERS + 1)
+    assert coalescing_stats()[group]["computed"] == 1
+
+def test_followers_of_an_abandoned_stream_compute_their_own_result():
+    group = f"abandon-{uuid.uuid4()}"
+    def stream():
+        for token in ("a", "b"):
+            yield token
+        return "ab"
+    replay = lambda result: iter([result])
+    leader = coalesce_stream(group, "key", stream, replay)
+    assert next(leader) == "a"
+    results = []
+    follower = threading.Thread(target=lambda: results.append(list(coalesce_stream(group, "key", stream, replay))))
+    follower.start()
+    wait_for_followers(group, 1)
+    leader.close()
+    follower.join(10)
+    assert results == [["a", "b"]]
+    assert coalescing_stats()[group] == {"calls": 2, "computed": 2, "coalesced": 0, "in_flight": 0}
+
+def test_nothing_is_shared_with_coalescing_off():
+    group = f"off-{uuid.uuid4()}"
+    inference_scheduler.set_request_coalescing(False)
+    value = {"a": 1}
+    assert coalesce(group, "key", lambda: value) is value
+    assert group not in coalescing_stats()
@@ -0,0 +1,31 @@
+import ner_extractor
+from ner_extractor import extract_entities, gazetteer_matches
+
+def test_labels_acronyms_and_typos():
+    assert dict(gazetteer_matches("Please reset my password for SAP")) == {"application_name": "SAP"}
+    assert dict(gazetteer_matches("My Outlok keeps crashing")) == {"application_name": "Outlook"}
+    assert dict(gazetteer_matches("is it down?")) == {}
+    assert dict(gazetteer_matches("Raise a ticket for the IT team")) == {"department": "IT"}
+
+def test_head_words_name_a_ticket_type_unless_generic():
+    assert dict(gazetteer_matches("My laptop hardware is broken")) == {"ticket_type": "Hardware Issue"}
+    assert dict(gazetteer_matches("Which software do we license?")) == {}
+    assert dict(gazetteer_matches("Raise an access request for Jira")) == {"ticket_type": "Access Request", "application_name": "Jira"}
+    assert dict(gazetteer_matches("What were sales in FY25?")) == {}
+
+def test_two_labels_for_one_slot_are_left_to_the_classifier():
+    assert "department" not in dict(gazetteer_matches("Raise a ticket for Finance and HR"))
+
+def test_a_fuzzy_tie_stays_ambiguous_until_a_closer_label(monkeypatch):
+    # "stratuq" is one letter off each of the first three; a tie must not be settled by whichever label comes last
+    monkeypatch.setitem(ner_extractor.SLOTS_TO_FILL, "product", ["Stratum", "Stratus", "Stratux"])
+    assert ner_extractor._fuzzy_label(["stratuq"], "product") is None
+    monkeypatch.setitem(ner_extractor.SLOTS_TO_FILL, "product", ["Stratum", "Stratus", "Stratux", "Stratuqe"])
+    assert ner_extractor._fuzzy_label(["stratuq"], "product") == "Stratuqe"
+    assert ner_extractor._fuzzy_label(["stratux"], "product") == "Stratux"
+
+def test_only_requested_slots_are_filled():
+    # The access trigger asks for the application only; "finance" names a department nobody asked about
+    entities = extract_entities("I need access to Workday for the finance team", fill_slots=False)
+    assert entities["application_name"] == "Workday"
+    assert entities["department"] == "..."
@@ -0,0 +1,60 @@
+import pytest
+
+from index_handle import IndexRegistry
+
+def test_lease_loads_on_first_use_and_counts_hits(make_corpus):
+    registry = IndexRegistry()
+    handle = registry.register("a", *make_corpus("a"))
+    assert not handle.loaded
+    with registry.lease("a") as corpus:
+        assert registry.stats()["a"]["in_flight"] == 1
+        assert corpus.version == handle.version
+    with registry.lease("a") as again:
+        assert again is corpus
+    stats = registry.stats()["a"]
+    assert (stats["misses"], stats["hits"], stats["in_flight"], stats["loaded"]) == (1, 1, 0, True)
+
+def test_unknown_corpus_is_a_key_error():
+    with pytest.raises(KeyError):
+        with IndexRegistry().lease("missing"):
+            pass
+
+def test_least_recently_used_idle_corpus_is_evicted(make_corpus):
+    registry = IndexRegistry(max_corpora=2)
+    for name in ("a", "b", "c"):
+        registry.register(name, *make_corpus(name))
+    for name in ("a", "b", "a", "c"):
+        with registry.lease(name):
+            pass
+    stats = registry.stats()
+    assert [stats[name]["loaded"] for name in ("a", "b", "c")] == [True, False, True]
+    assert stats["b"]["evictions"] == 1
+    assert not registry.handle("b").loaded
+
+def test_a_leased_corpus_is_not_evicted_until_released(make_corpus):
+    registry = IndexRegistry(max_corpora=1)
+    for name in ("a", "b"):
+        registry.register(name, *make_corpus(name))
+    with registry.lease("a") as held:
+        with registry.lease("b"):
+            pass
+        # Over budget while "a" is in flight: the idle "b" goes instead
+        assert registry.stats()["a"]["loaded"] and not registry.stats()["b"]["loaded"]
+        with registry.lease("b"):
+            assert registry.stats()["a"]["evictions"] == 0
+        assert registry.handle("a").acquire() is held
+    with registry.lease("b"):
+        pass
+    stats = registry.stats()
+    assert (stats["a"]["loaded"], stats["a"]["evictions"], stats["b"]["loaded"]) == (False, 1, True)
+    # A snapshot handed out before the eviction is still usable
+    assert len(held.chunks) == 6 and held.index.ntotal == 6
+
+def test_byte_budget_evicts(make_corpus):
+    registry = IndexRegistry(max_bytes=1)
+    for name in ("a", "b"):
+        registry.register(name, *make_corpus(name))
+    with registry.lease("a"):
+        pass
+    assert not registry.stats()["a"]["loaded"]
+    assert registry.stats()["a"]["evictions"] == 1
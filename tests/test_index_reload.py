@@ -0,0 +1,47 @@
+import numpy as np
+
+from index_handle import IndexHandle, corpus_fingerprint
+
+def test_reload_swaps_in_the_new_files(make_corpus):
+    index_path, mapping_path = make_corpus("corpus")
+    handle = IndexHandle(index_path, mapping_path)
+    old = handle.acquire()
+    assert handle.reload(background=False) == old.version
+    make_corpus("corpus", count=8, seed=1)
+    new_version = handle.reload(background=False)
+    assert new_version == corpus_fingerprint(index_path, mapping_path) != old.version
+    assert len(handle.acquire().chunks) == 8
+    assert (handle.reload_count, handle.last_error) == (1, None)
+    # The snapshot a request already holds is unchanged by the swap, mapped index included
+    assert len(old.chunks) == 6 and old.index.ntotal == 6
+    assert old.index.search(np.zeros((1, 8), dtype=np.float32), 6)[1].min() >= 0
+
+def test_failed_reload_keeps_serving_the_old_snapshot(make_corpus):
+    index_path, mapping_path = make_corpus("corpus")
+    handle = IndexHandle(index_path, mapping_path)
+    old = handle.acquire()
+    # A half-written mapping file
+    with open(mapping_path, "w", encoding="utf-8") as f:
+        f.write('[{"chunk_id": 0, "content": ')
+    assert handle.reload(background=False) == old.version
+    assert handle.acquire() is old
+    assert handle.reload_count == 0
+    assert handle.last_error
+    assert handle._failed_fingerprint == corpus_fingerprint(index_path, mapping_path)
+
+def test_failed_reload_recovers_once_the_files_are_fixed(make_corpus):
+    index_path, mapping_path = make_corpus("corpus")
+    handle = IndexHandle(index_path, mapping_path)
+    old = handle.acquire()
+    with open(index_path, "wb") as f:
+        f.write(b"not a faiss index")
+    assert handle.reload(background=False) == old.version
+    make_corpus("corpus", count=7, seed=2)
+    assert handle.reload(background=False) != old.version
+    assert handle.last_error is None
+    assert len(handle.acquire().chunks) == 7
+
+def test_reload_before_first_use_loads_nothing(make_corpus):
+    handle = IndexHandle(*make_corpus("corpus"))
+    assert handle.reload(background=False) is None
+    assert not handle.loaded
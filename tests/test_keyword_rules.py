@@ -0,0 +1,75 @@
+import random
+import re
+
+import pytest
+
+from keyword_rules import RULES, KeywordAutomaton, match_rules
+
+# The regexes sentiment_analyzer used for urgency before the rule engine
+LEGACY_URGENCY = [r"\basap\b", r"\burgent\b", r"\bcritical\b", r"\bimmediately\b", r"\bfire\b", r"\bemergency\b", r"\bstuck\b",
+                  r"\bblocking\b", r"\bdeadline\b", r"\(urgent\)", r"\(asap\)", r"\(critical\)"]
+
+def legacy_accepts(mode, text, keyword):
+    # The hand-written checks each family replaced
+    if mode == "substring":
+        return keyword in text.lower()
+    if mode == "prefix":
+        return text.lower().startswith(keyword)
+    pattern = LEGACY_URGENCY[RULES["urgency"][1]["signals"].index(keyword)]
+    return re.search(pattern, text, re.IGNORECASE) is not None
+
+def legacy_matches(text):
+    matched = {}
+    for family, (mode, groups) in RULES.items():
+        for group, keywords in groups.items():
+            hits = tuple(k for k in keywords if legacy_accepts(mode, text, k))
+            if hits:
+                matched[(family, group)] = hits
+    return matched
+
+CASES = [
+    # Overlapping keywords: every one that occurs is reported, in the group's declared order
+    ("Tell me more about the leadership", {("pipeline", "continuation"): ("more", "tell me more"), ("pipeline", "people"): ("leader", "leadership"),
+                                          ("pipeline", "leadership"): ("leadership",)}),
+    ("My laptop is not working", {("slots", "ticket"): ("not working",), ("slots", "it_action"): ("laptop", "working")}),
+    ("what about the board of directors", {("pipeline", "continuation"): ("what about",), ("intent_priority", "ask_people"): ("director", "board of directors")}),
+    # Substring families match inside words, as the `in` checks did
+    ("three hrs of overtime", {("intent_keywords", "ask_hr"): ("hr",), ("pipeline", "hr"): ("hr",)}),
+    ("password reset", {("slots", "access"): ("password",), ("intent_keywords", "action_access"): ("password", "reset")}),
+    # Word family: whole words only, parentheses on their own edges
+    ("Please fix this ASAP!", {("urgency", "signals"): ("asap",)}),
+    ("This is urgently needed", {("urgency", "signals"): ()}),
+    ("Server down (urgent)", {("urgency", "signals"): ("urgent", "(urgent)")}),
+    ("firewall rules", {("urgency", "signals"): ()}),
+    ("stuck_on_login", {("urgency", "signals"): ()}),
+    ("deadline-driven work", {("urgency", "signals"): ("deadline",)}),
+    ("CRITICAL: outage", {("urgency", "signals"): ("critical",)}),
+    # Prefix family: the start of the text, not after leading spaces
+    ("Whatever works", {("question", "question"): ("what",)}),
+    ("  what is EBITDA", {("question", "question"): ()}),
+    ("Revenue for FY25?", {("question", "question"): ("revenue",)}),
+]
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_table_against_the_old_checks(text, expected):
+    rules = match_rules(text)
+    for (family, group), keywords in expected.items():
+        assert rules.hits(family, group) == keywords
+    assert rules.matched == legacy_matches(text)
+
+def test_every_family_on_random_text():
+    # Texts stitched from keyword fragments, separators and noise, so keywords overlap, abut and split across words
+    rng = random.Random(16)
+    keywords = [k for _, groups in RULES.values() for words in groups.values() for k in words]
+    pieces = keywords + [" ", "  ", ", ", "-", "_", "(", ")", "!", "?", "x", "ly", "s", "ing", "Un", "re"]
+    automaton = KeywordAutomaton(RULES)
+    for _ in range(3000):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 8)))
+        text = text.upper() if rng.random() < 0.2 else text
+        assert automaton.match(text).matched == legacy_matches(text), text
+
+def test_groups_and_first_follow_declaration_order():
+    rules = match_rules("Schedule a meeting about revenue with the CEO")
+    assert rules.groups("intent_priority") == ["ask_finance", "ask_people", "action_schedule"]
+    assert rules.first("intent_priority") == "ask_finance"
+    assert rules.first("urgency") is None
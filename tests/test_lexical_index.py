@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from benchmark_lexical_index import legacy_lexical_scores
+from lexical_index import LexicalIndex, get_bigrams, query_terms
+
+TEXTS = [
+    "Revenue growth was strong in FY25 and revenue grew 6.5% across services.",
+    "The board declared a final dividend to shareholders of the company.",
+    "Growth in revenue came from digital services and engineering.",
+    "What was revenue in the last year of the plan?",
+    "Employees joined the company in large numbers; employee growth continued.",
+    "It is ok.",
+    "Carbon emission targets for the board were met.",
+]
+
+# Query bigrams contain no query stopword, so the legacy loop and the index agree on them
+QUERIES = [
+    "revenue growth",
+    "HCLTech revenue growth in FY25",
+    "dividend payout to shareholders",
+    "carbon emission targets board",
+    "employees joined company",
+    "digital services engineering growth",
+]
+
+def legacy_overlap(query, chunks, rows):
+    # Back out the overlap part of the legacy rrf score: 0.5 per token plus 1.0 per bigram
+    scores = legacy_lexical_scores(query, chunks, rows)
+    return np.array([scores[row]["rrf_score"] - 1.0 / (60 + rank) for rank, row in enumerate(rows)])
+
+def chunks_with(bigram_form):
+    return [{"content": text, "bigrams": bigram_form(text)} for text in TEXTS]
+
+def pair_bigrams(text):
+    # The form the legacy loop compared against: word pairs rather than the "a b" strings ingestion writes
+    return {tuple(bigram.split()) for bigram in get_bigrams(text)}
+
+@pytest.fixture
+def index():
+    return LexicalIndex.from_chunks(chunks_with(get_bigrams))
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_overlap_matches_the_legacy_loop(index, query):
+    # The legacy loop only counted bigrams when the chunk side held word pairs, so compare against that form
+    chunks = chunks_with(pair_bigrams)
+    rows = np.array([3, 0, 6, 1, 2, 5, 4], dtype=np.int32)
+    token_overlap, bigram_overlap = index.overlap_scores(query, rows)
+    np.testing.assert_allclose(token_overlap * 0.5 + bigram_overlap * 1.0, legacy_overlap(query, chunks, rows))
+
+def test_shipped_string_bigrams_now_count(index):
+    # chunks_mapping.json stores bigrams as strings, which the legacy loop compared with tuples and never matched
+    rows = np.arange(len(TEXTS), dtype=np.int32)
+    # Two tokens at 0.5 each and no bigram
+    assert legacy_overlap("revenue growth", chunks_with(get_bigrams), rows)[0] == pytest.approx(1.0)
+    assert index.overlap_scores("revenue growth", rows)[1][0] == 1
+
+def test_query_side_skips_bigrams_with_a_stopword(index):
+    # The chunk side keeps every adjacent pair, so "was revenue" is indexed for chunk 3, but the query side drops
+    # any pair containing a query stopword; the legacy loop only dropped seven of them and counted it
+    assert "was revenue" in index.bigram_ids
+    assert query_terms("What was revenue growth") == ({"revenue", "growth"}, {"revenue growth"})
+    rows = np.arange(len(TEXTS), dtype=np.int32)
+    token_overlap, bigram_overlap = index.overlap_scores("What was revenue growth", rows)
+    assert token_overlap[3] == 1 and bigram_overlap[3] == 0
+    assert token_overlap[0] == 2 and bigram_overlap[0] == 1
+    assert legacy_overlap("What was revenue growth", chunks_with(pair_bigrams), rows)[3] == pytest.approx(0.5 + 2.0)
+
+def test_rows_outside_any_posting_list_score_zero(index):
+    rows = np.array([5], dtype=np.int32)
+    assert [a.tolist() for a in index.overlap_scores("revenue growth", rows)] == [[0], [0]]
+
+def test_keyword_hits_count_words_and_phrases(index):
+    rows = np.arange(len(TEXTS), dtype=np.int32)
+    assert index.keyword_hits(["dividend", "revenue growth", "board"], rows).tolist() == [1, 2, 0, 0, 0, 0, 1]
+
+def test_save_and_load_round_trip(index, tmp_path):
+    base = str(tmp_path / "store")
+    index.save(base)
+    loaded = LexicalIndex.load(base)
+    rows = np.arange(len(TEXTS), dtype=np.int32)
+    for query in QUERIES:
+        for expected, actual in zip(index.overlap_scores(query, rows), loaded.overlap_scores(query, rows)):
+            np.testing.assert_array_equal(actual, expected)
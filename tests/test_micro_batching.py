@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+import inference_scheduler
+from inference_scheduler import MicroBatcher, run_batched
+
+@pytest.fixture
+def batching(monkeypatch):
+    monkeypatch.setattr(inference_scheduler, "INFERENCE_BATCHING", True)
+    monkeypatch.setattr(inference_scheduler, "INFERENCE_MAX_BATCH", 4)
+    monkeypatch.setattr(inference_scheduler, "_batchers", {})
+
+def test_concurrent_callers_get_their_own_outputs_in_order():
+    sizes = []
+    def run(batch):
+        sizes.append(len(batch))
+        return [text.upper() for text in batch]
+    batcher = MicroBatcher("test", run, window_ms=50.0, max_batch=4)
+    inputs = [[f"{'x' * (7 - i)}{i}-{j}" for j in range(3)] for i in range(4)]
+    outputs = [None] * len(inputs)
+    barrier = threading.Barrier(len(inputs))
+    def caller(i):
+        barrier.wait()
+        outputs[i] = batcher(inputs[i])
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(len(inputs))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert outputs == [[text.upper() for text in units] for units in inputs]
+    assert max(sizes) <= 4 and sum(sizes) == 12
+
+def test_batch_errors_reach_every_caller():
+    def run(batch):
+        raise ValueError("model failed")
+    with pytest.raises(ValueError):
+        MicroBatcher("failing", run, window_ms=0.0)(["a", "b"])
+
+def test_batch_size_is_capped(monkeypatch):
+    monkeypatch.setattr(inference_scheduler, "INFERENCE_MAX_BATCH", 8)
+    assert inference_scheduler._batch_size(["a"] * 3) == 3
+    assert inference_scheduler._batch_size(["a"] * 200) == 8
+
+def test_only_models_shared_across_keys_are_locked(batching, monkeypatch):
+    monkeypatch.setattr(inference_scheduler, "_model_locks", {})
+    assert run_batched("single", ["a", "b"], lambda batch: [len(t) for t in batch]) == [1, 1]
+    assert inference_scheduler._model_locks == {}
+    assert run_batched("shared:True", ["ab"], lambda batch: [len(t) for t in batch], model_key="shared") == [2]
+    assert list(inference_scheduler._model_locks) == ["shared"]
+
+def test_unbatched_calls_run_inline(monkeypatch):
+    monkeypatch.setattr(inference_scheduler, "INFERENCE_BATCHING", False)
+    caller = threading.current_thread()
+    threads = []
+    run_batched("inline", ["a"], lambda batch: threads.append(threading.current_thread()) or batch)
+    assert threads == [caller]
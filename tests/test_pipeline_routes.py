@@ -0,0 +1,106 @@
+import pytest
+
+import main_assistant
+import response_cache
+from keyword_rules import match_rules
+
+CHUNKS = [{"chunk_id": "c1", "content": "Revenue grew 6.5% in FY25 to $13.8 billion.", "page_number": 3, "section": "Financial", "score": 4.0, "index_version": "v1"}]
+
+class CannedState:
+    # Conversation state with fixed NLU results, so routing runs without any model
+    def __init__(self, intent, confidence, entities=None):
+        self.result = {
+            "intent": {"intent": intent, "confidence": confidence},
+            "mentions": {},
+            "entities": entities or {},
+            "sentiment": {"sentiment": "neutral", "is_urgent": False},
+        }
+        self.tasks = []
+
+    def analysis(self, text, tasks=()):
+        self.tasks.extend(tasks)
+        return {task: dict(self.result[task]) for task in tasks}
+
+    def embedding(self, text):
+        import numpy as np
+        return np.ones(4, dtype=np.float32) / 2.0
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    # Retrieval and generation replaced by counters; everything else is the real stage graph
+    calls = {"retrieval": 0, "synthesis": 0}
+    def run_retrieval(request, *args, **kwargs):
+        calls["retrieval"] += 1
+        return [dict(c) for c in CHUNKS], 4.0
+    def synthesize(query, chunks):
+        calls["synthesis"] += 1
+        yield {"type": "token", "text": "Revenue grew 6.5% [Annual Report 2024–25, Page 3]"}
+        return "Revenue grew 6.5% [Annual Report 2024–25, Page 3]"
+    monkeypatch.setattr(main_assistant, "run_retrieval", run_retrieval)
+    monkeypatch.setattr(main_assistant, "synthesize_answer_stream", synthesize)
+    monkeypatch.setattr(main_assistant, "knowledge_base_exists", lambda *paths: True)
+    monkeypatch.setattr(main_assistant, "intent_needs_nli", lambda query: False)
+    monkeypatch.setattr(main_assistant, "serving_index_version", lambda: "v1")
+    response_cache.set_response_cache(True)
+    response_cache.set_semantic_cache(True)
+    response_cache.clear_response_cache()
+    def run(query, state, history=None):
+        context = {"user_query": query, "history": history or [], "state": state, "rules": match_rules(query), "speculative": None}
+        events = list(main_assistant.PIPELINE_STAGES.run(context))
+        return context, events
+    yield run, calls
+    response_cache.clear_response_cache()
+
+def test_question_route_retrieves_and_synthesizes(pipeline):
+    run, calls = pipeline
+    context, _ = run("What was the revenue growth in FY25?", CannedState("ask_finance", 0.9))
+    assert context["stages"]["ran"] == ["intent", "mentions", "follow_up", "cache_lookup", "retrieval", "synthesis", "cache_store", "decision", "response"]
+    assert set(context["stages"]["skipped"]) == {"slot_filling", "history", "cached_answer", "sentiment"}
+    assert context["next_step"] == "answer" and context["index_version"] == "v1"
+    assert calls == {"retrieval": 1, "synthesis": 1}
+
+def test_repeated_question_is_answered_from_the_cache(pipeline):
+    run, calls = pipeline
+    run("What was the revenue growth in FY25?", CannedState("ask_finance", 0.9))
+    context, _ = run("What was the revenue growth in FY25?", CannedState("ask_finance", 0.9))
+    assert context["stages"]["ran"] == ["intent", "mentions", "follow_up", "cache_lookup", "cached_answer", "decision", "response"]
+    assert {"retrieval", "synthesis", "cache_store"} <= set(context["stages"]["skipped"])
+    assert context["cache_match"] == "exact"
+    assert calls == {"retrieval": 1, "synthesis": 1}
+
+def test_action_route_fills_slots_and_skips_retrieval(pipeline):
+    run, calls = pipeline
+    state = CannedState("action_access", 0.9, {"application_name": "SAP"})
+    context, _ = run("Please give me access to SAP", state)
+    assert context["stages"]["ran"] == ["intent", "slot_filling", "follow_up", "decision", "response"]
+    assert set(context["stages"]["skipped"]) == {"mentions", "history", "cache_lookup", "cached_answer", "retrieval", "synthesis", "cache_store", "sentiment"}
+    assert context["next_step"] == "action" and context["index_version"] is None
+    assert calls == {"retrieval": 0, "synthesis": 0}
+    assert "sentiment" not in state.tasks
+
+def test_low_confidence_small_talk_reads_sentiment_only(pipeline):
+    run, calls = pipeline
+    context, _ = run("hmm okay", CannedState("other", 0.2))
+    assert context["stages"]["ran"] == ["intent", "slot_filling", "follow_up", "sentiment", "decision", "response"]
+    assert calls == {"retrieval": 0, "synthesis": 0}
+
+def test_missing_knowledge_base_is_reported_as_an_error(pipeline, monkeypatch):
+    run, calls = pipeline
+    monkeypatch.setattr(main_assistant, "knowledge_base_exists", lambda *paths: False)
+    monkeypatch.setattr(main_assistant, "serving_index_version", lambda: None)
+    context, events = run("What was the revenue growth in FY25?", CannedState("ask_finance", 0.9))
+    assert context["stages"]["ran"] == ["intent", "mentions", "follow_up", "cache_lookup", "retrieval", "decision", "response"]
+    assert set(context["stages"]["skipped"]) == {"slot_filling", "history", "cached_answer", "synthesis", "cache_store", "sentiment"}
+    assert context["next_step"] == "escalate"
+    # Not the wording of an empty search result, so a broken deployment can be told apart from a miss
+    assert context["rag_answer"] == "Internal Error: Knowledge base not found."
+    assert context["retrieved_chunks"] == [] and context["index_version"] is None
+    assert calls == {"retrieval": 0, "synthesis": 0}
+    assert {"type": "status", "stage": "sources", "count": 0, "pages": []} in events
+
+def test_empty_search_result_keeps_the_not_found_answer(pipeline, monkeypatch):
+    run, calls = pipeline
+    monkeypatch.setattr(main_assistant, "run_retrieval", lambda request, *args, **kwargs: ([], -10.0))
+    context, _ = run("What was the revenue growth in FY25?", CannedState("ask_finance", 0.9))
+    assert "synthesis" in context["stages"]["skipped"]
+    assert context["rag_answer"] == "I could not find this information in the dataset."
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+import query_assistant
+from query_assistant import RERANK_POLICIES, _rerank_cascade, resolve_rerank_policy
+
+class CountingReranker:
+    # Stand-in cross-encoder: a fixed score per passage, and a count of every pair and call it gets
+    def __init__(self, scores):
+        self.scores = scores
+        self.pairs = 0
+        self.calls = 0
+
+    def __call__(self, pairs):
+        self.pairs += len(pairs)
+        self.calls += 1
+        return np.array([self.scores[content] for _, content in pairs], dtype=np.float32)
+
+def make_pool(scores, boosts=None):
+    # Ordered as the first stage hands it over; content doubles as the key into the stub's scores
+    return [{"chunk_id": f"c{i}", "content": f"passage {i}", "boost": (boosts or {}).get(i, 0.0)} for i in range(len(scores))]
+
+@pytest.fixture
+def reranker(monkeypatch):
+    def install(scores):
+        stub = CountingReranker({f"passage {i}": s for i, s in enumerate(scores)})
+        monkeypatch.setattr(query_assistant, "rerank", stub)
+        return stub
+    return install
+
+def full_pool_ranking(pool, scores, k):
+    # The pre-cascade path: every pool candidate scored in one call, rerank score plus boost, best first
+    return [c["chunk_id"] for c in sorted(pool, key=lambda c: scores[int(c["chunk_id"][1:])] + c["boost"], reverse=True)[:k]]
+
+def top_ids(scored, k):
+    return [c["chunk_id"] for c in sorted(scored, key=lambda c: c["score"], reverse=True)[:k]]
+
+def test_exhaustive_policy_reproduces_the_full_pool_ranking(reranker):
+    scores = np.random.default_rng(0).standard_normal(300).tolist()
+    pool = make_pool(scores, boosts={7: 12.0, 250: 10.0, 3: -10.0})
+    stub = reranker(scores)
+    scored = _rerank_cascade(["revenue growth"], [pool], 5, resolve_rerank_policy(rerank_policy="exhaustive"))
+    assert (stub.pairs, stub.calls) == (300, 1)
+    assert top_ids(scored[0], 5) == full_pool_ranking(pool, scores, 5)
+    assert top_ids(scored[0], 5)[0] == "c7"
+
+def test_early_exit_once_min_scored_and_the_margin_are_met(reranker):
+    # Scores fall with first-stage rank, so after two batches the top-5 is settled and the third batch is far below it
+    scores = [10.0 - 0.5 * i for i in range(150)]
+    pool = make_pool(scores)
+    stub = reranker(scores)
+    policy = resolve_rerank_policy("ask_finance")
+    assert (policy["batch_size"], policy["min_scored"], policy["stop_margin"]) == (32, 64, 2.0)
+    scored = _rerank_cascade(["revenue growth"], [pool], 5, policy)
+    # 64 to reach min_scored, then one more batch to see the top-k survive it
+    assert stub.pairs == 96
+    assert top_ids(scored[0], 5) == full_pool_ranking(pool, scores, 5)
+
+def test_no_early_exit_before_min_scored(reranker):
+    scores = [10.0 - 5.0 * i for i in range(100)]
+    stub = reranker(scores)
+    _rerank_cascade(["q"], [make_pool(scores)], 5, {"pool_size": 100, "batch_size": 8, "min_scored": 40, "stop_margin": 0.0})
+    assert stub.pairs == 48
+
+def test_no_early_exit_while_batches_stay_within_the_margin(reranker):
+    # A flat score profile never drops stop_margin below the k-th score, so the whole pool is scored
+    scores = [0.0] * 120
+    stub = reranker(scores)
+    _rerank_cascade(["q"], [make_pool(scores)], 5, dict(RERANK_POLICIES["default"]))
+    assert stub.pairs == 120
+
+def test_a_late_strong_passage_keeps_the_cascade_going(reranker):
+    # Passage 70 beats the early top-5, so the top-k changes in the third batch and scoring goes on past it
+    scores = [10.0 - 0.5 * i for i in range(150)]
+    scores[70] = 50.0
+    pool = make_pool(scores)
+    stub = reranker(scores)
+    scored = _rerank_cascade(["q"], [pool], 5, resolve_rerank_policy("ask_finance"))
+    assert stub.pairs == 128
+    assert top_ids(scored[0], 5) == full_pool_ranking(pool, scores, 5)
+
+def test_identical_pairs_across_parts_are_scored_once(reranker):
+    scores = np.random.default_rng(1).standard_normal(40).tolist()
+    stub = reranker(scores)
+    scored = _rerank_cascade(["q", "q"], [make_pool(scores), make_pool(scores)], 5, resolve_rerank_policy(rerank_policy="exhaustive"))
+    assert (stub.pairs, stub.calls) == (40, 1)
+    assert top_ids(scored[0], 5) == top_ids(scored[1], 5)
+
+def test_empty_pools_score_nothing(reranker):
+    stub = reranker([])
+    assert _rerank_cascade(["q"], [[]], 5, resolve_rerank_policy()) == [[]]
+    assert stub.calls == 0
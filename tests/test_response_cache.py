@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+import query_assistant
+import response_cache
+from response_cache import ResponseCache, SemanticResponseCache, cacheable, normalize_query, response_key
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    response_cache.set_response_cache(True, ttl_seconds=3600.0, max_entries=512)
+    response_cache.set_semantic_cache(True, threshold=0.9, max_entries=256)
+    response_cache.clear_response_cache()
+    yield
+    response_cache.clear_response_cache()
+
+def unit(seed, dimension=16):
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+def test_key_normalization_is_deterministic():
+    assert normalize_query("What was  Revenue Growth in FY25 ?") == "what was revenue growth in fy25"
+    # A fixed digest rather than the per-process salted hash()
+    assert response_key("What was revenue growth in FY25?", "ask_finance", "v1") == response_key("what was revenue growth in fy25", "ask_finance", "v1")
+    assert len(response_key("q", "ask_finance", "v1")) == 64
+
+def test_keys_differ_by_index_version_and_intent():
+    query = "What was revenue growth in FY25?"
+    assert response_key(query, "ask_finance", "v1") != response_key(query, "ask_finance", "v2")
+    assert response_key(query, "ask_finance", "v1") != response_key(query, "ask_hr", "v1")
+
+def test_actions_and_unknown_versions_are_not_cacheable():
+    assert cacheable("ask_finance", "v1")
+    assert not cacheable("action_ticket", "v1")
+    assert not cacheable("ask_finance", None)
+
+def test_an_entry_is_only_found_under_its_own_version():
+    cache = ResponseCache()
+    cache.put(response_key("revenue growth", "ask_finance", "v1"), {"answer": "old"})
+    assert cache.get(response_key("revenue growth", "ask_finance", "v2")) is None
+    assert cache.get(response_key("revenue growth", "ask_finance", "v1")) == {"answer": "old"}
+
+def test_ttl_and_lru_bounds(monkeypatch):
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_MAX_ENTRIES", 2)
+    cache = ResponseCache()
+    for name in ("a", "b"):
+        cache.put(name, {"answer": name})
+    assert cache.get("a") == {"answer": "a"}
+    cache.put("c", {"answer": "c"})
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_TTL_SECONDS", -1.0)
+    assert cache.get("a") is None
+    assert cache.stats()["expired"] == 1
+
+def test_returned_entries_are_copies():
+    cache = ResponseCache()
+    cache.put("k", {"retrieved_chunks": [{"chunk_id": 1}]})
+    cache.get("k")["retrieved_chunks"].append({"chunk_id": 2})
+    assert cache.get("k") == {"retrieved_chunks": [{"chunk_id": 1}]}
+
+def test_semantic_entries_of_another_index_version_are_invalidated():
+    cache = SemanticResponseCache()
+    cache.put("k", "What was revenue growth in FY25?", unit(1), "ask_finance", "v1", {"answer": "grew"})
+    assert cache.get("How much did revenue grow in fiscal 2025?", unit(1), "ask_finance", "v1") == {"answer": "grew"}
+    assert cache.get("How much did revenue grow in fiscal 2025?", unit(1), "ask_finance", "v2") is None
+    assert cache.stats()["invalidated"] == 1
+    assert cache.stats()["entries"] == 0
+
+def test_semantic_match_needs_intent_numbers_and_similarity():
+    cache = SemanticResponseCache()
+    cache.put("k", "What was revenue growth in FY25?", unit(1), "ask_finance", "v1", {"answer": "grew"})
+    assert cache.get("How much did revenue grow in fiscal 2025?", unit(1), "ask_hr", "v1") is None
+    assert cache.get("How much did revenue grow in fiscal 2024?", unit(1), "ask_finance", "v1") is None
+    assert cache.get("How much did revenue grow in fiscal 2025?", unit(2), "ask_finance", "v1") is None
+    assert [record["hit"] for record in cache.audit] == []
+
+def test_serving_version_loads_a_cold_corpus_and_follows_a_reload(make_corpus):
+    index_path, mapping_path = make_corpus("serving")
+    assert query_assistant.current_index_version(index_path, mapping_path) is None
+    version = query_assistant.serving_index_version(index_path, mapping_path)
+    assert version is not None
+    assert query_assistant.current_index_version(index_path, mapping_path) == version
+    make_corpus("serving", count=7, seed=1)
+    query_assistant.reload_index(index_path, mapping_path, background=False)
+    assert query_assistant.serving_index_version(index_path, mapping_path) not in (None, version)
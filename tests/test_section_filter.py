@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+import pytest
+
+import main_assistant
+import query_assistant
+from index_handle import section_matches
+
+QUERY = "What is the IT security policy?"
+
+@pytest.fixture
+def corpus(make_corpus, monkeypatch):
+    # 40 chunks: 32 in Financial Statements, 6 in Governance, 2 unlabelled; stand-ins for the encoder and cross-encoder
+    index_path, mapping_path = make_corpus("sections", count=40)
+    with open(mapping_path, encoding="utf-8") as f:
+        chunks = json.load(f)
+    for chunk in chunks:
+        chunk["section"] = "Financial Statements" if chunk["chunk_id"] < 32 else "Governance" if chunk["chunk_id"] < 38 else "N/A"
+    with open(mapping_path, "w", encoding="utf-8") as f:
+        json.dump(chunks, f)
+    monkeypatch.setattr(query_assistant, "embed", lambda name, texts, normalize=False: np.random.default_rng(7).standard_normal((len(texts), 8)).astype(np.float32))
+    monkeypatch.setattr(query_assistant, "rerank", lambda pairs: np.zeros(len(pairs), dtype=np.float32))
+    monkeypatch.setattr(query_assistant, "query_encoder", lambda corpus: (None, False))
+    return index_path, mapping_path
+
+def retrieve(corpus, section_filter):
+    return [c["chunk_id"] for c in query_assistant.retrieve_chunks(QUERY, *corpus, k=5, section_filter=section_filter)]
+
+def test_a_filter_no_chunk_matches_searches_the_whole_corpus(corpus):
+    assert retrieve(corpus, main_assistant.SECTION_MAP["ask_it_policy"]) == retrieve(corpus, None)
+
+def test_a_section_too_thin_to_answer_from_falls_back(corpus):
+    assert retrieve(corpus, "Governance") == retrieve(corpus, None)
+
+def test_a_large_enough_section_limits_the_search(corpus):
+    assert all(chunk_id < 32 for chunk_id in retrieve(corpus, "Financial"))
+
+def test_every_mapped_section_is_one_detect_section_assigns():
+    process_pdf = pytest.importorskip("process_pdf")
+    pages = {"ask_finance": "Consolidated financial statements for the year", "ask_hr": "Our employees and people and culture",
+             "ask_people": "The board of directors met six times", "ask_it_policy": "Our information security and cybersecurity controls"}
+    for intent, section_filter in main_assistant.SECTION_MAP.items():
+        assert section_matches(process_pdf.detect_section(pages[intent]), section_filter)
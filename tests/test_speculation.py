@@ -0,0 +1,78 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import inference_scheduler
+import main_assistant
+import query_assistant
+from keyword_rules import match_rules
+
+QUERY = "What was revenue growth in FY25?"
+
+@pytest.fixture
+def retrieval(make_corpus, monkeypatch):
+    # The tiny corpus with stand-ins for the encoder and cross-encoder; embed() blocks until released
+    index_path, mapping_path = make_corpus("speculation")
+    calls = {"embed": 0, "rerank": 0}
+    entered, release = threading.Event(), threading.Event()
+    def embed(name, texts, normalize=False):
+        calls["embed"] += 1
+        entered.set()
+        release.wait(5.0)
+        return np.random.default_rng(len(texts)).standard_normal((len(texts), 8)).astype(np.float32)
+    def rerank(pairs):
+        calls["rerank"] += 1
+        return np.zeros(len(pairs), dtype=np.float32)
+    monkeypatch.setattr(query_assistant, "embed", embed)
+    monkeypatch.setattr(query_assistant, "rerank", rerank)
+    monkeypatch.setattr(query_assistant, "query_encoder", lambda corpus: (None, False))
+    monkeypatch.setattr(main_assistant, "retrieve_chunks", lambda query, _index, _mapping, **kwargs: query_assistant.retrieve_chunks(query, index_path, mapping_path, **kwargs))
+    monkeypatch.setattr(main_assistant, "rule_intent", lambda query: ("ask_finance", 1.0))
+    return calls, entered, release, index_path, mapping_path
+
+def test_a_discarded_speculation_never_reranks(retrieval):
+    calls, entered, release, _, _ = retrieval
+    before = main_assistant.speculation_stats()
+    speculative = main_assistant.SpeculativeRetrieval(QUERY, match_rules(QUERY))
+    assert entered.wait(5.0)
+    speculative.discard()
+    release.set()
+    with pytest.raises(inference_scheduler.StageCancelled):
+        speculative.future.result(5.0)
+    assert calls == {"embed": 1, "rerank": 0}
+    assert main_assistant.speculation_stats()["discarded"] == before["discarded"] + 1
+
+def test_a_used_speculation_runs_to_the_end(retrieval):
+    calls, _, release, _, _ = retrieval
+    release.set()
+    rules = match_rules(QUERY)
+    speculative = main_assistant.SpeculativeRetrieval(QUERY, rules)
+    chunks, _ = speculative.take(main_assistant.retrieval_request(QUERY, main_assistant.informational_intent("ask_finance", rules), rules))
+    assert chunks and calls["rerank"] >= 1
+
+def test_a_request_coalesced_onto_a_cancelled_one_computes_its_own(retrieval):
+    calls, entered, release, index_path, mapping_path = retrieval
+    cancel, outcome = threading.Event(), {}
+    def cancelled_leader():
+        try:
+            query_assistant.retrieve_chunks(QUERY, index_path, mapping_path, cancel=cancel)
+        except inference_scheduler.StageCancelled:
+            outcome["leader"] = "cancelled"
+    leader = threading.Thread(target=cancelled_leader)
+    leader.start()
+    assert entered.wait(5.0)
+    coalesced = inference_scheduler.coalescing_stats()["retrieval"]["coalesced"]
+    follower = threading.Thread(target=lambda: outcome.setdefault("follower", query_assistant.retrieve_chunks(QUERY, index_path, mapping_path)))
+    follower.start()
+    deadline = time.monotonic() + 5.0
+    while inference_scheduler.coalescing_stats()["retrieval"]["coalesced"] == coalesced and time.monotonic() < deadline:
+        time.sleep(0.001)
+    cancel.set()
+    release.set()
+    leader.join(5.0)
+    follower.join(5.0)
+    assert outcome["leader"] == "cancelled"
+    assert len(outcome["follower"]) == 5
+    assert calls["rerank"] >= 1
@@ -0,0 +1,30 @@
+import model_registry
+import query_assistant
+
+def test_watching_an_index_does_not_load_it(make_corpus):
+    index_path, mapping_path = make_corpus("watched")
+    assert query_assistant.watch_index(index_path, mapping_path, interval=60.0).is_alive()
+    handle = query_assistant.get_index_handle(index_path, mapping_path)
+    try:
+        assert not handle.loaded
+    finally:
+        handle.stop_watching()
+
+def test_warmup_prepares_first_and_survives_a_failed_preparation(monkeypatch):
+    order = []
+    monkeypatch.setattr(model_registry, "_warmup_thread", None)
+    monkeypatch.setattr(model_registry, "warmup", lambda keys: order.append("models") or {})
+    monkeypatch.setattr(model_registry, "startup_report", lambda *args: "")
+    def prepare():
+        order.append("prepare")
+        raise OSError("index missing")
+    model_registry.start_background_warmup([], prepare=prepare).join(5.0)
+    assert order == ["prepare", "models"]
+
+def test_extractive_answer_says_why_the_generator_is_missing(monkeypatch):
+    import main_assistant
+    chunks = [{"content": "Revenue grew 6.5%. Margins held.", "page_number": 4}]
+    monkeypatch.setitem(model_registry._status, "generator", "loading")
+    assert "still starting up" in main_assistant.extractive_answer(chunks)
+    monkeypatch.setitem(model_registry._status, "generator", "failed")
+    assert "could not be loaded" in main_assistant.extractive_answer(chunks)
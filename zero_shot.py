@@ -0,0 +1,54 @@
+import numpy as np
+
+from model_registry import get_model
+from inference_scheduler import nli_logits
+
+HYPOTHESIS_TEMPLATE = "This example is {}."
+
+def _entailment_ids(config):
+    # Same lookup as the transformers zero-shot pipeline
+    entailment_id = next((i for label, i in config.label2id.items() if label.lower().startswith("entail")), -1)
+    return entailment_id, (-1 if entailment_id == 0 else 0)
+
+def _group_scores(logits, labels, entailment_id, contradiction_id, multi_label):
+    if multi_label or len(labels) == 1:
+        pair = logits[:, [contradiction_id, entailment_id]]
+        pair = np.exp(pair - pair.max(axis=1, keepdims=True))
+        return pair[:, 1] / pair.sum(axis=1)
+    entail = np.exp(logits[:, entailment_id] - logits[:, entailment_id].max())
+    return entail / entail.sum()
+
+def zero_shot_batch(premise, label_groups, multi_label=False):
+    # Scores several independent label sets for one premise in a single padded forward pass.
+    # Returns one pipeline-shaped {"sequence", "labels", "scores"} dict per group.
+    label_groups = [list(labels) for labels in label_groups]
+    if not label_groups:
+        return []
+    nli = get_model("nli")
+    if getattr(nli, "model", None) is None or getattr(nli, "tokenizer", None) is None:
+        # Anything that is not a transformers pipeline only offers the per-group call
+        return [nli(premise, labels, multi_label=multi_label) for labels in label_groups]
+    hypotheses = [HYPOTHESIS_TEMPLATE.format(label) for labels in label_groups for label in labels]
+    logits = nli_logits([(premise, hypothesis) for hypothesis in hypotheses])
+    entailment_id, contradiction_id = _entailment_ids(nli.model.config)
+    results, offset = [], 0
+    for labels in label_groups:
+        scores = _group_scores(logits[offset:offset + len(labels)], labels, entailment_id, contradiction_id, multi_label)
+        offset += len(labels)
+        order = np.argsort(-scores, kind="stable")
+        results.append({"sequence": premise, "labels": [labels[i] for i in order], "scores": [float(scores[i]) for i in order]})
+    return results
+
+def zero_shot(premise, labels, multi_label=False):
+    return zero_shot_batch(premise, [labels], multi_label=multi_label)[0]
+
+class PrecomputedZeroShot:
+    # Drop-in for the zero-shot pipeline call that serves label sets scored ahead of time in one batch
+    def __init__(self, premise, label_groups, multi_label=False):
+        self.premise = premise
+        self.multi_label = multi_label
+        self.results = {tuple(labels): result for labels, result in zip(label_groups, zero_shot_batch(premise, label_groups, multi_label))}
+
+    def __call__(self, premise, labels, multi_label=False):
+        result = self.results.get(tuple(labels)) if premise == self.premise and multi_label == self.multi_label else None
+        return result if result is not None else zero_shot(premise, labels, multi_label=multi_label)